@@ -1,5 +1,17 @@
 """ActiveTable XBlock top-level package.
 
-See activetable.activetable for more information.
+See activetable.activetable for more information.  The block class is imported on first access, so
+importing the package or one of the offline tools doesn't load the XBlock runtime.  Python 3.6
+doesn't support module __getattr__, so the block class is imported eagerly there.
 """
-from .activetable import ActiveTableXBlock
+import sys
+
+if sys.version_info < (3, 7):
+    from .activetable import ActiveTableXBlock  # pylint: disable=unused-import
+else:
+    def __getattr__(name):
+        """Import ActiveTableXBlock on first access."""
+        if name == 'ActiveTableXBlock':
+            from . import activetable  # pylint: disable=import-outside-toplevel
+            return activetable.ActiveTableXBlock
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
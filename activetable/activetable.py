@@ -2,23 +2,89 @@
 """An XBlock with a tabular problem type that requires students to fill in some cells."""
 from __future__ import absolute_import, division, unicode_literals
 
+import copy
+import functools
 import textwrap
-
-import six
-from six.moves import zip  # pylint: disable=import-error,redefined-builtin
+import time
 
 from xblock.core import XBlock
+from xblock.exceptions import JsonHandlerError
 from xblock.fields import Dict, Float, Integer, Scope, String
 from xblock.fragment import Fragment
 from xblock.validation import ValidationMessage
+from django.utils import translation
+from webob import Response
 from xblockutils.resources import ResourceLoader
 from xblockutils.studio_editable import StudioEditableXBlockMixin
 
-from .cells import NumericCell
-from .parsers import ParseError, parse_table, parse_number_list
+from . import tables
+from .answerstats import new_statistics, record_check, summarize
+from .cache import LRUCache, content_hash
+from .grading import compute_score, grade_all
+from .instrumentation import counters, instrumented
+from .parsers import TABLE_FORMATS, ParseError, parse_number_list, read_table
+from .rendering import (
+    TABLE_DATA_FORMAT_VERSION, TableData, TableSkeleton, render_table_html, serialize_row,
+    skeleton_cache, table_data_cache,
+)
+from .userstate import decode_bitset, encode_bitset
 
 loader = ResourceLoader(__name__)  # pylint: disable=invalid-name
 
+# The CSS and JavaScript code are identical for all students, so they are only rendered once per
+# process.  The CSS depends on the icon URLs, which may differ between runtimes.
+resource_cache = LRUCache(maxsize=16)  # pylint: disable=invalid-name
+
+# The maximum length of the request keys sent by clients.
+MAX_REQUEST_KEY_LENGTH = 64
+
+
+def render_css(correct_icon, incorrect_icon, unanswered_icon):
+    """Return the CSS for the given icon URLs."""
+    css_context = dict(
+        correct_icon=correct_icon,
+        incorrect_icon=incorrect_icon,
+        unanswered_icon=unanswered_icon,
+    )
+    return resource_cache.get_or_create(
+        ('css', correct_icon, incorrect_icon, unanswered_icon),
+        lambda: loader.render_django_template('templates/css/activetable.css', css_context),
+    )
+
+
+def load_javascript():
+    """Return the JavaScript code of the student view."""
+    return resource_cache.get_or_create(
+        'js', lambda: loader.load_unicode('static/js/src/activetable.js')
+    )
+
+
+def idempotent(handler):
+    """Decorator for the JSON handlers storing answers, making repeated requests harmless.
+
+    Clients can add a "request_key" to the data of a request and send the same key again when they
+    repeat the request, e.g. after a timeout or a double click.  The key of the last processed
+    request is stored in the user state, and a repeated request with the same key gets the current
+    status without being processed again.  Rejected requests, which have rate_limited or conflict
+    set in their response, aren't recorded, so repeating them is retried.
+    """
+    @functools.wraps(handler)
+    def wrapper(self, data, suffix=''):
+        request_key = data.pop('request_key', None) if isinstance(data, dict) else None
+        if request_key is None:
+            return handler(self, data, suffix)
+        if not isinstance(request_key, str) or len(request_key) > MAX_REQUEST_KEY_LENGTH:
+            raise JsonHandlerError(400, 'Invalid request key.')
+        last_request = dict(handler=handler.__name__, key=request_key)
+        if self.last_request == last_request:
+            counters.increment(f'duplicate_{handler.__name__}')
+            return self.get_status()
+        response = handler(self, data, suffix)
+        if not (response.get('rate_limited') or response.get('conflict')):
+            self.last_request = last_request
+        return response
+    return wrapper
+
 
 class ActiveTableXBlock(StudioEditableXBlockMixin, XBlock):
     """An XBlock with a tabular problem type that requires students to fill in some cells."""
@@ -44,6 +110,17 @@ class ActiveTableXBlock(StudioEditableXBlockMixin, XBlock):
         ]
         """)
     )
+    content_format = String(
+        display_name='Table definition format',
+        help='The format of the table definition: Python-like syntax, CSV or JSON.  In CSV format, '
+        'the first line contains the column headers, and response cells are written like in the '
+        'Python format and quoted, e.g. "Numeric(answer=42, tolerance=1)".  In JSON format, the '
+        'table is a list of rows, and response cells are objects like '
+        '{"type": "Numeric", "answer": 42, "tolerance": 1}.',
+        scope=Scope.content,
+        values=[dict(display_name=name, value=name) for name in TABLE_FORMATS],
+        default='python',
+    )
     help_text = String(
         display_name='Help text',
         help='The text that gets displayed when clicking the "+help" button.  If you remove the '
@@ -90,161 +167,547 @@ class ActiveTableXBlock(StudioEditableXBlockMixin, XBlock):
         'is not set, infinite attempts are allowed.',
         scope=Scope.settings,
     )
+    autosave_interval = Integer(
+        display_name='Autosave interval',
+        help='If set, the answers are saved automatically this number of seconds after the student '
+        'stops typing.  If the value is not set, answers are only saved when clicking a button.',
+        scope=Scope.settings,
+    )
 
     editable_fields = [
         'display_name',
         'content',
+        'content_format',
         'help_text',
         'column_widths',
         'row_heights',
         'default_tolerance',
         'maximum_score',
         'max_attempts',
+        'autosave_interval',
     ]
 
+    # The maximum number of times the answers of a student are written by the save handler per
+    # minute.  Further save requests within the same minute are rejected.
+    max_saves_per_minute = 30
+    # Tables with at least this many rows are rendered in virtualized mode: the rows are fetched
+    # lazily by the frontend code, and only the visible rows are added to the page.
+    virtual_rows_threshold = 500
+    # The maximum number of rows returned by a single request to the get_rows handler.
+    max_rows_per_request = 200
+    # The number of most common wrong answers per cell reported by the get_statistics handler, and
+    # the number of wrong answers per cell tracked to find them.
+    statistics_top_k = 5
+    statistics_capacity = 2 * statistics_top_k
+    # The backend rendering the HTML of the table: "python" for render_table_html() or "django" for
+    # the Django template templates/html/activetable.html.  Both produce identical output.
+    render_backend = 'python'
+    # The number of seconds clients and CDNs may cache the static table data served under a URL
+    # containing its ETag.  The data at such a URL never changes.
+    table_data_max_age = 365 * 24 * 60 * 60
+    # The content fields and their table key, as last computed by get_table_key().
+    _table_key_cache = (None, None)
+
     # Dictionary mapping cell ids to the student answers.
     answers = Dict(scope=Scope.user_state)
+    # Incremented whenever the stored answers change, so clients can track which state the server
+    # has acknowledged.
+    answers_version = Integer(scope=Scope.user_state, default=0)
+    # Bitset over the ordered response cells of the table indicating whether the cell was answered
+    # correctly at the last check, and the number of correct and total answers in the bitset.  Use
+    # get_answers_correct() to access the bitset as a dictionary.
+    answers_correct_bitset = String(scope=Scope.user_state, default=None)
+    answers_correct_count = Integer(scope=Scope.user_state)
+    answers_total_count = Integer(scope=Scope.user_state)
     # Dictionary mapping cell ids to Boolean values indicating whether the cell was answered
-    # correctly at the last check.
+    # correctly at the last check.  This is the old storage format, which is replaced by the
+    # bitset the next time the answers are checked or saved.
     answers_correct = Dict(scope=Scope.user_state, default=None)
+    # The values of the formula cells computed from the stored answers, and the key of the formulas
+    # they were computed with: {"key": <FormulaGraph.key>, "values": {<cell_id>: <value>, ...}}.
+    formula_values = Dict(scope=Scope.user_state, default=None)
     # The number of points awarded.
     score = Float(scope=Scope.user_state)
     # The number of attempts used.
     attempts = Integer(scope=Scope.user_state, default=0)
+    # The handler name and request key of the last processed request carrying a key (see
+    # idempotent()): {"handler": <handler name>, "key": <request key>}.
+    last_request = Dict(scope=Scope.user_state, default=None)
+    # The start time of the current rate limiting window of the save handler, and the number of
+    # writes in that window.
+    save_window_start = Float(scope=Scope.user_state)
+    save_window_count = Integer(scope=Scope.user_state, default=0)
+    # The per-cell answer statistics of all students and the key of the table they were collected
+    # for, as compact lists in answer key order (see activetable.answerstats).
+    answer_statistics = Dict(scope=Scope.user_state_summary, default=None)
 
     has_score = True
 
     @property
     def num_correct_answers(self):
         """The number of correct answers during the last check."""
+        if self.answers_correct_bitset is not None:
+            return self.answers_correct_count
         if self.answers_correct is None:
             return None
-        return sum(six.itervalues(self.answers_correct))
+        return sum(self.answers_correct.values())
 
     @property
     def num_total_answers(self):
         """The total number of answers during the last check."""
+        if self.answers_correct_bitset is not None:
+            return self.answers_total_count
         if self.answers_correct is None:
             return None
         return len(self.answers_correct)
 
-    def parse_fields(self):
-        """Parse the user-provided fields into more processing-friendly structured data."""
-        if self.content:
-            self.thead, self.tbody = parse_table(self.content)
+    @property
+    def attempts_exhausted(self):
+        """Whether the student has used all available attempts."""
+        return bool(self.max_attempts) and self.attempts >= self.max_attempts
+
+    def get_answers_correct(self):
+        """Return a dictionary mapping cell ids to the correctness at the last check, or None.
+
+        If the table definition has changed since the last check and the bitset doesn't match the
+        response cells anymore, None is returned.
+        """
+        if self.answers_correct_bitset is None:
+            return self.answers_correct
+        cell_ids = list(self.get_answer_key())
+        if len(cell_ids) != self.answers_total_count:
+            return None
+        return dict(zip(cell_ids, decode_bitset(self.answers_correct_bitset, len(cell_ids))))
+
+    def set_answers_correct(self, answers_correct):
+        """Store the dictionary returned by check_and_save_answers() as a bitset.
+
+        The dictionary must contain all response cells.  Passing None clears the stored results.
+        """
+        if answers_correct is None:
+            if self.answers_correct_bitset is not None:
+                self.answers_correct_bitset = None
+                self.answers_correct_count = self.answers_total_count = None
         else:
+            values = [answers_correct[cell_id] for cell_id in self.get_answer_key()]
+            self.answers_correct_bitset = encode_bitset(values)
+            self.answers_correct_count = sum(values)
+            self.answers_total_count = len(values)
+        if self.answers_correct is not None:
+            # Migrate from the old storage format.
+            del self.answers_correct
+
+    @property
+    def table_fields(self):
+        """The content fields the parsed table is derived from."""
+        return (
+            self.content, self.column_widths, self.row_heights, self.default_tolerance,
+            self.content_format,
+        )
+
+    def get_table_key(self):
+        """Return the tables.table_key() of the content fields.
+
+        Hashing a large table definition is expensive, so the key is only computed again after one
+        of the fields has changed.
+        """
+        fields = self.table_fields
+        cached_fields, key = self._table_key_cache
+        if cached_fields != fields:
+            key = tables.table_key(*fields)
+            self._table_key_cache = fields, key
+        return key
+
+    def get_table_template(self):
+        """Return the parsed table template from the process-wide cache, building it if needed."""
+        return tables.get_table_template(*self.table_fields, key=self.get_table_key())
+
+    def get_answer_key(self):
+        """Return the compiled answer key from the process-wide cache, compiling it if needed."""
+        return tables.get_answer_key(*self.table_fields, key=self.get_table_key())
+
+    @property
+    def table_size(self):
+        """A tuple with the number of cells and response cells, or (None, None) if it is invalid."""
+        if not self.content:
+            return None, None
+        try:
+            template = self.get_table_template()
+            answer_key = self.get_answer_key()
+        except ParseError:
+            return None, None
+        return len(template.tbody) * len(template.thead), len(answer_key)
+
+    @instrumented('parse_fields')
+    def parse_fields(self):
+        """Parse the user-provided fields into more processing-friendly structured data.
+
+        The parsed table is looked up in the process-wide cache first, so the table definition only
+        needs to be parsed once per process.
+        """
+        if not self.content:
             self.thead = self.tbody = None
             return
-        if self.column_widths:
-            self._column_widths = parse_number_list(self.column_widths)
-        else:
-            self._column_widths = [800 / len(self.thead)] * len(self.thead)
-        if self.row_heights:
-            self._row_heights = parse_number_list(self.row_heights)
-        else:
-            self._row_heights = [36] * (len(self.tbody) + 1)
+        self.thead, self.tbody, self._column_widths, self._row_heights = self.get_table_template()
+
+    @property
+    def is_virtual(self):
+        """Whether the table is rendered in virtualized mode."""
+        if not self.content:
+            return False
+        return len(self.get_table_template().tbody) >= self.virtual_rows_threshold
 
-    def postprocess_table(self):
+    @instrumented('postprocess_table')
+    def postprocess_table(self, answers=None):
         """Augment the parsed table definition with further information.
 
-        The additional information is taken from other content and student state fields.
+        The cached table template is shared with other blocks, so the response cells are copied
+        before the answers are added to them.  By default, the answers of the student are used.
         """
+        if answers is None:
+            answers = self.answers
         self.response_cells = {}
-        for row, height in zip(self.tbody, self._row_heights[1:]):
-            row['height'] = height
-            if row['index'] % 2:
-                row['class'] = 'even'
-            else:
-                row['class'] = 'odd'
-            for cell, cell.col_label in zip(row['cells'], self.thead):
-                cell.id = f"cell_{row['index']}_{cell.index}"
-                cell.classes = ''
+        if self.tbody is None:
+            return
+        tbody = []
+        for row in self.tbody:
+            cells = []
+            for cell in row.cells:
                 if not cell.is_static:
+                    cell = copy.copy(cell)
+                    cell.value = answers.get(cell.id)
                     self.response_cells[cell.id] = cell
-                    cell.classes = 'active'
-                    cell.value = self.answers.get(cell.id)
-                    cell.height = height - 2
-                    if isinstance(cell, NumericCell) and cell.abs_tolerance is None:
-                        cell.set_tolerance(self.default_tolerance)
+                cells.append(cell)
+            tbody.append(row.with_cells(cells))
+        self.tbody = tbody
 
     def get_status(self):
         """Status dictionary passed to the frontend code."""
         return dict(
-            answers_correct=self.answers_correct,
+            answers_correct=self.get_answers_correct(),
             num_correct_answers=self.num_correct_answers,
             num_total_answers=self.num_total_answers,
             score=self.score,
             maximum_score=self.maximum_score,
             attempts=self.attempts,
             max_attempts=self.max_attempts,
+            answers_version=self.answers_version,
         )
 
-    def student_view(self, context=None):
-        """Render the table."""
+    @instrumented('render_table')
+    def render_table(self, answers=None):
+        """Render the HTML of the table with the given answers using the render backend."""
         self.parse_fields()
-        self.postprocess_table()
-
+        self.postprocess_table(answers)
+        virtual = self.is_virtual
         context = dict(
             help_text=self.help_text,
             total_width=sum(self._column_widths) if self._column_widths else None,
             column_widths=self._column_widths,
             head_height=self._row_heights[0] if self._row_heights else None,
             thead=self.thead,
-            tbody=self.tbody,
+            # In virtualized mode, the rows are added by the frontend code.
+            tbody=() if virtual else self.tbody,
             max_attempts=self.max_attempts,
+            virtual=virtual,
         )
-        html = loader.render_django_template('templates/html/activetable.html', context)
+        if self.render_backend == 'django':
+            return loader.render_django_template('templates/html/activetable.html', context)
+        return render_table_html(context)
+
+    def build_html_skeleton(self):
+        """Render the table with markers in place of the answers and split it into a skeleton."""
+        if self.content and not self.is_virtual:
+            cell_ids = list(self.get_answer_key())
+        else:
+            cell_ids = []
+        return TableSkeleton.build(self.render_table, cell_ids)
+
+    def get_html_skeleton(self):
+        """Return the TableSkeleton for this block from the process-wide cache.
+
+        Static cell values are localized, so the skeleton depends on the active language.
+        """
+        key = content_hash(
+            self.get_table_key(), self.help_text, self.max_attempts, translation.get_language()
+        )
+        return skeleton_cache.get_or_create(key, self.build_html_skeleton)
+
+    @instrumented('student_view')
+    def student_view(self, context=None):  # pylint: disable=unused-argument
+        """Render the table."""
+        html = self.get_html_skeleton().fill(self.answers)
 
-        css_context = dict(
+        css = render_css(
             correct_icon=self.runtime.local_resource_url(self, 'public/img/correct-icon.png'),
             incorrect_icon=self.runtime.local_resource_url(self, 'public/img/incorrect-icon.png'),
             unanswered_icon=self.runtime.local_resource_url(self, 'public/img/unanswered-icon.png'),
         )
-        css = loader.render_django_template('templates/css/activetable.css', css_context)
 
         frag = Fragment(html)
         frag.add_css(css)
-        frag.add_javascript(loader.load_unicode('static/js/src/activetable.js'))
-        frag.initialize_js('ActiveTableXBlock', self.get_status())
+        frag.add_javascript(load_javascript())
+        init_args = self.get_status()
+        init_args['autosave_interval'] = self.autosave_interval
+        if self.is_virtual:
+            template = self.get_table_template()
+            init_args.update(
+                virtual=True,
+                answers=self.answers,
+                row_heights=[row.height for row in template.tbody],
+            )
+        frag.initialize_js('ActiveTableXBlock', init_args)
         return frag
 
+    def get_table_data(self):
+        """Return the TableData for this block from the process-wide cache.
+
+        The key, which is also the ETag, covers the serialization format and the active language,
+        since static cell values are localized.
+        """
+        key = content_hash(
+            TABLE_DATA_FORMAT_VERSION, self.get_table_key(), self.help_text,
+            translation.get_language(),
+        )
+        return table_data_cache.get_or_create(key, lambda: TableData.build(
+            key, self.get_table_template() if self.content else None, self.help_text
+        ))
+
+    def get_student_data(self):
+        """Return the per-student part of the JSON representation: the answers and the status."""
+        data = self.get_status()
+        data['answers'] = self.answers
+        return data
+
+    def student_view_data(self, context=None):  # pylint: disable=unused-argument
+        """Return the JSON representation of the table for mobile and headless clients.
+
+        The static part of the table isn't included, so repeat visitors don't download it again.
+        It is served by the get_table handler at table_url and only changes if table_etag does.
+        """
+        table_data = self.get_table_data()
+        data = self.get_student_data()
+        data.update(
+            table_etag=table_data.etag,
+            table_url=self.runtime.handler_url(self, 'get_table', table_data.etag),
+        )
+        return data
+
+    @XBlock.handler
+    def get_table(self, request, suffix=''):
+        """Return the static part of the JSON representation of the table.
+
+        Responses carry the ETag of the table, and requests with a matching If-None-Match header
+        get an empty 304 response.  If the suffix is the current ETag, as in the table_url returned
+        by student_view_data(), the response may be cached for table_data_max_age seconds;
+        otherwise, it has to be revalidated before it is reused.
+        """
+        table_data = self.get_table_data()
+        if table_data.etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = Response(
+                body=table_data.body, content_type='application/json', charset='utf-8'
+            )
+        response.etag = table_data.etag
+        if suffix == table_data.etag:
+            response.cache_control = f'public, max-age={self.table_data_max_age}, immutable'
+        else:
+            response.cache_control = 'public, no-cache'
+        return response
+
+    @XBlock.json_handler
+    def get_student_state(self, data, unused_suffix=''):  # pylint: disable=unused-argument
+        """Return the per-student part of the JSON representation of the table."""
+        return self.get_student_data()
+
+    @instrumented('check_and_save_answers')
     def check_and_save_answers(self, data):
-        """Common implementation for the check and save handlers."""
-        if self.max_attempts and self.attempts >= self.max_attempts:
-            # The "Check" button is hidden when the maximum number of attempts has been reached, so
-            # we can only get here by manually crafted requests.  We simply return the current
-            # status without rechecking or storing the answers in that case.
-            return self.get_status()
-        self.parse_fields()
-        self.postprocess_table()
-        answers_correct = {
-            cell_id: self.response_cells[cell_id].check_response(value)
-            for cell_id, value in six.iteritems(data)
-        }
+        """Common implementation for the check and save handlers.
+
+        The data is either a dictionary mapping all cell ids to the answers, or a delta of the form
+        {"version": <answers_version>, "changes": {<cell_id>: <answer>, ...}} containing only the
+        cells that changed since the client's last acknowledged save.  Deltas are merged into the
+        stored answers cell by cell; the handlers reject deltas based on outdated answers before
+        calling this method (see get_conflict_status()).  The stored answers are only written if
+        they actually change.
+        """
+        answer_key = self.get_answer_key()
+        if 'changes' in data:
+            changes = data['changes']
+            # Stored answers to cells removed from the table definition are dropped.
+            answers = {
+                cell_id: value for cell_id, value in self.answers.items() if cell_id in answer_key
+            }
+            answers.update(changes)
+        else:
+            changes = answers = data
+        for cell_id in changes:
+            if cell_id not in answer_key:
+                raise KeyError(cell_id)
+        formula_values = self.evaluate_formulas(answer_key, answers)
+        # All response cells are graded, since clients in virtualized mode only send the answers
+        # of the cells the student has filled in.
+        answers_correct = grade_all(answer_key, answers, formula_values)
         # Since the previous statement executed without error, the data is well-formed enough to be
         # stored.  We now know it's a dictionary and all the keys are valid cell ids.
-        self.answers = data
+        if answers != self.answers:
+            self.answers = answers
+            self.answers_version += 1
+        if formula_values is not None:
+            stored = dict(key=answer_key.formulas.key, values=formula_values)
+            if stored != self.formula_values:
+                self.formula_values = stored
         return answers_correct
 
+    def evaluate_formulas(self, answer_key, answers):
+        """Return the values of the formula cells for the answers, or None if there are none.
+
+        Only the formulas downstream of the answers that differ from the stored answers are
+        evaluated again; the values of all other formulas are taken from the stored values.
+        """
+        formulas = answer_key.formulas
+        if formulas is None:
+            return None
+        stored = self.formula_values
+        if not stored or stored.get('key') != formulas.key:
+            return formulas.evaluate(answers)
+        old_answers = self.answers
+        changed = [
+            cell_id for cell_id in answers.keys() | old_answers.keys()
+            if answers.get(cell_id) != old_answers.get(cell_id)
+        ]
+        return formulas.evaluate(answers, stored['values'], changed)
+
+    def get_conflict_status(self, data):
+        """Return the status for a delta based on outdated answers, or None if it is current.
+
+        If the version of a delta doesn't match answers_version, the stored answers have been
+        changed by another client since the client's last acknowledged save, and the cells the
+        delta omits may differ from the answers the student sees.  Such deltas are rejected; the
+        status returned has conflict set and contains the stored answers, so the client can send
+        its answers again relative to them.  Deltas without a version are always accepted.
+        """
+        if not isinstance(data, dict) or 'changes' not in data:
+            return None
+        if data.get('version', self.answers_version) == self.answers_version:
+            return None
+        status = self.get_status()
+        status.update(conflict=True, answers=self.answers)
+        return status
+
     @XBlock.json_handler
+    @idempotent
     def check_answers(self, data, unused_suffix=''):
         """Check the answers given by the student.
 
-        This handler is called when the "Check" button is clicked.
+        This handler is called when the "Check" button is clicked.  A grade event is only published
+        if the score changes.
         """
-        self.answers_correct = self.check_and_save_answers(data)
+        if self.attempts_exhausted:
+            # The "Check" button is hidden when the maximum number of attempts has been reached, so
+            # we can only get here by manually crafted requests.  We simply return the current
+            # status without rechecking or storing the answers in that case.
+            return self.get_status()
+        conflict_status = self.get_conflict_status(data)
+        if conflict_status is not None:
+            return conflict_status
+        answers_correct = self.check_and_save_answers(data)
+        self.set_answers_correct(answers_correct)
+        self.record_statistics(answers_correct)
         self.attempts += 1
-        self.score = self.num_correct_answers * self.maximum_score / len(self.answers_correct)
-        self.runtime.publish(self, 'grade', dict(value=self.score, max_value=self.maximum_score))
+        score = compute_score(answers_correct, self.maximum_score)
+        if score != self.score:
+            self.score = score
+            self.runtime.publish(self, 'grade', dict(value=score, max_value=self.maximum_score))
+        else:
+            counters.increment('unchanged_grades')
         return self.get_status()
 
+    def record_statistics(self, answers_correct):
+        """Add the graded answers of a check to the answer statistics of all students.
+
+        The statistics are reset when the table definition changes.  Concurrent checks by
+        different students may overwrite each other's updates, so the counts are approximate.
+        """
+        cell_ids = list(self.get_answer_key())
+        statistics = self.get_current_statistics()
+        if statistics is None:
+            statistics = new_statistics(self.get_table_key(), len(cell_ids))
+        record_check(statistics, cell_ids, self.answers, answers_correct, self.statistics_capacity)
+        self.answer_statistics = statistics
+
+    def get_current_statistics(self):
+        """Return the stored answer statistics, or None if they belong to another table."""
+        statistics = self.answer_statistics
+        if (not statistics or 'checks' not in statistics
+                or statistics.get('key') != self.get_table_key()):
+            return None
+        return statistics
+
+    @XBlock.json_handler
+    def get_statistics(self, data, unused_suffix=''):  # pylint: disable=unused-argument
+        """Return the answer statistics of all response cells; only available to course staff."""
+        if not getattr(self.runtime, 'user_is_staff', False):
+            raise JsonHandlerError(403, 'Only course staff can view the answer statistics.')
+        return dict(cells=summarize(
+            self.get_current_statistics(), list(self.get_answer_key()), self.statistics_top_k
+        ))
+
     @XBlock.json_handler
+    @idempotent
     def save_answers(self, data, unused_suffix=''):
-        """Save the answers given by the student without checking them."""
+        """Save the answers given by the student without checking them.
+
+        At most max_saves_per_minute writes are accepted per minute.  Requests exceeding the limit
+        are rejected without storing anything, and the status returned has rate_limited set.
+        """
+        if self.attempts_exhausted:
+            return self.get_status()
+        conflict_status = self.get_conflict_status(data)
+        if conflict_status is not None:
+            return conflict_status
+        now = time.time()
+        new_window = self.save_window_start is None or now - self.save_window_start >= 60
+        if not new_window and self.save_window_count >= self.max_saves_per_minute:
+            status = self.get_status()
+            status['rate_limited'] = True
+            return status
+        answers_version = self.answers_version
         self.check_and_save_answers(data)
-        self.answers_correct = None
+        if self.answers_version != answers_version:
+            # Only requests that actually wrote the answers count towards the limit.
+            if new_window:
+                self.save_window_start = now
+                self.save_window_count = 1
+            else:
+                self.save_window_count += 1
+        self.set_answers_correct(None)
         return self.get_status()
 
+    @XBlock.json_handler
+    def get_rows(self, data, unused_suffix=''):
+        """Return a range of rows of the table for the virtualized mode.
+
+        The data contains the index of the first row and the number of rows to return.  The rows
+        don't contain any student state; the frontend code adds the answers itself.
+        """
+        if not isinstance(data, dict):
+            raise JsonHandlerError(400, 'Invalid row range.')
+        try:
+            start = max(int(data.get('start', 0)), 0)
+            count = min(max(int(data.get('count', 0)), 0), self.max_rows_per_request)
+        except (TypeError, ValueError, OverflowError) as exc:
+            raise JsonHandlerError(400, 'Invalid row range.') from exc
+        if not self.content:
+            return dict(start=start, num_rows=0, rows=[])
+        tbody = self.get_table_template().tbody
+        return dict(
+            start=start,
+            num_rows=len(tbody),
+            rows=[serialize_row(row) for row in tbody[start:start + count]],
+        )
+
     def validate_field_data(self, validation, data):
         """Validate the data entered by the user.
 
@@ -255,10 +718,11 @@ class ActiveTableXBlock(StudioEditableXBlockMixin, XBlock):
             """Add a validation error."""
             validation.add(ValidationMessage(ValidationMessage.ERROR, msg))
         try:
-            thead, tbody = parse_table(data.content)
+            thead, tbody = read_table(data.content, data.content_format)
         except ParseError as exc:
             add_error('Problem with table definition: ' + exc.message)
             thead = tbody = None
+        column_widths = row_heights = None
         if data.column_widths:
             try:
                 column_widths = parse_number_list(data.column_widths)
@@ -281,6 +745,18 @@ class ActiveTableXBlock(StudioEditableXBlockMixin, XBlock):
                         'The number of list entries in the Row heights field must match the number '
                         'of rows in the table.'
                     )
+        if data.autosave_interval is not None and data.autosave_interval < 1:
+            add_error('The Autosave interval must be at least one second.')
+        if validation and thead is not None:
+            # Make the parsed table available to the student view, so it isn't parsed again by
+            # every process when the first students load the problem.
+            tables.store_table_template(
+                (data.content, data.column_widths, data.row_heights, data.default_tolerance,
+                 data.content_format),
+                tables.assemble_table_template(
+                    thead, tbody, column_widths, row_heights, data.default_tolerance
+                ),
+            )
 
     @staticmethod
     def workbench_scenarios():
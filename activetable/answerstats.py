@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Per-cell answer statistics, updated incrementally each time a student checks their answers.
+
+The statistics of a table are stored as a compact JSON-serializable dictionary.  The counters are
+lists indexed by the position of the response cells in the answer key:
+
+    {"key": <table key>, "checks": 12, "correct": [9, 4, ...],
+     "wrong": [[["1788", 2, 0], ...], [], ...]}
+
+Every check grades all response cells, so the number of attempts of each cell is the number of
+checks, and the number of incorrect answers is the number of checks minus the correct ones.
+
+The most common wrong answers are tracked with the Space-Saving algorithm, which keeps at most a
+fixed number of counters per cell.  Each counter holds the answer, its estimated count and the
+maximum overestimation of that count.  Every answer occurring more often than the number of wrong
+answers divided by the number of counters is guaranteed to be tracked.
+
+Reading the statistics only needs the stored counters, so dashboards never have to scan the state
+of all students.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+# Wrong answers are truncated to this length, so long answers can't bloat the statistics.
+MAX_ANSWER_LENGTH = 32
+
+
+def new_statistics(key, num_cells):
+    """Return empty statistics for a table with the given key and number of response cells."""
+    return dict(key=key, checks=0, correct=[0] * num_cells, wrong=[[] for _ in range(num_cells)])
+
+
+def space_saving_update(counters, item, capacity):
+    """Count an occurrence of item in the Space-Saving counters, a list of [item, count, error].
+
+    If there is no counter for the item and all capacity counters are in use, the counter with the
+    smallest count is reassigned to the item.
+    """
+    for counter in counters:
+        if counter[0] == item:
+            counter[1] += 1
+            return
+    if len(counters) < capacity:
+        counters.append([item, 1, 0])
+    else:
+        smallest = min(counters, key=lambda counter: counter[1])
+        smallest[:] = [item, smallest[1] + 1, smallest[1]]
+
+
+def record_check(statistics, cell_ids, answers, answers_correct, capacity):
+    """Update the statistics in place with the graded answers of a single check.
+
+    The cell ids are the response cells in answer key order, and the answers_correct dictionary
+    must contain all of them.  Empty answers count as incorrect, but are not tracked as wrong
+    answers.
+    """
+    statistics['checks'] += 1
+    correct_counts = statistics['correct']
+    wrong_answers = statistics['wrong']
+    for index, cell_id in enumerate(cell_ids):
+        if answers_correct[cell_id]:
+            correct_counts[index] += 1
+            continue
+        answer = str(answers.get(cell_id) or '').strip()[:MAX_ANSWER_LENGTH]
+        if answer:
+            space_saving_update(wrong_answers[index], answer, capacity)
+
+
+def summarize(statistics, cell_ids, top_k):
+    """Return a list with the statistics of the given cells, in the order of the cell ids.
+
+    The statistics are None if no answers have been checked yet.  Each entry contains the cell id,
+    the attempts, correct and incorrect counts, and the top_k most common wrong answers with their
+    estimated counts, most common first.
+    """
+    if statistics is None:
+        statistics = new_statistics(None, len(cell_ids))
+    checks = statistics['checks']
+    summary = []
+    for cell_id, correct, counters in zip(cell_ids, statistics['correct'], statistics['wrong']):
+        wrong_answers = sorted(counters, key=lambda counter: (-counter[1], counter[0]))[:top_k]
+        summary.append(dict(
+            id=cell_id,
+            attempts=checks,
+            correct=correct,
+            incorrect=checks - correct,
+            top_wrong_answers=[
+                dict(answer=answer, count=count) for answer, count, _error in wrong_answers
+            ],
+        ))
+    return summary
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Process-wide caches for data derived from the content fields of a block.
+
+Many students see the same few table definitions, so everything that only depends on the content
+fields is computed once per process and shared between all blocks with identical content.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+def content_hash(*parts):
+    """Return a stable hex digest identifying the given JSON-serializable values."""
+    serialized = json.dumps(parts, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(serialized.encode('utf-8')).hexdigest()
+
+
+class LRUCache:
+    """A thread-safe mapping holding at most maxsize entries.
+
+    When the cache is full, the least recently used entry is evicted.  The cache keeps hit, miss and
+    eviction counters so it can be sized according to the actual workload.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """Return the value for key and mark it as recently used, or default if it is missing."""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store value under key, evicting the least recently used entry if necessary."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_create(self, key, factory):
+        """Return the value for key, calling factory() to create and store it on a miss.
+
+        The factory is called without holding the lock, so concurrent misses for the same key may
+        compute the value more than once.  Exceptions raised by the factory are propagated and
+        nothing is stored.
+        """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def items(self):
+        """Return a list of all (key, value) pairs, from least to most recently used."""
+        with self._lock:
+            return list(self._data.items())
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Return a dictionary with the current size and the hit, miss and eviction counters."""
+        return dict(
+            size=len(self._data),
+            maxsize=self.maxsize,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+        )
@@ -1,28 +1,58 @@
 # -*- coding: utf-8 -*-
-"""Classes representing table cells.
+"""Classes representing table cells and rows.
 
-These classes are used mainly as namespaces to dump all data associated with a cell.  There is no
-expectation that all attributes are set in __init__() or that attributes are controlled byt the
-classes themselves.
+Parsed tables are cached per process and can be large, so cells and rows use __slots__ instead of
+an instance dictionary.  Information that is the same for all cells of a row or column, like the
+height of the input elements or the CSS classes, is stored on the row or the class instead of on
+each cell.
 """
 from __future__ import absolute_import, division, unicode_literals
 
-import decimal
+import re
+from collections import namedtuple
+
+
+_UNSET = object()
+
+
+def _slot_values(obj):
+    """Return the values of all slots of obj, using a marker for unset slots."""
+    return [
+        getattr(obj, name, _UNSET)
+        for cls in type(obj).__mro__
+        for name in cls.__dict__.get('__slots__', ())
+    ]
 
 
 class Cell:
-    """Abstract base class for all cells."""
+    """Abstract base class for all cells.
+
+    The index is the column index of the cell, and row_index the index of its row.  Both are set by
+    the parser, and the cell id is derived from them.
+    """
+
+    __slots__ = ('index', 'row_index', 'col_label', 'value')
 
     is_static = False
+    classes = ''
+
+    @property
+    def id(self):  # pylint: disable=invalid-name
+        """The id of the cell, which is also used as the key of the answer dictionaries."""
+        return f'cell_{self.row_index}_{self.index}'
 
     def __eq__(self, other):
         """Test for equality based on type and attribute values."""
-        return isinstance(self, type(other)) and vars(self) == vars(other)
+        return isinstance(self, type(other)) and _slot_values(self) == _slot_values(other)
+
+    __hash__ = None
 
 
 class StaticCell(Cell):
     """A static cell with a fixed value in the table body."""
 
+    __slots__ = ()
+
     is_static = True
 
     def __init__(self, value):
@@ -32,12 +62,17 @@ class StaticCell(Cell):
 class NumericCell(Cell):
     """A numeric response cell."""
 
+    __slots__ = ('answer', 'abs_tolerance', 'min_significant_digits', 'max_significant_digits')
+
+    cell_type = 'Numeric'
+    classes = 'active'
     placeholder = 'numeric response'
 
     def __init__(self, answer, tolerance=None,
                  min_significant_digits=None, max_significant_digits=None):
         """Set the correct answer and the allowed relative tolerance in percent."""
         self.answer = answer
+        self.value = None
         self.abs_tolerance = None
         self.set_tolerance(tolerance)
         self.min_significant_digits = min_significant_digits
@@ -48,30 +83,166 @@ class NumericCell(Cell):
         if tolerance is not None:
             self.abs_tolerance = abs(self.answer) * tolerance / 100.0
 
+    def checker(self):
+        """Return a compact record containing all information needed to check responses."""
+        return NumericChecker(
+            self.answer - self.abs_tolerance,
+            self.answer + self.abs_tolerance,
+            self.min_significant_digits,
+            self.max_significant_digits,
+        )
+
+    def check_response(self, student_response):
+        """Return a Boolean value indicating whether the student response is correct."""
+        return self.checker().check(student_response)
+
+
+class TextCell(Cell):
+    """A string response cell.
+
+    A response is correct if it equals the answer or one of the alternative answers, or if it
+    matches the regular expression.  Leading and trailing whitespace is always ignored; differences
+    in case and runs of inner whitespace are ignored if requested.
+    """
+
+    __slots__ = ('answer', 'answers', 'regex', 'case_sensitive', 'collapse_whitespace')
+
+    cell_type = 'Text'
+    classes = 'active'
+    placeholder = 'text response'
+
+    def __init__(self, answer=None, answers=None, regex=None,  # pylint: disable=too-many-arguments
+                 case_sensitive=True, collapse_whitespace=False):
+        """Set the correct answers and the comparison options."""
+        if answer is None and not answers and regex is None:
+            raise ValueError('Text cells need an answer, a list of answers or a regex.')
+        if regex is not None:
+            try:
+                re.compile(regex)
+            except re.error as exc:
+                raise ValueError(f'invalid regular expression: {exc}') from exc
+        self.answer = answer
+        self.answers = tuple(answers or ())
+        self.regex = regex
+        self.case_sensitive = case_sensitive
+        self.collapse_whitespace = collapse_whitespace
+        self.value = None
+
+    def checker(self):
+        """Return a compact record containing all information needed to check responses."""
+        answers = self.answers if self.answer is None else (self.answer,) + self.answers
+        pattern = None
+        if self.regex is not None:
+            pattern = re.compile(self.regex, 0 if self.case_sensitive else re.IGNORECASE)
+        return TextChecker(
+            frozenset(
+                normalize_text(answer, self.case_sensitive, self.collapse_whitespace)
+                for answer in answers
+            ),
+            pattern,
+            self.case_sensitive,
+            self.collapse_whitespace,
+        )
+
     def check_response(self, student_response):
+        """Return a Boolean value indicating whether the student response is correct."""
+        return self.checker().check(student_response)
+
+
+class Row:
+    """A row of the table body.
+
+    The height is the height of the row in pixels, and css_class the CSS class of the tr element.
+    Both are set when the table template is built.
+    """
+
+    __slots__ = ('index', 'cells', 'height', 'css_class')
+
+    def __init__(self, index, cells, height=None, css_class=None):
+        self.index = index
+        self.cells = cells
+        self.height = height
+        self.css_class = css_class
+
+    @property
+    def input_height(self):
+        """The height of the input elements of the response cells in this row."""
+        return self.height - 2
+
+    def with_cells(self, cells):
+        """Return a copy of this row with the given cells."""
+        return Row(self.index, cells, self.height, self.css_class)
+
+    def __eq__(self, other):
+        """Test for equality based on type and attribute values."""
+        return isinstance(self, type(other)) and _slot_values(self) == _slot_values(other)
+
+    __hash__ = None
+
+
+def count_significant_digits(number):
+    """Return the number of significant digits of a string accepted by float().
+
+    Significant digits are counted from the first non-zero digit of the mantissa, and include all
+    trailing zeros, e.g. "0.0050" has two significant digits, "100" and "1.00e2" have three.  The
+    sign and the exponent are ignored.  Zero has one significant digit, no matter how many zeros
+    are written.  Infinity and NaN have no significant digits.  The result is the same as the number
+    of digits of the corresponding decimal.Decimal, except for infinity.
+    """
+    mantissa = number.strip().lstrip('+-').partition('e')[0].partition('E')[0]
+    if any(char >= '\x80' for char in mantissa):
+        # float() accepts decimal digits of all scripts.
+        mantissa = ''.join(str(int(char)) if char.isdecimal() else char for char in mantissa)
+    digits = mantissa.replace('.', '').replace('_', '')
+    if not digits.isdecimal():
+        return 0
+    return len(digits.lstrip('0')) or 1
+
+
+class NumericChecker(namedtuple(
+        'NumericChecker', 'lower upper min_significant_digits max_significant_digits')):
+    """The compiled form of a NumericCell with precomputed bounds for the correct answer."""
+
+    __slots__ = ()
+
+    def check(self, student_response):
         """Return a Boolean value indicating whether the student response is correct."""
         try:
             value = float(student_response)
-        except ValueError:
+        except (TypeError, ValueError):
             return False
         if self.min_significant_digits or self.max_significant_digits:
-            digits = len(decimal.Decimal(student_response).as_tuple().digits)
+            # Clients may send JSON numbers instead of strings.
+            digits = count_significant_digits(str(student_response))
             if self.min_significant_digits and digits < self.min_significant_digits:
                 return False
             if self.max_significant_digits and digits > self.max_significant_digits:
                 return False
-        return abs(value - self.answer) <= self.abs_tolerance
+        return self.lower <= value <= self.upper
 
 
-class TextCell(Cell):
-    """A string response cell."""
+def normalize_text(text, case_sensitive=True, collapse_whitespace=False):
+    """Return the text in the form used to compare text responses with the correct answers."""
+    text = ' '.join(text.split()) if collapse_whitespace else text.strip()
+    return text if case_sensitive else text.casefold()
 
-    placeholder = 'text response'
 
-    def __init__(self, answer):
-        """Set the correct answer."""
-        self.answer = answer
+class TextChecker(namedtuple(
+        'TextChecker', 'answers pattern case_sensitive collapse_whitespace')):
+    """The compiled form of a TextCell.
 
-    def check_response(self, student_response):
+    The answers are a frozenset of normalized correct answers, and the pattern is the compiled
+    regular expression, or None.
+    """
+
+    __slots__ = ()
+
+    def check(self, student_response):
         """Return a Boolean value indicating whether the student response is correct."""
-        return student_response.strip() == self.answer.strip()
+        if self.collapse_whitespace:
+            response = ' '.join(student_response.split())
+        else:
+            response = student_response.strip()
+        if (response if self.case_sensitive else response.casefold()) in self.answers:
+            return True
+        return self.pattern is not None and self.pattern.fullmatch(response) is not None
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""Streaming export of the stored student answers and results of a table.
+
+Records are streamed from a source (see activetable.userstate), flattened against the ordered
+response cells of the table and written to the output one at a time, so memory use does not
+depend on the number of records.  The export can be written as CSV, with one column for the answer
+and one for the correctness of each response cell, or as JSONL, with one JSON object per student.
+
+The module can be run as a script:
+
+    python -m activetable.export --content table.txt --format csv answers.jsonl export.csv
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import argparse
+import contextlib
+import csv
+import json
+import logging
+import sys
+
+from .tables import add_content_arguments, load_answer_key
+from .userstate import JsonlUserStateSource, decode_bitset
+
+log = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+
+def decode_answers_correct(record, cell_ids):
+    """Return a list with the correctness of the answers to the cells at the last check, or None.
+
+    Both the bitset and the old dictionary storage format are understood.  If the student never
+    checked their answers, or the table has changed since the last check, None is returned.
+    """
+    bitset = record.get('answers_correct_bitset')
+    if bitset is not None:
+        if record.get('answers_total_count') != len(cell_ids):
+            return None
+        return decode_bitset(bitset, len(cell_ids))
+    answers_correct = record.get('answers_correct')
+    if answers_correct is None:
+        return None
+    return [answers_correct.get(cell_id) for cell_id in cell_ids]
+
+
+def flatten_records(records, cell_ids):
+    """Yield one flat dictionary per record with the answers in the order of the cell ids.
+
+    The dictionaries contain the keys "user", "score", "attempts", "answers" and
+    "answers_correct".  The answers are a list with None for unanswered cells, and answers_correct
+    is the list returned by decode_answers_correct().
+    """
+    for record in records:
+        answers = record.get('answers') or {}
+        yield dict(
+            user=record['user'],
+            score=record.get('score'),
+            attempts=record.get('attempts', 0),
+            answers=[answers.get(cell_id) for cell_id in cell_ids],
+            answers_correct=decode_answers_correct(record, cell_ids),
+        )
+
+
+def write_csv(rows, output, cell_ids):
+    """Write the flattened records to a CSV file, returning the number of rows written.
+
+    Each response cell has a column with the answer and a column with its correctness, which is
+    empty if it is unknown.
+    """
+    writer = csv.writer(output)
+    writer.writerow(['user', 'score', 'attempts'] + [
+        column for cell_id in cell_ids for column in (cell_id, f'{cell_id}_correct')
+    ])
+    count = 0
+    for row in rows:
+        answers_correct = row['answers_correct'] or [None] * len(cell_ids)
+        writer.writerow([row['user'], row['score'], row['attempts']] + [
+            value for answer, correct in zip(row['answers'], answers_correct)
+            for value in (answer, correct)
+        ])
+        count += 1
+    return count
+
+
+def write_jsonl(rows, output, cell_ids):
+    """Write the flattened records as JSON objects, returning the number of records written.
+
+    The answers and their correctness are written as objects mapping the cell ids to the values.
+    """
+    count = 0
+    for row in rows:
+        answers_correct = row['answers_correct']
+        if answers_correct is not None:
+            answers_correct = dict(zip(cell_ids, answers_correct))
+        output.write(json.dumps(dict(
+            user=row['user'],
+            score=row['score'],
+            attempts=row['attempts'],
+            answers=dict(zip(cell_ids, row['answers'])),
+            answers_correct=answers_correct,
+        )) + '\n')
+        count += 1
+    return count
+
+
+WRITERS = dict(csv=write_csv, jsonl=write_jsonl)
+
+
+def export(answer_key, records, output, export_format='csv'):
+    """Write the records in the given format, one of EXPORT_FORMATS, to the output file.
+
+    Returns the number of records written.
+    """
+    cell_ids = list(answer_key)
+    return WRITERS[export_format](flatten_records(records, cell_ids), output, cell_ids)
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(
+        description='Export the stored ActiveTable answers and results of all students.'
+    )
+    parser.add_argument('source', help='JSONL file with one user state record per line')
+    parser.add_argument('output', help='file the export is written to, or -')
+    add_content_arguments(parser)
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv',
+                        help='the format of the export')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    answer_key = load_answer_key(args)
+    with contextlib.ExitStack() as stack:
+        if args.output == '-':
+            output = sys.stdout
+        else:
+            output = stack.enter_context(open(args.output, 'w', encoding='utf-8', newline=''))
+        count = export(answer_key, JsonlUserStateSource(args.source), output, args.format)
+    log.info('%d records exported', count)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""Formula response cells, whose correct answer is computed from other cells of the table.
+
+The expression of a formula cell refers to other cells by their ids, e.g.
+
+    Formula(expr='cell_1_1 * cell_2_1', tolerance=1)
+
+Expressions are parsed with the ast module and only arithmetic operators, numbers, cell ids and the
+functions and constants in FUNCTIONS are accepted.  Referenced cells must be numeric static cells,
+Numeric cells or other formula cells.  Numeric cells contribute the value entered by the student,
+and formula cells the value computed from their own expression, so the formulas of a table form a
+dependency graph, which must not contain cycles.
+
+The FormulaGraph of a table is built once per process together with the answer key.  It evaluates
+the formulas in topological order, and after a change of some student answers it only re-evaluates
+the formulas downstream of the changed cells.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import ast
+import math
+import numbers
+import re
+import sys
+from collections import namedtuple
+
+from .cache import content_hash
+from .cells import Cell, NumericCell, NumericChecker, StaticCell
+
+_CELL_ID_PATTERN = re.compile(r'cell_\d+_\d+')
+
+# The functions and constants that can be used in expressions.
+FUNCTIONS = dict(
+    abs=abs,
+    min=min,
+    max=max,
+    sqrt=math.sqrt,
+    exp=math.exp,
+    log=math.log,
+    log10=math.log10,
+    sin=math.sin,
+    cos=math.cos,
+    tan=math.tan,
+    asin=math.asin,
+    acos=math.acos,
+    atan=math.atan,
+    pi=math.pi,
+    e=math.e,
+)
+
+_OPERATORS = (
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod, ast.Pow, ast.UAdd, ast.USub, ast.Load,
+)
+
+
+def parse_expression(expr):
+    """Parse and validate the expression, returning its AST and the referenced cell ids.
+
+    A ValueError is raised if the expression is invalid.  Integer constants are converted to
+    floats, so huge powers overflow instead of taking forever to compute.
+    """
+    try:
+        tree = ast.parse(expr.strip(), mode='eval')
+    except SyntaxError as exc:
+        raise ValueError(f'invalid formula: {expr}') from exc
+    names = []
+    for node in ast.walk(tree):
+        if sys.version_info < (3, 8) and isinstance(node, ast.Num):
+            # Before Python 3.8, numbers are parsed as ast.Num instead of ast.Constant.
+            if not isinstance(node.n, numbers.Real):
+                raise ValueError(f'invalid constant in formula: {expr}')
+            node.n = float(node.n)
+        elif isinstance(node, ast.Constant):
+            if not isinstance(node.value, numbers.Real) or isinstance(node.value, bool):
+                raise ValueError(f'invalid constant in formula: {expr}')
+            node.value = float(node.value)
+        elif isinstance(node, ast.Name):
+            if _CELL_ID_PATTERN.fullmatch(node.id):
+                names.append(node)
+            elif node.id not in FUNCTIONS:
+                raise ValueError(f'unknown name in formula: {node.id}')
+        elif isinstance(node, ast.Call):
+            if (not isinstance(node.func, ast.Name) or not callable(FUNCTIONS.get(node.func.id))
+                    or node.keywords):
+                raise ValueError(f'invalid function call in formula: {expr}')
+        elif not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp) + _OPERATORS):
+            raise ValueError(f'invalid formula: {expr}')
+    # Return the references in source order without duplicates.
+    names.sort(key=lambda node: (node.lineno, node.col_offset))
+    return tree, tuple(dict.fromkeys(node.id for node in names))
+
+
+class FormulaCell(Cell):
+    """A numeric response cell with an answer computed from other cells."""
+
+    __slots__ = ('expr', 'references', 'tolerance', 'min_significant_digits',
+                 'max_significant_digits')
+
+    cell_type = 'Formula'
+    classes = 'active'
+    placeholder = 'numeric response'
+
+    def __init__(self, expr, tolerance=None,
+                 min_significant_digits=None, max_significant_digits=None):
+        """Set the expression and the allowed relative tolerance in percent."""
+        self.expr = expr
+        self.references = parse_expression(expr)[1]
+        self.tolerance = tolerance
+        self.min_significant_digits = min_significant_digits
+        self.max_significant_digits = max_significant_digits
+        self.value = None
+
+    def set_tolerance(self, tolerance):
+        """Set the tolerance to the specified value, if it is not None."""
+        if tolerance is not None:
+            self.tolerance = tolerance
+
+    def checker(self):
+        """Return a compact record containing all information needed to check responses."""
+        return FormulaChecker(
+            self.tolerance, self.min_significant_digits, self.max_significant_digits
+        )
+
+    def check_response(self, student_response, expected):
+        """Return whether the student response is correct given the computed expected value."""
+        return self.checker().bind(expected).check(student_response)
+
+
+class FormulaChecker(namedtuple(
+        'FormulaChecker', 'tolerance min_significant_digits max_significant_digits')):
+    """The compiled form of a FormulaCell.
+
+    The correct answer differs between students, so the checker has to be bound to the value
+    computed from the answers of a student before responses can be checked.
+    """
+
+    __slots__ = ()
+
+    def bind(self, expected):
+        """Return a NumericChecker for the given expected value.
+
+        The expected value is None if it couldn't be computed; no response is correct then.
+        """
+        if expected is None:
+            return NumericChecker(math.nan, math.nan, None, None)
+        abs_tolerance = abs(expected) * (self.tolerance or 0.0) / 100.0
+        return NumericChecker(
+            expected - abs_tolerance,
+            expected + abs_tolerance,
+            self.min_significant_digits,
+            self.max_significant_digits,
+        )
+
+
+class FormulaGraph:
+    """The compiled formulas of a table and the dependencies between them.
+
+    The formulas are stored in topological order, so every formula comes after all formulas it
+    depends on.  The graph is picklable; the expressions are compiled again after unpickling.
+    """
+
+    def __init__(self, expressions, references, constants):
+        # Dictionaries mapping the formula cell ids in topological order to their expressions and
+        # the cell ids they reference, and mapping static cell ids to their values.
+        self.expressions = expressions
+        self.references = references
+        self.constants = constants
+        self.position = {cell_id: i for i, cell_id in enumerate(expressions)}
+        # Identifies the formulas, so values computed for a different table aren't reused.
+        self.key = content_hash(expressions, constants)
+        # Dictionary mapping cell ids to the formula cells directly referencing them.
+        self.dependents = {}
+        for cell_id, cell_references in references.items():
+            for reference in cell_references:
+                self.dependents.setdefault(reference, []).append(cell_id)
+        self._compile()
+
+    def _compile(self):
+        """Compile the expressions to code objects."""
+        self._code = {
+            cell_id: compile(parse_expression(expr)[0], f'<{cell_id}>', 'eval')
+            for cell_id, expr in self.expressions.items()
+        }
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_code']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile()
+
+    @classmethod
+    def build(cls, tbody):
+        """Build the graph of the formula cells in the parsed table body.
+
+        Returns None if the table doesn't contain any formula cells.  A ValueError is raised if a
+        formula refers to a missing or non-numeric cell, or if the formulas contain a cycle.
+        """
+        cells = {cell.id: cell for row in tbody for cell in row.cells}
+        formulas = {
+            cell_id: cell for cell_id, cell in cells.items() if isinstance(cell, FormulaCell)
+        }
+        if not formulas:
+            return None
+        constants = {}
+        for cell_id, cell in formulas.items():
+            for reference in cell.references:
+                target = cells.get(reference)
+                if target is None:
+                    raise ValueError(f'{cell_id} refers to the nonexistent cell {reference}')
+                if isinstance(target, StaticCell):
+                    if (not isinstance(target.value, numbers.Real)
+                            or isinstance(target.value, bool)):
+                        raise ValueError(f'{cell_id} refers to the non-numeric cell {reference}')
+                    constants[reference] = float(target.value)
+                elif not isinstance(target, (NumericCell, FormulaCell)):
+                    raise ValueError(f'{cell_id} refers to the non-numeric cell {reference}')
+        order = _topological_order({
+            cell_id: [ref for ref in cell.references if ref in formulas]
+            for cell_id, cell in formulas.items()
+        })
+        return cls(
+            {cell_id: formulas[cell_id].expr for cell_id in order},
+            {cell_id: formulas[cell_id].references for cell_id in order},
+            constants,
+        )
+
+    def downstream(self, cell_ids):
+        """Return the set of formula cell ids that directly or indirectly depend on the cells."""
+        affected = set()
+        pending = [cell_id for cell_id in cell_ids if cell_id in self.dependents]
+        while pending:
+            for dependent in self.dependents.get(pending.pop(), ()):
+                if dependent not in affected:
+                    affected.add(dependent)
+                    pending.append(dependent)
+        return affected
+
+    def evaluate(self, answers, previous=None, changed=None):
+        """Return a dictionary mapping the formula cell ids to their values for the answers.
+
+        If the values computed for the previous answers and the ids of the changed answers are
+        given, only the formulas downstream of the changed cells are evaluated again.  The value of
+        a formula is None if any of its inputs is missing or invalid, or if it can't be computed.
+        """
+        if previous is None or changed is None or not self.expressions.keys() <= previous.keys():
+            values = {}
+            dirty = self.expressions
+        else:
+            values = {cell_id: previous[cell_id] for cell_id in self.expressions}
+            dirty = sorted(self.downstream(changed), key=self.position.__getitem__)
+        for cell_id in dirty:
+            values[cell_id] = self._evaluate(cell_id, answers, values)
+        return values
+
+    def _evaluate(self, cell_id, answers, values):
+        """Evaluate a single formula, given the values of the formulas it depends on."""
+        namespace = dict(FUNCTIONS)
+        for reference in self.references[cell_id]:
+            if reference in values:
+                value = values[reference]
+            elif reference in self.constants:
+                value = self.constants[reference]
+            else:
+                try:
+                    value = float(answers.get(reference, ''))
+                except (TypeError, ValueError):
+                    value = None
+            if value is None:
+                return None
+            namespace[reference] = value
+        try:
+            # The expression was validated by parse_expression(), so it can't access anything but
+            # the namespace.
+            result = eval(  # pylint: disable=eval-used
+                self._code[cell_id], {'__builtins__': {}}, namespace
+            )
+        except (ArithmeticError, ValueError, TypeError):
+            return None
+        if not isinstance(result, numbers.Real) or not math.isfinite(result):
+            return None
+        return float(result)
+
+
+def _topological_order(dependencies):
+    """Return the keys of the dependency dictionary in topological order.
+
+    The dictionary maps each node to the nodes it depends on.  A ValueError naming the nodes of a
+    cycle is raised if the graph isn't acyclic.
+    """
+    order = []
+    # The state of each node: absent if unvisited, False while on the stack, True when done.
+    done = {}
+    for root in dependencies:
+        if root in done:
+            continue
+        done[root] = False
+        stack = [(root, iter(dependencies[root]))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                state = done.get(child)
+                if state is None:
+                    done[child] = False
+                    stack.append((child, iter(dependencies[child])))
+                    break
+                if state is False:
+                    cycle = [entry[0] for entry in stack]
+                    cycle = cycle[cycle.index(child):] + [child]
+                    raise ValueError('the formulas contain a cycle: ' + ' -> '.join(cycle))
+            else:
+                stack.pop()
+                done[node] = True
+                order.append(node)
+    return order
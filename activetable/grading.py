@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Grading of student answers against a compiled answer key.
+
+The answer key maps the ids of all response cells to the compact checker records returned by
+Cell.checker().  It only depends on the content fields, so it can be compiled once and cached, and
+grading does not need any of the rendering information of the table.
+
+The correct answers of formula cells depend on the answers of the student.  The answer key holds the
+FormulaGraph of the table, and the formula checkers are bound to the values computed from the
+answers before grading.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+from .formulas import FormulaGraph
+
+
+class AnswerKey(dict):
+    """A dictionary mapping cell ids to checker records, in table order."""
+
+    # The FormulaGraph of the table, or None if the table doesn't contain formula cells.
+    formulas = None
+
+
+def compile_answer_key(tbody):
+    """Compile the answer key for the given postprocessed table body.
+
+    The cells must already have their tolerances set.  The key preserves the order of the
+    response cells in the table.
+    """
+    answer_key = AnswerKey(
+        (cell.id, cell.checker())
+        for row in tbody
+        for cell in row.cells
+        if not cell.is_static
+    )
+    answer_key.formulas = FormulaGraph.build(tbody)
+    return answer_key
+
+
+def grade(answer_key, answers, formula_values=None):
+    """Return a dictionary mapping the cell ids in answers to the correctness of the answer.
+
+    The formula values are the values of the formula cells computed from the same answers.  They
+    are computed if they are not given.  A KeyError is raised if answers contains an id that isn't a
+    response cell of the table.
+    """
+    checkers = answer_key
+    if answer_key.formulas is not None:
+        if formula_values is None:
+            formula_values = answer_key.formulas.evaluate(answers)
+        checkers = dict(answer_key)
+        for cell_id, value in formula_values.items():
+            checkers[cell_id] = answer_key[cell_id].bind(value)
+    return {cell_id: checkers[cell_id].check(value) for cell_id, value in answers.items()}
+
+
+def grade_all(answer_key, answers, formula_values=None):
+    """Grade the answers to all response cells of the answer key.
+
+    Cells without an answer are graded as empty, and answers to cells that are not in the answer
+    key are ignored.
+    """
+    return grade(
+        answer_key, {cell_id: answers.get(cell_id, '') for cell_id in answer_key}, formula_values
+    )
+
+
+def compute_score(answers_correct, maximum_score):
+    """Return the pro-rated score for the given dictionary of graded answers."""
+    return sum(answers_correct.values()) * maximum_score / len(answers_correct)
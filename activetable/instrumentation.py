@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""Opt-in timing and allocation instrumentation of the main code paths of the block.
+
+Methods decorated with instrumented() are measured when at least one sink is configured.  Each call
+produces a Measurement, which is passed to all sinks.  Sinks are callables taking the block and the
+measurement; LoggingSink, PublishSink and Aggregator are provided.  Instrumentation is configured
+by calling configure(), or by setting the environment variable ACTIVETABLE_INSTRUMENTATION to a
+comma-separated list of the sink names "log", "publish" and "aggregate".  If the environment
+variable ACTIVETABLE_TRACE_ALLOCATIONS is set to 1, allocations are traced with tracemalloc as well.
+
+While no sink is configured, the only overhead of an instrumented method is an additional function
+call and a test of a global variable.
+
+Independently of the sinks, the block counts noteworthy events, like suppressed duplicate requests,
+in the process-wide counters.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import functools
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque, namedtuple
+
+log = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+Measurement = namedtuple(
+    'Measurement', 'name duration num_cells num_response_cells allocated peak_allocated'
+)
+Measurement.__doc__ = """The measurement of a single call of an instrumented method.
+
+The duration is the wall time in seconds.  The table size is None if the table definition is
+invalid.  If allocations are traced, allocated is the number of bytes allocated during the call and
+still allocated at its end, and peak_allocated the peak number of bytes allocated during the call;
+otherwise both are None.  peak_allocated is also None for calls nested in another instrumented call.
+"""
+
+# The configured sinks; instrumentation is disabled if the list is empty.
+_sinks = []  # pylint: disable=invalid-name
+_config = dict(trace_allocations=False)
+_local = threading.local()  # pylint: disable=invalid-name
+
+
+class LoggingSink:
+    """A sink writing all measurements to a logger."""
+
+    def __init__(self, logger=log, level=logging.INFO):
+        self.logger = logger
+        self.level = level
+
+    def __call__(self, block, measurement):
+        self.logger.log(
+            self.level, '%s: %.3f ms, %s cells, %s response cells, %s bytes allocated (%s peak)',
+            measurement.name, measurement.duration * 1e3, measurement.num_cells,
+            measurement.num_response_cells, measurement.allocated, measurement.peak_allocated,
+        )
+
+
+class PublishSink:
+    """A sink publishing all measurements as events of the runtime."""
+
+    event_type = 'activetable.instrumentation'
+
+    def __call__(self, block, measurement):
+        block.runtime.publish(block, self.event_type, measurement._asdict())
+
+
+class Aggregator:
+    """A sink keeping the durations of the last max_samples calls of each method in memory."""
+
+    def __init__(self, max_samples=1000):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self._counts = defaultdict(int)
+
+    def __call__(self, block, measurement):
+        with self._lock:
+            self._samples[measurement.name].append(measurement.duration)
+            self._counts[measurement.name] += 1
+
+    def summary(self):
+        """Return a dictionary mapping method names to summaries of the durations in seconds.
+
+        The summaries contain the total number of calls, and the mean, the 50th, 90th and 99th
+        percentiles and the maximum of the retained samples.
+        """
+        with self._lock:
+            samples = {name: sorted(durations) for name, durations in self._samples.items()}
+            counts = dict(self._counts)
+        return {
+            name: dict(
+                count=counts[name],
+                mean=sum(durations) / len(durations),
+                p50=percentile(durations, 50),
+                p90=percentile(durations, 90),
+                p99=percentile(durations, 99),
+                max=durations[-1],
+            )
+            for name, durations in samples.items()
+        }
+
+    def reset(self):
+        """Discard all samples and counts."""
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+class Counters:
+    """Thread-safe counters of named events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(int)
+
+    def increment(self, name, amount=1):
+        """Add the amount to the counter with the given name."""
+        with self._lock:
+            self._counts[name] += amount
+
+    def snapshot(self):
+        """Return a dictionary mapping the counter names to their current values."""
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self):
+        """Reset all counters to zero."""
+        with self._lock:
+            self._counts.clear()
+
+
+def percentile(sorted_values, percent):
+    """Return the given percentile of a non-empty sorted list using the nearest-rank method."""
+    index = max(0, -(-len(sorted_values) * percent // 100) - 1)
+    return sorted_values[int(index)]
+
+
+# The aggregator used when the "aggregate" sink is configured by name.
+aggregator = Aggregator()  # pylint: disable=invalid-name
+# The process-wide event counters.
+counters = Counters()  # pylint: disable=invalid-name
+
+SINKS_BY_NAME = dict(
+    log=LoggingSink,
+    publish=PublishSink,
+    aggregate=lambda: aggregator,
+)
+
+
+def configure(sinks=(), trace_allocations=False):
+    """Set the sinks all measurements are passed to; no sinks disable instrumentation.
+
+    If trace_allocations is True, tracemalloc is started if necessary and the measurements include
+    the allocated memory.  Tracing allocations slows down the whole process considerably.
+    """
+    _config['trace_allocations'] = trace_allocations
+    _sinks[:] = list(sinks)
+
+
+def configure_from_environment(environ=os.environ):
+    """Configure the sinks named in the ACTIVETABLE_INSTRUMENTATION environment variable."""
+    names = [name.strip() for name in environ.get('ACTIVETABLE_INSTRUMENTATION', '').split(',')]
+    sinks = []
+    for name in filter(None, names):
+        if name in SINKS_BY_NAME:
+            sinks.append(SINKS_BY_NAME[name]())
+        else:
+            log.warning('Unknown instrumentation sink: %s', name)
+    configure(sinks, environ.get('ACTIVETABLE_TRACE_ALLOCATIONS') == '1')
+
+
+def is_enabled():
+    """Whether any sinks are configured."""
+    return bool(_sinks)
+
+
+def instrumented(name):
+    """Decorator for block methods measuring each call while instrumentation is enabled."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(block, *args, **kwargs):
+            if not _sinks:
+                return method(block, *args, **kwargs)
+            return _measure(name, method, block, args, kwargs)
+        return wrapper
+    return decorator
+
+
+def _measure(name, method, block, args, kwargs):
+    """Call the method, and pass the measurement of the call to all sinks."""
+    depth = getattr(_local, 'depth', 0)
+    start_memory = _start_tracing(depth) if _config['trace_allocations'] else None
+    _local.depth = depth + 1
+    start = time.perf_counter()
+    try:
+        return method(block, *args, **kwargs)
+    finally:
+        duration = time.perf_counter() - start
+        _local.depth = depth
+        allocated = peak_allocated = None
+        if start_memory is not None:
+            current_memory, peak_memory = tracemalloc.get_traced_memory()
+            allocated = current_memory - start_memory
+            if depth == 0:
+                peak_allocated = peak_memory - start_memory
+        _report(block, Measurement(name, duration, *block.table_size, allocated, peak_allocated))
+
+
+def _start_tracing(depth):
+    """Start tracing allocations if necessary, returning the currently allocated memory."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if depth == 0:
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        else:
+            # Before Python 3.9, the peak can only be reset by discarding the traces.
+            tracemalloc.clear_traces()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def _report(block, measurement):
+    """Pass the measurement to all sinks, logging failures of the sinks instead of raising them."""
+    for sink in list(_sinks):
+        try:
+            sink(block, measurement)
+        except Exception:  # pylint: disable=broad-except
+            log.exception('Instrumentation sink %r failed', sink)
+
+
+configure_from_environment()
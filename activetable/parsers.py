@@ -1,21 +1,56 @@
 # -*- coding: utf-8 -*-
-"""Parsers for structured text data entered by the user."""
+"""Parsers for structured text data entered by the user.
+
+Table definitions can be entered in Python-like syntax, as CSV or as JSON.  All formats are parsed
+into the same structure of column headings and rows of cells.
+
+Table definitions in Python syntax can be parsed in two ways.  parse_table() parses the definition
+into a Python syntax tree and extracts the cells from the tree.  iter_table() tokenizes the
+definition with a regular expression and parses the tokens incrementally, so rows are produced as
+they are read and no syntax tree is built for the whole table.  It needs much less memory for large
+tables and reports the line and column of the first error.  Both parsers accept the same grammar,
+except that iter_table() doesn't allow redundant parentheses around values, backslash line
+continuations and repeated keyword arguments.
+"""
 from __future__ import absolute_import, division, unicode_literals
 
 import ast
+import csv
+import io
+import json
 import numbers
+import re
+
+from .cells import NumericCell, Row, StaticCell, TextCell
+from .formulas import FormulaCell, FormulaGraph
+
 
-from .cells import NumericCell, StaticCell, TextCell
+# The supported formats of table definitions.
+TABLE_FORMATS = ('python', 'csv', 'json')
 
 
 class ParseError(Exception):
     """The table definition could not be parsed."""
 
-    def __init__(self, message):
+    def __init__(self, message, line=None, column=None):
+        self.reason = message
+        if column is not None:
+            message = f'{message} (line {line}, column {column})'
+        elif line is not None:
+            message = f'{message} (line {line})'
         self.message = message
+        self.line = line
+        self.column = column
         super().__init__(message)
 
 
+class _UnsupportedSyntaxError(ParseError):
+    """The incremental parser doesn't support a construct parse_table() accepts.
+
+    These are redundant parentheses, line continuations and repeated keyword arguments.
+    """
+
+
 def _ensure_type(node, expected_type):
     """Internal helper function for parse_table."""
     if isinstance(node, expected_type):
@@ -54,21 +89,22 @@ def parse_table(table_definition):
                     f"invalid node in row {i}, cell {j}: {type(cell_node).__name__}"
                 )
             cell.index = j
+            cell.row_index = i
             cells.append(cell)
         if len(cells) != len(thead):
             raise ParseError(
                 f"row {i} has a different number of columns "
                 f"than the previous rows ({len(cells)} vs. {len(thead)})"
             )
-        tbody.append(dict(index=i, cells=cells))
+        tbody.append(Row(i, cells))
     return thead, tbody
 
 
 def _parse_response_cell(cell_node):
     """Parse a single student response cell definition.
 
-    Response cells are written in function call syntax, either Text(...) or Numeric(...).  All
-    arguments must be keyword arguments.
+    Response cells are written in function call syntax, i.e. Text(...), Numeric(...) or
+    Formula(...).  All arguments must be keyword arguments.
     """
     cell_type = _ensure_type(cell_node.func, ast.Name).id
 
@@ -90,20 +126,469 @@ def _parse_response_cell(cell_node):
             f"All arguments to {cell_type} must be keyword arguments of the form name=value"
         )
 
-    if cell_type == 'Text':
-        cell_class = TextCell
-        kwargs = {kw.arg: _ensure_type(kw.value, ast.Str).s for kw in cell_node.keywords}
-    elif cell_type == 'Numeric':
-        cell_class = NumericCell
-        kwargs = {kw.arg: _ensure_type(kw.value, ast.Num).n for kw in cell_node.keywords}
-    else:
-        raise ParseError(f"invalid cell input type: {cell_type}")
+    kwargs = {kw.arg: _literal_value(kw.value) for kw in cell_node.keywords}
+    return _make_response_cell(cell_type, kwargs)
+
+
+def _literal_value(node):
+    """Return the value of a string, number, Boolean or list node."""
+    if isinstance(node, ast.Str):
+        return node.s
+    if isinstance(node, ast.Constant) and isinstance(node.value, bool):
+        return node.value
+    if isinstance(node, ast.List):
+        return [_literal_value(element) for element in node.elts]
+    return _ensure_type(node, ast.Num).n
+
+
+def _is_string(value):
+    """Whether the value is a valid string argument."""
+    return isinstance(value, str)
+
+
+def _is_number(value):
+    """Whether the value is a valid numeric argument."""
+    return isinstance(value, numbers.Number) and not isinstance(value, bool)
+
+
+def _is_bool(value):
+    """Whether the value is a valid Boolean argument."""
+    return isinstance(value, bool)
+
+
+def _is_string_list(value):
+    """Whether the value is a valid list of strings."""
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+# The cell class and the validators of the keyword arguments of each response cell type.
+_RESPONSE_CELL_TYPES = dict(
+    Text=(TextCell, dict(
+        answer=_is_string,
+        answers=_is_string_list,
+        regex=_is_string,
+        case_sensitive=_is_bool,
+        collapse_whitespace=_is_bool,
+    )),
+    Numeric=(NumericCell, dict(
+        answer=_is_number,
+        tolerance=_is_number,
+        min_significant_digits=_is_number,
+        max_significant_digits=_is_number,
+    )),
+    Formula=(FormulaCell, dict(
+        expr=_is_string,
+        tolerance=_is_number,
+        min_significant_digits=_is_number,
+        max_significant_digits=_is_number,
+    )),
+)
+
+
+def _make_response_cell(cell_type, kwargs):
+    """Create a response cell of the given type from the dictionary of keyword arguments."""
+    try:
+        cell_class, validators = _RESPONSE_CELL_TYPES[cell_type]
+    except (KeyError, TypeError):
+        raise ParseError(f"invalid cell input type: {cell_type}") from None
+    for name, value in kwargs.items():
+        if name not in validators:
+            raise ParseError(f"invalid argument to {cell_type}: {name}")
+        if not validators[name](value):
+            raise ParseError(f"invalid value for the argument {name} of {cell_type}")
     try:
         return cell_class(**kwargs)
+    except ValueError as exc:
+        raise ParseError(str(exc)) from exc
     except Exception as exc:
         raise ParseError('Could not parse cell definition.') from exc
 
 
+# A comment always extends to the end of the line, so the pattern can only match a run of
+# whitespace and comments in one way and never backtracks exponentially.
+_SPACE_PATTERN = re.compile(r'(?:[ \t\f\r\n]|\#[^\r\n]*(?![^\r\n]))*')
+# Each match of the token pattern consumes the whitespace and comments before the token.
+_TOKEN_PATTERN = re.compile(_SPACE_PATTERN.pattern + r"""(?:
+    (?P<string>[A-Za-z]{0,2}(?:
+        '''(?s:[^\\]|\\.)*?'''
+      | \"\"\"(?s:[^\\]|\\.)*?\"\"\"
+      | '(?:[^'\\\r\n]|\\(?s:.))*'
+      | "(?:[^"\\\r\n]|\\(?s:.))*"
+    ))
+  | (?P<number>
+        0[xXoObB][0-9a-fA-F_]+
+      | (?:\d[\d_]*(?:\.[\d_]*)?|\.\d[\d_]*)(?:[eE][+-]?\d[\d_]*)?[jJ]?
+    )
+  | (?P<name>[^\W\d]\w*)
+  | (?P<op>[][(),=])
+  | (?P<end>\Z)
+)""", re.VERBOSE)
+
+_SIMPLE_LITERAL_PATTERN = re.compile(r"""
+    (?P<int>0|[1-9]\d*)
+  | (?P<float>(?:\d+\.\d*|\.\d+)(?:[eE][+-]?\d+)?|\d+[eE][+-]?\d+)
+  | (?P<str>'[^'\\\r\n]*'|"[^"\\\r\n]*")
+""", re.VERBOSE)
+
+
+class _Tokens:
+    """A stream of tokens of a table definition with one token of lookahead.
+
+    The attributes kind, value and pos describe the current token.  The kind of an operator token
+    is the operator itself.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self._tokens = self._tokenize()
+        self.kind = self.value = self.pos = None
+        self.advance()
+
+    def _tokenize(self):
+        """Generate (kind, value, pos) tuples for all tokens in the text."""
+        text = self.text
+        pos = 0
+        while True:
+            token = _TOKEN_PATTERN.match(text, pos)
+            if token is None:
+                break
+            pos = token.end()
+            kind = token.lastgroup
+            if kind == 'op':
+                yield token.group(kind), None, token.start(kind)
+            elif kind == 'end':
+                yield kind, None, pos
+                return
+            else:
+                yield kind, token.group(kind), token.start(kind)
+        pos = _SPACE_PATTERN.match(text, pos).end()
+        raise self.error(f'invalid character {text[pos]!r}', pos, unsupported=text[pos] == '\\')
+
+    def advance(self):
+        """Move to the next token."""
+        self.kind, self.value, self.pos = next(self._tokens)
+
+    def expect(self, kind):
+        """Skip the current token, raising a ParseError if it isn't of the given kind."""
+        if self.kind != kind:
+            raise self.error(f'expected {kind!r}, found {self.describe()}')
+        self.advance()
+
+    def describe(self):
+        """Return a description of the current token for error messages."""
+        if self.kind == 'end':
+            return 'end of input'
+        if self.value is None:
+            return repr(self.kind)
+        return f'{self.kind} {self.value}'
+
+    def error(self, message, pos=None, unsupported=False):
+        """Return a ParseError with the line and column of pos, by default the current token.
+
+        An _UnsupportedSyntaxError is returned if unsupported is True or the current token is an
+        unexpected parenthesis, which parse_table() may accept as a redundant parenthesis.
+        """
+        if pos is None:
+            pos = self.pos
+            unsupported = unsupported or self.kind == '('
+        line = self.text.count('\n', 0, pos) + 1
+        column = pos - self.text.rfind('\n', 0, pos)
+        error_class = _UnsupportedSyntaxError if unsupported else ParseError
+        return error_class(message, line, column)
+
+    def literal(self):
+        """Consume a string or number literal and return its value.
+
+        Adjacent string literals are concatenated, like in Python source code.
+        """
+        kind = self.kind
+        if kind not in ('string', 'number'):
+            raise self.error(f'expected a string or a number, found {self.describe()}')
+        pos = self.pos
+        parts = [self.value]
+        self.advance()
+        if kind == 'string':
+            while self.kind == 'string':
+                parts.append(self.value)
+                self.advance()
+        if len(parts) == 1:
+            # Avoid the overhead of literal_eval() for the most common literals.
+            simple = _SIMPLE_LITERAL_PATTERN.fullmatch(parts[0])
+            if simple is not None:
+                if simple.lastgroup == 'int':
+                    return int(parts[0])
+                if simple.lastgroup == 'float':
+                    return float(parts[0])
+                return parts[0][1:-1]
+        try:
+            value = ast.literal_eval(' '.join(parts))
+        except (SyntaxError, ValueError) as exc:
+            raise self.error(f'invalid {kind} literal', pos) from exc
+        if not isinstance(value, (str, numbers.Number)) or isinstance(value, bool):
+            raise self.error(f'invalid {kind} literal', pos)
+        return value
+
+
+def iter_table(table_definition):
+    """Parse the table definition given by the user incrementally.
+
+    Returns a tuple (thead, rows), where rows is an iterator over the rows of the table body.  The
+    header is parsed immediately, and each row is parsed when it is requested.  On error, ParseError
+    is raised with the line and column of the offending token.
+    """
+    tokens = _Tokens(table_definition)
+    tokens.expect('[')
+    tokens.expect('[')
+    thead = []
+    while tokens.kind != ']':
+        if tokens.kind != 'string':
+            raise tokens.error(f'expected a column heading, found {tokens.describe()}')
+        thead.append(tokens.literal())
+        if tokens.kind != ']':
+            tokens.expect(',')
+    tokens.advance()
+    return thead, _iter_rows(tokens, len(thead))
+
+
+def _iter_rows(tokens, num_columns):
+    """Generate the rows of the table body, starting after the table header."""
+    i = 0
+    while tokens.kind != ']':
+        tokens.expect(',')
+        if tokens.kind == ']':
+            break
+        i += 1
+        row_pos = tokens.pos
+        tokens.expect('[')
+        cells = []
+        while tokens.kind != ']':
+            cell = _parse_cell(tokens)
+            cell.index = len(cells)
+            cell.row_index = i
+            cells.append(cell)
+            if tokens.kind != ']':
+                tokens.expect(',')
+        tokens.advance()
+        if len(cells) != num_columns:
+            raise tokens.error(
+                f"row {i} has a different number of columns "
+                f"than the previous rows ({len(cells)} vs. {num_columns})",
+                row_pos,
+            )
+        yield Row(i, cells)
+    tokens.advance()
+    if tokens.kind != 'end':
+        raise tokens.error(f'expected end of input, found {tokens.describe()}')
+
+
+def _parse_cell(tokens):
+    """Parse a single cell: a string or number literal, or a response cell definition."""
+    if tokens.kind != 'name':
+        return StaticCell(tokens.literal())
+    cell_type = tokens.value
+    cell_pos = tokens.pos
+    tokens.advance()
+    if tokens.kind != '(':
+        raise tokens.error(f'invalid cell value: {cell_type}', cell_pos)
+    tokens.advance()
+    kwargs = {}
+    while tokens.kind != ')':
+        name = tokens.value
+        if tokens.kind == 'name':
+            tokens.advance()
+        if name is None or tokens.kind != '=':
+            raise tokens.error(
+                f"All arguments to {cell_type} must be keyword arguments of the form name=value"
+            )
+        tokens.advance()
+        if name in kwargs:
+            raise tokens.error(f"keyword argument repeated: {name}", unsupported=True)
+        kwargs[name] = _parse_argument(tokens)
+        if tokens.kind != ')':
+            tokens.expect(',')
+    tokens.advance()
+    try:
+        return _make_response_cell(cell_type, kwargs)
+    except ParseError as exc:
+        raise tokens.error(exc.message, cell_pos) from exc
+
+
+def _parse_argument(tokens):
+    """Parse the value of a keyword argument: a literal, a Boolean or a list of literals."""
+    if tokens.kind == 'name' and tokens.value in ('True', 'False'):
+        value = tokens.value == 'True'
+        tokens.advance()
+        return value
+    if tokens.kind != '[':
+        return tokens.literal()
+    tokens.advance()
+    values = []
+    while tokens.kind != ']':
+        values.append(tokens.literal())
+        if tokens.kind != ']':
+            tokens.expect(',')
+    tokens.advance()
+    return values
+
+
+def parse_table_streaming(table_definition):
+    """Parse the table definition like parse_table(), using the incremental parser."""
+    thead, rows = iter_table(table_definition)
+    return thead, list(rows)
+
+
+def read_table(table_definition, content_format='python'):
+    """Parse the table definition in the given format, one of TABLE_FORMATS.
+
+    Definitions in Python format are parsed by the incremental parser first.  Definitions it
+    rejects because of a construct it doesn't support, like redundant parentheses, are parsed again
+    by parse_table(), so that everything parse_table() accepts is still accepted.  All other errors
+    are raised immediately, without building the syntax tree of the whole definition.  If both
+    parsers fail, the error of the incremental parser is raised, since it includes the position of
+    the error.  The references between formula cells are validated as
+    well, since they can only be checked once the whole table has been parsed.
+    """
+    thead, tbody = _parse_table_format(table_definition, content_format)
+    try:
+        FormulaGraph.build(tbody)
+    except ValueError as exc:
+        raise ParseError(str(exc)) from exc
+    return thead, tbody
+
+
+def _parse_table_format(table_definition, content_format):
+    """Parse the table definition in the given format with the appropriate parser."""
+    if content_format == 'csv':
+        return parse_table_csv(table_definition)
+    if content_format == 'json':
+        return parse_table_json(table_definition)
+    if content_format != 'python':
+        raise ParseError(f'unknown table definition format: {content_format}')
+    try:
+        return parse_table_streaming(table_definition)
+    except _UnsupportedSyntaxError as exc:
+        try:
+            return parse_table(table_definition)
+        except ParseError:
+            raise exc from None
+
+
+def parse_table_csv(table_definition):
+    """Parse a table definition in CSV format.
+
+    The first record contains the column headings.  Response cells are written as in the Python
+    format, e.g. "Numeric(answer=42, tolerance=1)", and need to be quoted if they contain commas.
+    Fields that look like decimal numbers become numeric static cells, all other fields text cells.
+    Empty lines are ignored.
+    """
+    reader = csv.reader(io.StringIO(table_definition.strip(), newline=''), skipinitialspace=True)
+    thead = None
+    tbody = []
+    try:
+        for fields in reader:
+            if not fields:
+                continue
+            if thead is None:
+                thead = fields
+                continue
+            i = len(tbody) + 1
+            cells = []
+            for j, field in enumerate(fields):
+                cell = _parse_csv_field(field, i, j, reader.line_num)
+                cell.index = j
+                cell.row_index = i
+                cells.append(cell)
+            if len(cells) != len(thead):
+                raise ParseError(
+                    f"row {i} has a different number of columns "
+                    f"than the previous rows ({len(cells)} vs. {len(thead)})",
+                    reader.line_num,
+                )
+            tbody.append(Row(i, cells))
+    except csv.Error as exc:
+        raise ParseError(f'Could not parse table definition: {exc}', reader.line_num) from exc
+    if thead is None:
+        raise ParseError('the table definition is empty')
+    return thead, tbody
+
+
+# Only fields starting with the name of a response cell type are parsed as response cells, so
+# static labels like "Mass (kg)" stay text.
+_CSV_RESPONSE_CELL_PATTERN = re.compile(
+    r'\s*(?:' + '|'.join(map(re.escape, _RESPONSE_CELL_TYPES)) + r')\s*\('
+)
+_CSV_NUMBER_PATTERN = re.compile(r"""\s*(?:
+    (?P<int>[+-]?\d+)
+  | (?P<float>[+-]?(?:\d+\.\d*|\.\d+)(?:[eE][+-]?\d+)?|[+-]?\d+[eE][+-]?\d+)
+)\s*""", re.VERBOSE)
+
+
+def _parse_csv_field(field, i, j, line):
+    """Return the cell for a field of a CSV table definition."""
+    if _CSV_RESPONSE_CELL_PATTERN.match(field):
+        tokens = _Tokens(field.strip())
+        try:
+            cell = _parse_cell(tokens)
+            if tokens.kind != 'end':
+                raise tokens.error(f'expected end of cell, found {tokens.describe()}')
+        except ParseError as exc:
+            raise ParseError(f'row {i}, cell {j}: {exc.reason}', line) from exc
+        return cell
+    number = _CSV_NUMBER_PATTERN.fullmatch(field)
+    if number is None:
+        return StaticCell(field)
+    if number.lastgroup == 'int':
+        return StaticCell(int(field))
+    return StaticCell(float(field))
+
+
+def parse_table_json(table_definition):
+    """Parse a table definition in JSON format.
+
+    The table is a list of rows like in the Python format.  The first row contains the column
+    headings.  Response cells are objects with a "type" key, one of "Text", "Numeric" and
+    "Formula", and the keyword arguments of the cell, e.g.
+    {"type": "Numeric", "answer": 42, "tolerance": 1}.
+    """
+    try:
+        rows = json.loads(table_definition)
+    except ValueError as exc:
+        raise ParseError(
+            f'Could not parse table definition: {exc.msg}', exc.lineno, exc.colno
+        ) from exc
+    if not isinstance(rows, list) or not rows or not isinstance(rows[0], list):
+        raise ParseError('the structure of the table definition is invalid')
+    thead = rows[0]
+    if not all(isinstance(heading, str) for heading in thead):
+        raise ParseError('all column headings must be strings')
+    tbody = []
+    for i, row in enumerate(rows[1:], 1):
+        if not isinstance(row, list):
+            raise ParseError(f'row {i} is not a list')
+        cells = []
+        for j, value in enumerate(row):
+            if isinstance(value, dict):
+                kwargs = dict(value)
+                try:
+                    cell = _make_response_cell(kwargs.pop('type', None), kwargs)
+                except ParseError as exc:
+                    raise ParseError(f'row {i}, cell {j}: {exc.reason}') from exc
+            elif isinstance(value, (str, int, float)) and not isinstance(value, bool):
+                cell = StaticCell(value)
+            else:
+                raise ParseError(f'invalid value in row {i}, cell {j}: {json.dumps(value)}')
+            cell.index = j
+            cell.row_index = i
+            cells.append(cell)
+        if len(cells) != len(thead):
+            raise ParseError(
+                f"row {i} has a different number of columns "
+                f"than the previous rows ({len(cells)} vs. {len(thead)})"
+            )
+        tbody.append(Row(i, cells))
+    return thead, tbody
+
+
 def parse_number_list(source):
     """Parse the given string as a Python list of numbers.
 
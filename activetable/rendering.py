@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""Two-phase rendering of the student view.
+
+The HTML of the table only differs between students in the value attributes of the input elements.
+The table is rendered once per content hash with a unique marker in place of each value, and the
+result is split at the markers into a TableSkeleton.  Per request, only the escaped student answers
+need to be joined with the cached parts of the skeleton.
+
+Very large tables are rendered in virtualized mode instead.  The rows are serialized to JSON by
+serialize_row() and rendered lazily by the frontend code.
+
+The HTML of the table can be rendered with the Django template templates/html/activetable.html, or
+with render_table_html(), which builds the same output from precomputed string fragments without
+the overhead of setting up a template engine and resolving template variables.  Both use the same
+escaping and localization, and the tests verify that their output is identical.
+
+Mobile and headless clients get a JSON representation of the table instead.  Its static part is
+serialized by serialize_table() once per content hash and language and identified by the hash,
+which serves as its ETag, so clients only download it again when the table changes.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import json
+import os
+from collections import namedtuple
+
+from django.utils.formats import localize
+from django.utils.html import conditional_escape
+
+from .cache import LRUCache
+
+skeleton_cache = LRUCache(maxsize=256)  # pylint: disable=invalid-name
+table_data_cache = LRUCache(maxsize=256)  # pylint: disable=invalid-name
+
+
+def escape_value(value):
+    """Escape a cell value in the same way as the Django template does."""
+    if value is None:
+        return ''
+    return conditional_escape(localize(value))
+
+
+def _escape(value):
+    """Escape a template variable like the Django template, which renders None as "None"."""
+    return conditional_escape(localize(value))
+
+
+# The fragments of templates/html/activetable.html between the template variables.
+_HELP_START = '\n  <div class="activetable-help" style="width: '
+_HELP_BUTTON = (
+    'px;">\n'
+    '    <button id="activetable-help-button" aria-controls="activetable-help-text" '
+    'aria-haspopup="true"\n'
+    '            aria-expanded="false">+help</button>\n'
+    '    <p id="activetable-help-text">'
+)
+_HELP_END = '</p>\n  </div>\n  '
+_TABLE_START = '\n  <table id="activetable"'
+_COLGROUP_START = '>\n    <colgroup>\n      '
+_HEAD_START = '\n    </colgroup>\n    <thead>\n      <tr style="height: '
+_HEAD_ROW = 'px;">\n        '
+_BODY_START = '\n      </tr>\n    </thead>\n    <tbody>\n      '
+_ROW_START = '\n      <tr class="'
+_ROW_STYLE = '" style="height: '
+_ROW_END = '\n      </tr>\n      '
+_CELL_START = 'px;">\n        '
+_CELL_CLASS = '\n        <td class="'
+_CELL_ID = '" id="'
+_STATIC_CELL = '">\n          \n          '
+_RESPONSE_CELL = '">\n          \n          <label class="sr" for="input_'
+_CELL_END = '\n          \n        </td>\n        '
+_TABLE_END = '\n    </tbody>\n  </table>'
+_NOT_CONFIGURED = (
+    "\n  <p>This component isn't configured properly and can't be displayed.</p>\n  "
+)
+_ACTIONS = (
+    '\n  <p class="status" aria-live="polite"></p>\n'
+    '  <div class="status-message" aria-live="polite"></div>\n'
+    '  <div class="action">\n'
+    '    <button class="check"><span class="check-label">Check</span>'
+    '<span class="sr"> your answer</span></button>\n'
+    '    '
+)
+_SAVE_BUTTON = (
+    '\n    <button class="save">Save<span class="sr"> your answer</span></button>\n'
+    '    <div class="submission-feedback" aria-live="polite"></div>\n'
+    '    '
+)
+_END = '\n  </div>\n</div>\n'
+
+
+def render_table_html(context):
+    """Render the HTML of the table from the context of templates/html/activetable.html.
+
+    The output is identical to rendering the Django template with the same context.
+    """
+    chunks = ['<div class="activetable_block">\n  ']
+    append = chunks.append
+    if context['help_text']:
+        append(_HELP_START)
+        append(_escape(context['total_width']))
+        append(_HELP_BUTTON)
+        append(_escape(context['help_text']))
+        append(_HELP_END)
+    append('\n  ')
+    virtual = context['virtual']
+    thead = context['thead']
+    if thead:
+        if virtual:
+            append('<div class="activetable-viewport">')
+        append(_TABLE_START)
+        if virtual:
+            append(' class="virtual"')
+        append(_COLGROUP_START)
+        for width in context['column_widths']:
+            append(f'<col style="width: {_escape(width)}px;">')
+        append(_HEAD_START)
+        append(_escape(context['head_height']))
+        append(_HEAD_ROW)
+        for cell in thead:
+            append(f'<th scope="col">{_escape(cell)}</th>')
+        append(_BODY_START)
+        for row in context['tbody']:
+            _render_row(row, append)
+        append(_TABLE_END)
+        if virtual:
+            append('</div>')
+        append('\n  ')
+    else:
+        append(_NOT_CONFIGURED)
+    append(_ACTIONS)
+    if context['max_attempts']:
+        append(_SAVE_BUTTON)
+    append(_END)
+    return ''.join(chunks)
+
+
+def _render_row(row, append):
+    """Render a row of the table body, passing the chunks of HTML to append()."""
+    append(_ROW_START)
+    append(_escape(row.css_class))
+    append(_ROW_STYLE)
+    append(_escape(row.height))
+    append(_CELL_START)
+    input_height = None
+    for cell in row.cells:
+        cell_id = _escape(cell.id)
+        append(_CELL_CLASS)
+        append(_escape(cell.classes))
+        append(_CELL_ID)
+        append(cell_id)
+        if cell.is_static:
+            append(_STATIC_CELL)
+            append(_escape(cell.value))
+        else:
+            if input_height is None:
+                input_height = _escape(row.input_height)
+            append(_RESPONSE_CELL)
+            append(
+                f'{cell_id}">{_escape(cell.col_label)}</label>\n'
+                f'          <input id="input_{cell_id}" type="text" '
+                f'style="height: {input_height}px;" size=1\n'
+                f'                 value="{escape_value(cell.value)}" '
+                f'placeholder="{_escape(cell.placeholder)}">'
+            )
+        append(_CELL_END)
+    append(_ROW_END)
+
+
+class TableSkeleton:
+    """The rendered HTML of the table, split at the value attributes of the response cells."""
+
+    def __init__(self, parts, cell_ids):
+        if len(parts) != len(cell_ids) + 1:
+            raise ValueError('The number of parts does not match the number of response cells.')
+        self.parts = tuple(parts)
+        self.cell_ids = tuple(cell_ids)
+
+    @classmethod
+    def build(cls, render, cell_ids):
+        """Build a skeleton by calling render(values) with a marker as the value of all cells."""
+        marker = os.urandom(16).hex()
+        html = render(dict.fromkeys(cell_ids, marker))
+        return cls(html.split(marker), cell_ids)
+
+    def fill(self, answers):
+        """Return the HTML of the table with the given answers filled in."""
+        parts = iter(self.parts)
+        chunks = [next(parts)]
+        for cell_id, part in zip(self.cell_ids, parts):
+            chunks.append(escape_value(answers.get(cell_id)))
+            chunks.append(part)
+        return ''.join(chunks)
+
+
+def serialize_row(row):
+    """Return a JSON-serializable representation of a row of a table template."""
+    cells = []
+    for cell in row.cells:
+        if cell.is_static:
+            cells.append(dict(id=cell.id, static=True, value=str(localize(cell.value))))
+        else:
+            cells.append(dict(
+                id=cell.id,
+                col_label=cell.col_label,
+                type=cell.cell_type,
+                placeholder=cell.placeholder,
+                height=row.input_height,
+            ))
+    return dict(index=row.index, css_class=row.css_class, height=row.height, cells=cells)
+
+
+# The version of the output of serialize_table(), which is part of the ETag of the static table
+# data.  It must be incremented whenever the output changes.
+TABLE_DATA_FORMAT_VERSION = 1
+
+
+def serialize_table(template, help_text):
+    """Return a JSON-serializable representation of a table template without any student state.
+
+    The template is None if the table definition is empty.
+    """
+    if template is None:
+        return dict(help_text=help_text, thead=None, column_widths=None, head_height=None, rows=[])
+    thead, tbody, column_widths, row_heights = template
+    return dict(
+        help_text=help_text,
+        thead=list(thead),
+        column_widths=column_widths,
+        head_height=row_heights[0] if row_heights else None,
+        rows=[serialize_row(row) for row in tbody],
+    )
+
+
+class TableData(namedtuple('TableData', 'etag body')):
+    """The static part of the JSON representation of a table.
+
+    The body is the encoded JSON returned by serialize_table(), and the etag the content hash of
+    the fields it was built from.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def build(cls, etag, template, help_text):
+        """Serialize the table template and encode it as JSON."""
+        body = json.dumps(serialize_table(template, help_text), separators=(',', ':'))
+        return cls(etag, body.encode('utf-8'))
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""Bulk rescoring of stored student answers against a corrected table definition.
+
+Changing the table definition of a live problem invalidates the stored scores.  This module
+regrades the stored answers of all students who checked their answers at least once.  Records are
+streamed from a source (see activetable.userstate), split into chunks and graded in a process pool.
+Only a bounded number of chunks is in flight at any time, so memory use does not depend on the
+number of records.
+
+The module can be run as a script:
+
+    python -m activetable.rescore --content table.txt answers.jsonl scores.jsonl
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import argparse
+import collections
+import contextlib
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+from .grading import compute_score, grade_all
+from .tables import add_content_arguments, load_answer_key
+from .userstate import JsonlUserStateSource
+
+log = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+# The answer key of a worker process, set by the pool initializer.
+_worker_answer_key = None  # pylint: disable=invalid-name
+
+
+class RescoreStats:
+    """Progress and throughput counters of a rescoring run."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.processed = 0
+        self.rescored = 0
+        self.skipped = 0
+
+    @property
+    def elapsed(self):
+        """The number of seconds since the start of the run."""
+        return time.monotonic() - self.started
+
+    @property
+    def throughput(self):
+        """The number of records processed per second."""
+        elapsed = self.elapsed
+        return self.processed / elapsed if elapsed else 0.0
+
+    def __str__(self):
+        return (
+            f'{self.processed} records processed ({self.rescored} rescored, {self.skipped} '
+            f'skipped) in {self.elapsed:.1f}s, {self.throughput:.0f} records/s'
+        )
+
+
+def rescore_answers(answer_key, answers, maximum_score):
+    """Grade the stored answers against all response cells of the answer key.
+
+    Cells without a stored answer are graded as empty, and stored answers to cells that no longer
+    exist are ignored.  Returns a tuple (answers_correct, score).
+    """
+    answers_correct = grade_all(answer_key, answers)
+    return answers_correct, compute_score(answers_correct, maximum_score)
+
+
+def _init_worker(answer_key):
+    """Pool initializer storing the answer key, so it is only sent to each worker once."""
+    global _worker_answer_key  # pylint: disable=global-statement,invalid-name
+    _worker_answer_key = answer_key
+
+
+def _rescore_chunk(chunk, maximum_score, answer_key=None):
+    """Rescore a list of (user, answers) pairs."""
+    if answer_key is None:
+        answer_key = _worker_answer_key
+    results = []
+    for user, answers in chunk:
+        answers_correct, score = rescore_answers(answer_key, answers, maximum_score)
+        results.append(dict(user=user, answers_correct=answers_correct, score=score))
+    return results
+
+
+def _iter_chunks(records, chunk_size, stats):
+    """Split the records into lists of (user, answers) pairs, skipping unscored records."""
+    records = iter(records)
+    while True:
+        chunk = []
+        num_read = 0
+        for record in itertools.islice(records, chunk_size):
+            num_read += 1
+            if record.get('score') is None:
+                # The student never checked their answers, so there is no score to correct.
+                stats.skipped += 1
+                continue
+            chunk.append((record['user'], record.get('answers') or {}))
+        stats.processed += num_read
+        if chunk:
+            yield chunk
+        if num_read < chunk_size:
+            return
+
+
+def _map_in_pool(chunks, answer_key, maximum_score, processes, max_pending):
+    """Rescore the chunks in a process pool, yielding the results in input order.
+
+    At most max_pending chunks are submitted to the pool at any time.
+    """
+    # ProcessPoolExecutor only accepts an initializer since Python 3.7.
+    with multiprocessing.Pool(processes, _init_worker, (answer_key,)) as pool:
+        pending = collections.deque()
+        for chunk in chunks:
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+            pending.append(pool.apply_async(_rescore_chunk, (chunk, maximum_score)))
+        while pending:
+            yield pending.popleft().get()
+
+
+def rescore(answer_key, records, *, maximum_score=1.0,  # pylint: disable=too-many-arguments
+            processes=None, chunk_size=1000, max_pending=None, publish=None, progress=None,
+            stats=None):
+    """Rescore the stored answers in records, yielding one result dictionary per student.
+
+    The results contain the keys "user", "answers_correct" and "score".  If publish is given, it is
+    called as publish(user, 'grade', event_data) for each result.  If progress is given, it is
+    called with the RescoreStats instance after each chunk.  With processes=1, all grading happens
+    in the current process.
+    """
+    if not answer_key:
+        raise ValueError('The table does not contain any response cells.')
+    if stats is None:
+        stats = RescoreStats()
+    if processes is None:
+        processes = os.cpu_count() or 1
+    chunks = _iter_chunks(records, chunk_size, stats)
+    if processes == 1:
+        results = (_rescore_chunk(chunk, maximum_score, answer_key) for chunk in chunks)
+    else:
+        results = _map_in_pool(
+            chunks, answer_key, maximum_score, processes, max_pending or 2 * processes
+        )
+    for chunk_results in results:
+        for result in chunk_results:
+            stats.rescored += 1
+            if publish is not None:
+                publish(result['user'], 'grade', dict(
+                    value=result['score'], max_value=maximum_score
+                ))
+            yield result
+        if progress is not None:
+            progress(stats)
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(
+        description='Rescore stored ActiveTable answers against a table definition.'
+    )
+    parser.add_argument('source', help='JSONL file with one user state record per line')
+    parser.add_argument('output', help='JSONL file the new scores are written to, or -')
+    add_content_arguments(parser)
+    parser.add_argument('--maximum-score', type=float, default=1.0)
+    parser.add_argument('--events', help='JSONL file the grade events are written to')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--progress-interval', type=float, default=5.0,
+                        help='minimum number of seconds between progress reports')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    answer_key = load_answer_key(args)
+
+    last_report = [time.monotonic()]
+
+    def report_progress(stats):
+        """Log the progress at most every progress_interval seconds."""
+        now = time.monotonic()
+        if now - last_report[0] >= args.progress_interval:
+            last_report[0] = now
+            log.info('%s', stats)
+
+    stats = RescoreStats()
+    with contextlib.ExitStack() as stack:
+        if args.output == '-':
+            output = sys.stdout
+        else:
+            output = stack.enter_context(open(args.output, 'w', encoding='utf-8'))
+        events = None
+        if args.events:
+            events = stack.enter_context(open(args.events, 'w', encoding='utf-8'))
+
+        def write_event(user, event_type, data):
+            """Write the event to the events file."""
+            events.write(json.dumps(dict(user=user, event_type=event_type, event=data)) + '\n')
+
+        for result in rescore(
+                answer_key, JsonlUserStateSource(args.source), maximum_score=args.maximum_score,
+                processes=args.processes, chunk_size=args.chunk_size,
+                publish=write_event if events else None,
+                progress=report_progress, stats=stats):
+            output.write(json.dumps(result) + '\n')
+    log.info('%s', stats)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,25 +3,57 @@ function ActiveTableXBlock(runtime, element, init_args) {
 
     var checkHandlerUrl = runtime.handlerUrl(element, 'check_answers');
     var saveHandlerUrl = runtime.handlerUrl(element, 'save_answers');
+    // The answers the server has acknowledged.  Only cells that differ from these are sent to the
+    // server, so the first request of a page view contains all cells.
+    var acknowledgedAnswers = {};
+    var answersVersion = init_args.answers_version;
+    // The last request sent to each handler that hasn't succeeded yet, with its body and key.
+    var pendingRequests = {};
+    // Autosave state.  At most one autosave request is in flight at any time; changes made in the
+    // meantime are coalesced into the next request.  The delay is increased when the server is
+    // slow, rejects the request or fails.
+    var autosaveDelay = (init_args.autosave_interval || 0) * 1000;
+    var autosaveBackoff = 1;
+    var MAX_AUTOSAVE_BACKOFF = 16;
+    var autosaveTimer = null;
+    var autosaveInFlight = false;
+    var autosavePending = false;
+    // The answers and check results of the response cells.  In virtualized mode, the model also
+    // holds the answers of the rows that are currently not rendered.
+    var model = {answers: $.extend({}, init_args.answers), answers_correct: null};
+    // State of the virtualized mode: the vertical offsets of the rows, the pages of rows fetched
+    // from the server so far, and the range of rows currently rendered.
+    var virtual = null;
+    var ROWS_PER_PAGE = 100;
+    var OVERSCAN_ROWS = 20;
 
-    function markResponseCells(data) {
-        if (data.answers_correct) {
-            $.each(data.answers_correct, function(cell_id, correct) {
-                var $cell = $('#' + cell_id, element);
-                $cell.removeClass('right-answer wrong-answer unchecked');
-                if (correct) {
-                    $cell.addClass('right-answer');
-                    $cell.prop('title', 'correct');
-                } else {
-                    $cell.addClass('wrong-answer');
-                    $cell.prop('title', 'incorrect');
-                }
-            });
+    function markCell($cell, cell_id) {
+        var correct;
+        if (!model.answers_correct) {
+            $cell.removeClass('right-answer wrong-answer').addClass('unchecked');
+            return;
+        }
+        if (!model.answers_correct.hasOwnProperty(cell_id)) {
+            return;
+        }
+        correct = model.answers_correct[cell_id];
+        $cell.removeClass('right-answer wrong-answer unchecked');
+        if (correct) {
+            $cell.addClass('right-answer');
+            $cell.prop('title', 'correct');
         } else {
-            $('td.active', element).removeClass('right-answer wrong-answer').addClass('unchecked');
+            $cell.addClass('wrong-answer');
+            $cell.prop('title', 'incorrect');
         }
     }
 
+    function markResponseCells(data) {
+        model.answers_correct = data.answers_correct;
+        $('td.active', element).each(function() {
+            markCell($(this), this.id);
+        });
+    }
+
     function updateStatusMessage(data) {
         var $status = $('.status', element);
         var $status_message = $('.status-message', element);
@@ -70,19 +102,219 @@ function ActiveTableXBlock(runtime, element, init_args) {
         updateFeedback(data);
     }
 
-    function callHandler(url) {
-        var answers = {};
-        $('td.active', element).each(function() {
-            answers[this.id] = $('input', this).val();
+    function collectAnswers() {
+        if (!virtual) {
+            $('td.active', element).each(function() {
+                model.answers[this.id] = $('input', this).val();
+            });
+        }
+        return model.answers;
+    }
+
+    function makeRequestKey() {
+        return Date.now().toString(36) + Math.random().toString(36).slice(2);
+    }
+
+    function callHandler(url, retryConflicts) {
+        var changes = {}, body, request;
+        $.each(collectAnswers(), function(cell_id, value) {
+            if (acknowledgedAnswers[cell_id] !== value) {
+                changes[cell_id] = value;
+            }
         });
-        $.ajax({
+        // Sending the same data again before a request succeeded, e.g. after a double click or a
+        // failure, reuses the request key, so the server processes the data only once.
+        body = {version: answersVersion, changes: changes};
+        request = pendingRequests[url];
+        if (!request || request.body !== JSON.stringify(body)) {
+            request = pendingRequests[url] = {body: JSON.stringify(body), key: makeRequestKey()};
+        }
+        body.request_key = request.key;
+        return $.ajax({
             type: "POST",
             url: url,
-            data: JSON.stringify(answers),
-            success: updateStatus,
+            data: JSON.stringify(body),
+            success: function(data) {
+                if (pendingRequests[url] === request) {
+                    delete pendingRequests[url];
+                }
+                if (data.conflict) {
+                    // Another client changed the stored answers.  Send the answers shown here
+                    // again, relative to the stored ones.
+                    acknowledgedAnswers = $.extend({}, data.answers);
+                    answersVersion = data.answers_version;
+                    if (retryConflicts) {
+                        callHandler(url, retryConflicts);
+                    }
+                    return;
+                }
+                if (!data.rate_limited) {
+                    $.extend(acknowledgedAnswers, changes);
+                    answersVersion = data.answers_version;
+                }
+                updateStatus(data);
+            }
+        });
+    }
+
+    function scheduleAutosave() {
+        if (!autosaveDelay) {
+            return;
+        }
+        if (autosaveInFlight) {
+            autosavePending = true;
+            return;
+        }
+        clearTimeout(autosaveTimer);
+        autosaveTimer = setTimeout(autosave, autosaveDelay * autosaveBackoff);
+    }
+
+    function autosave() {
+        var started = Date.now();
+        autosaveTimer = null;
+        autosaveInFlight = true;
+        callHandler(saveHandlerUrl).done(function(data) {
+            if (data.rate_limited || Date.now() - started > autosaveDelay) {
+                autosaveBackoff = Math.min(autosaveBackoff * 2, MAX_AUTOSAVE_BACKOFF);
+            } else {
+                autosaveBackoff = 1;
+            }
+            if (data.rate_limited || data.conflict) {
+                autosavePending = true;
+            }
+        }).fail(function() {
+            autosaveBackoff = Math.min(autosaveBackoff * 2, MAX_AUTOSAVE_BACKOFF);
+            autosavePending = true;
+        }).always(function() {
+            autosaveInFlight = false;
+            if (autosavePending) {
+                autosavePending = false;
+                scheduleAutosave();
+            }
+        });
+    }
+
+    function buildRow(row) {
+        var $row = $('<tr>').addClass(row.css_class).css('height', row.height + 'px');
+        $.each(row.cells, function(j, cell) {
+            var $cell = $('<td>').attr('id', cell.id);
+            if (cell.static) {
+                $cell.text(cell.value);
+            } else {
+                $cell.addClass('active');
+                $('<label class="sr">').attr('for', 'input_' + cell.id).text(cell.col_label)
+                    .appendTo($cell);
+                $('<input type="text" size="1">')
+                    .attr({id: 'input_' + cell.id, placeholder: cell.placeholder})
+                    .css('height', cell.height + 'px')
+                    .val(model.answers[cell.id] || '')
+                    .appendTo($cell);
+                markCell($cell, cell.id);
+            }
+            $row.append($cell);
+        });
+        return $row;
+    }
+
+    function buildSpacer(height) {
+        var $cell = $('<td>').attr('colspan', virtual.num_cols).css('height', height + 'px');
+        return $('<tr class="spacer" aria-hidden="true">').append($cell);
+    }
+
+    function findRow(offset) {
+        // Binary search for the last row starting at or above the given vertical offset.
+        var low = 0, high = virtual.offsets.length - 2, middle;
+        while (low < high) {
+            middle = Math.ceil((low + high) / 2);
+            if (virtual.offsets[middle] <= offset) {
+                low = middle;
+            } else {
+                high = middle - 1;
+            }
+        }
+        return low;
+    }
+
+    function fetchPage(page) {
+        virtual.pages[page] = 'loading';
+        $.ajax({
+            type: "POST",
+            url: runtime.handlerUrl(element, 'get_rows'),
+            data: JSON.stringify({start: page * ROWS_PER_PAGE, count: ROWS_PER_PAGE}),
+            success: function(data) {
+                virtual.pages[page] = data.rows;
+                renderVisibleRows();
+            },
+            error: function() {
+                delete virtual.pages[page];
+            }
         });
     }
 
+    function renderVisibleRows() {
+        var num_rows = virtual.offsets.length - 1;
+        var top = virtual.$viewport.scrollTop();
+        var first = Math.max(findRow(top) - OVERSCAN_ROWS, 0);
+        var last = Math.min(
+            findRow(top + virtual.$viewport.innerHeight()) + OVERSCAN_ROWS, num_rows - 1
+        );
+        var page, missing = false, $tbody, focused_id, i, rows;
+        for (page = Math.floor(first / ROWS_PER_PAGE); page * ROWS_PER_PAGE <= last; page++) {
+            if (!$.isArray(virtual.pages[page])) {
+                missing = true;
+                if (!virtual.pages[page]) {
+                    fetchPage(page);
+                }
+            }
+        }
+        if (missing || (first === virtual.first && last === virtual.last)) {
+            return;
+        }
+        virtual.first = first;
+        virtual.last = last;
+        focused_id = $(document.activeElement).closest('td.active', element).attr('id');
+        $tbody = $('<tbody>');
+        if (first > 0) {
+            $tbody.append(buildSpacer(virtual.offsets[first]));
+        }
+        for (i = first; i <= last; i++) {
+            rows = virtual.pages[Math.floor(i / ROWS_PER_PAGE)];
+            $tbody.append(buildRow(rows[i % ROWS_PER_PAGE]));
+        }
+        if (last < num_rows - 1) {
+            $tbody.append(buildSpacer(virtual.offsets[num_rows] - virtual.offsets[last + 1]));
+        }
+        $('table.virtual tbody', element).replaceWith($tbody);
+        if (focused_id) {
+            $('#input_' + focused_id, element).focus();
+        }
+    }
+
+    function initVirtualTable() {
+        var offsets = [0], scheduled = false;
+        $.each(init_args.row_heights, function(i, height) {
+            offsets.push(offsets[i] + height);
+        });
+        virtual = {
+            $viewport: $('.activetable-viewport', element),
+            num_cols: $('table.virtual thead th', element).length,
+            offsets: offsets,
+            pages: {},
+            first: -1,
+            last: -1
+        };
+        virtual.$viewport.on('scroll', function() {
+            if (!scheduled) {
+                scheduled = true;
+                window.requestAnimationFrame(function() {
+                    scheduled = false;
+                    renderVisibleRows();
+                });
+            }
+        });
+        renderVisibleRows();
+    }
+
     function toggleHelp(e) {
         var $help_text = $('#activetable-help-text', element), visible;
         $help_text.toggle();
@@ -92,7 +324,14 @@ function ActiveTableXBlock(runtime, element, init_args) {
     }
 
     $('#activetable-help-button', element).click(toggleHelp);
-    $('.action .check', element).click(function (e) { callHandler(checkHandlerUrl); });
-    $('.action .save', element).click(function (e) { callHandler(saveHandlerUrl); });
+    $('.action .check', element).click(function (e) { callHandler(checkHandlerUrl, true); });
+    $('.action .save', element).click(function (e) { callHandler(saveHandlerUrl, true); });
+    $(element).on('input', 'td.active input', function() {
+        model.answers[$(this).closest('td').attr('id')] = $(this).val();
+        scheduleAutosave();
+    });
+    if (init_args.virtual) {
+        initVirtualTable();
+    }
     updateStatus(init_args);
 }
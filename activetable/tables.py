@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""Parsed table templates and compiled answer keys, cached per process.
+
+Parsed tables are shared between all blocks with identical content fields.  The cached templates
+must never be modified; per-student state is added to copies of the response cells.
+
+Table templates can also be shared between processes.  If a Django cache named "activetable" is
+configured, templates are stored in it when they are built, and looked up in it on a miss of the
+process-wide cache.  The templates built while validating the fields in Studio are stored as well,
+so the first students after publishing a problem don't all parse the table again.  Alternatively,
+the cached templates can be exported to a file with dump_table_templates() and loaded by other
+processes with load_table_templates().  Pickled templates are only valid for the code that
+pickled them, so both the keys in the shared cache and the files contain TEMPLATE_FORMAT_VERSION.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import logging
+import pickle
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .cache import LRUCache, content_hash
+from .cells import NumericCell
+from .formulas import FormulaCell
+from .grading import compile_answer_key
+from .parsers import TABLE_FORMATS, parse_number_list, read_table
+
+log = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+TableTemplate = namedtuple('TableTemplate', 'thead tbody column_widths row_heights')
+
+# The name of the Django cache used to share table templates between processes.
+SHARED_CACHE_NAME = 'activetable'
+# The version of the pickled form of the table templates.  It must be incremented whenever the
+# attributes of the rows or cells change, so templates pickled by older code aren't loaded.
+TEMPLATE_FORMAT_VERSION = 2
+
+table_cache = LRUCache(maxsize=256)  # pylint: disable=invalid-name
+# Answer keys are compiled from the cached table templates and only used for grading.
+answer_key_cache = LRUCache(maxsize=256)  # pylint: disable=invalid-name
+
+
+def table_key(content, column_widths, row_heights, default_tolerance, content_format='python'):
+    """Return a hash identifying the content fields a table template is derived from."""
+    return content_hash(content, column_widths, row_heights, default_tolerance, content_format)
+
+
+def build_table_template(content, column_widths, row_heights, default_tolerance,
+                         content_format='python'):
+    """Parse the content fields and add all information that does not depend on the student.
+
+    A ParseError is raised if any of the fields is invalid.
+    """
+    thead, tbody = read_table(content, content_format)
+    if column_widths:
+        column_widths = parse_number_list(column_widths)
+    if row_heights:
+        row_heights = parse_number_list(row_heights)
+    return assemble_table_template(thead, tbody, column_widths, row_heights, default_tolerance)
+
+
+def assemble_table_template(thead, tbody, column_widths, row_heights, default_tolerance):
+    """Build a table template from the parsed content fields.
+
+    The column widths and row heights are lists of numbers, or None to use the defaults.  The rows
+    of tbody are modified in place.
+    """
+    if not column_widths:
+        column_widths = [800 / len(thead)] * len(thead)
+    if not row_heights:
+        row_heights = [36] * (len(tbody) + 1)
+    rows = []
+    for row, row.height in zip(tbody, row_heights[1:]):
+        if row.index % 2:
+            row.css_class = 'even'
+        else:
+            row.css_class = 'odd'
+        for cell, cell.col_label in zip(row.cells, thead):
+            if isinstance(cell, NumericCell) and cell.abs_tolerance is None:
+                cell.set_tolerance(default_tolerance)
+            elif isinstance(cell, FormulaCell) and cell.tolerance is None:
+                cell.set_tolerance(default_tolerance)
+        row.cells = tuple(row.cells)
+        rows.append(row)
+    return TableTemplate(tuple(thead), tuple(rows), column_widths, row_heights)
+
+
+def get_shared_cache():
+    """Return the Django cache shared between processes, or None if it isn't configured."""
+    if not settings.configured or SHARED_CACHE_NAME not in getattr(settings, 'CACHES', {}):
+        return None
+    return caches[SHARED_CACHE_NAME]
+
+
+def _shared_cache_key(key):
+    """Return the key of a table template in the shared cache."""
+    return f'activetable:table:v{TEMPLATE_FORMAT_VERSION}:{key}'
+
+
+def _load_shared_template(key, build):
+    """Return the template for key from the shared cache, building and storing it on a miss."""
+    shared_cache = get_shared_cache()
+    if shared_cache is None:
+        return build()
+    template = shared_cache.get(_shared_cache_key(key))
+    if template is None:
+        template = build()
+        _store_shared_template(shared_cache, key, template)
+    return template
+
+
+def _store_shared_template(shared_cache, key, template):
+    """Store the template in the shared cache, logging failures instead of raising them."""
+    try:
+        shared_cache.set(_shared_cache_key(key), template, None)
+    except Exception:  # pylint: disable=broad-except
+        # Some cache backends reject large values; the template is still cached per process.
+        log.warning('Could not store table template %s in the shared cache', key, exc_info=True)
+
+
+def store_table_template(fields, template):
+    """Store a template built from the given content fields in the process-wide and shared caches.
+
+    This is used to make the template built while validating the fields in Studio available to the
+    student view.
+    """
+    key = table_key(*fields)
+    table_cache.set(key, template)
+    shared_cache = get_shared_cache()
+    if shared_cache is not None:
+        _store_shared_template(shared_cache, key, template)
+
+
+def get_table_template(  # pylint: disable=too-many-arguments
+        content, column_widths=None, row_heights=None, default_tolerance=1.0,
+        content_format='python', *, key=None):
+    """Return the table template for the given content fields, building it on a cache miss.
+
+    The key is the table_key() of the fields.  It is computed if it isn't given.
+    """
+    fields = (content, column_widths, row_heights, default_tolerance, content_format)
+    if key is None:
+        key = table_key(*fields)
+    return table_cache.get_or_create(
+        key, lambda: _load_shared_template(key, lambda: build_table_template(*fields))
+    )
+
+
+def get_answer_key(  # pylint: disable=too-many-arguments
+        content, column_widths=None, row_heights=None, default_tolerance=1.0,
+        content_format='python', *, key=None):
+    """Return the answer key for the given content fields, compiling it on a cache miss.
+
+    The key is the table_key() of the fields.  It is computed if it isn't given.
+    """
+    fields = (content, column_widths, row_heights, default_tolerance, content_format)
+    if key is None:
+        key = table_key(*fields)
+    return answer_key_cache.get_or_create(
+        key, lambda: compile_answer_key(get_table_template(*fields, key=key).tbody)
+    )
+
+
+def add_content_arguments(parser):
+    """Add the arguments read by load_answer_key() to an argparse parser of a script."""
+    parser.add_argument('--content', required=True, help='file containing the table definition')
+    parser.add_argument('--content-format', choices=TABLE_FORMATS, default='python',
+                        help='the format of the table definition')
+    parser.add_argument('--column-widths', help='the column widths field of the block')
+    parser.add_argument('--row-heights', help='the row heights field of the block')
+    parser.add_argument('--default-tolerance', type=float, default=1.0)
+
+
+def load_answer_key(args):
+    """Return the answer key for the content fields given as script arguments."""
+    with open(args.content, encoding='utf-8') as content_file:
+        content = content_file.read()
+    return get_answer_key(
+        content, args.column_widths, args.row_heights, args.default_tolerance, args.content_format
+    )
+
+
+def dump_table_templates(file):
+    """Write all table templates in the process-wide cache to a binary file object.
+
+    The templates are preceded by TEMPLATE_FORMAT_VERSION.
+    """
+    pickle.dump(TEMPLATE_FORMAT_VERSION, file, pickle.HIGHEST_PROTOCOL)
+    pickle.dump(dict(table_cache.items()), file, pickle.HIGHEST_PROTOCOL)
+
+
+def load_table_templates(file):
+    """Add the table templates written by dump_table_templates() to the process-wide cache.
+
+    The file is unpickled, so it must come from a trusted source.  Files written with a different
+    TEMPLATE_FORMAT_VERSION are ignored with a warning.  Returns the number of templates loaded.
+    """
+    version = pickle.load(file)
+    if version != TEMPLATE_FORMAT_VERSION:
+        log.warning('Ignoring table templates with format version %r, expected %r',
+                    version if isinstance(version, int) else None, TEMPLATE_FORMAT_VERSION)
+        return 0
+    templates = pickle.load(file)
+    for key, template in templates.items():
+        table_cache.set(key, template)
+    return len(templates)
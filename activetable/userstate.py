@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Helpers for the stored student state.
+
+The correctness of the answers at the last check is stored as a bitset over the ordered response
+cells of the table, see encode_bitset() and decode_bitset().
+
+Sources of stored student state are used for offline processing.  A source is any iterable of
+records.  Each record is a dictionary with a "user" key and the values
+of the user_state fields of one block for that user, e.g.
+
+    {"user": "alice", "answers": {"cell_1_1": "42"}, "score": 1.0, "attempts": 1}
+
+Sources are consumed lazily, so arbitrarily large sets of records can be processed in constant
+memory.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import base64
+import json
+
+
+def encode_bitset(values):
+    """Encode a sequence of Boolean values as a compact base64 string."""
+    bits = bytearray((len(values) + 7) // 8)
+    for i, value in enumerate(values):
+        if value:
+            bits[i >> 3] |= 1 << (i & 7)
+    return base64.b64encode(bytes(bits)).decode('ascii')
+
+
+def decode_bitset(encoded, length):
+    """Decode a string returned by encode_bitset() into a list of length Boolean values."""
+    bits = base64.b64decode(encoded)
+    if len(bits) != (length + 7) // 8:
+        raise ValueError('The bitset does not have the expected length.')
+    return [bool(bits[i >> 3] & (1 << (i & 7))) for i in range(length)]
+
+
+class JsonlUserStateSource:
+    """Read records from a file containing one JSON object per line."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        with open(self.path, encoding='utf-8') as source_file:
+            for line_number, line in enumerate(source_file, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as exc:
+                    raise ValueError(f'{self.path}:{line_number}: invalid JSON record') from exc
+                if not isinstance(record, dict) or 'user' not in record:
+                    raise ValueError(f'{self.path}:{line_number}: record without "user" key')
+                yield record
+
+
+class LocalUserStateStore:
+    """An in-memory stand-in for the user state store of the LMS.
+
+    The store maps users to dictionaries of field values.  It can be iterated over as a source, and
+    updated with the results of offline processing.
+    """
+
+    def __init__(self, states=None):
+        self.states = dict(states or {})
+
+    def __iter__(self):
+        for user, state in self.states.items():
+            record = dict(state)
+            record['user'] = user
+            yield record
+
+    def __len__(self):
+        return len(self.states)
+
+    def get(self, user):
+        """Return the field values stored for user."""
+        return self.states.get(user, {})
+
+    def update(self, user, fields):
+        """Update the field values stored for user."""
+        self.states.setdefault(user, {}).update(fields)
@@ -0,0 +1,9 @@
+"""Performance benchmarks for the ActiveTable XBlock.
+
+The benchmarks are not part of the test suite.  Run them from the repository root, e.g.
+
+    python -m benchmarks.numeric_grading
+
+benchmarks.suite runs the main code paths on tables of several sizes and can compare the results
+with an earlier run.
+"""
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""Compare the storage size and decode time of the answers_correct representations.
+
+The old representation is a JSON dictionary mapping cell ids to Booleans.  The new one is a base64
+bitset over the ordered response cells plus the correct and total counts.  Decoding includes
+building the dictionary returned to the frontend.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import functools
+import json
+import random
+
+from activetable.userstate import decode_bitset, encode_bitset
+
+from .common import best_time
+
+NUM_COLS = 5
+
+
+def decode_dict(stored):
+    """Decode the old representation."""
+    return json.loads(stored)
+
+
+def decode_bits(stored, cell_ids):
+    """Decode the new representation."""
+    fields = json.loads(stored)
+    values = decode_bitset(fields['answers_correct_bitset'], fields['answers_total_count'])
+    return dict(zip(cell_ids, values))
+
+
+def main():
+    """Print the sizes and decode times of both representations."""
+    rng = random.Random(0)
+    print(f"{'cells':>8} {'dict [bytes]':>13} {'bitset [bytes]':>15} "
+          f"{'dict [us]':>10} {'bitset [us]':>12}")
+    for num_cells in [10, 100, 1000, 5000, 20000]:
+        cell_ids = [f'cell_{i // NUM_COLS + 1}_{i % NUM_COLS}' for i in range(num_cells)]
+        answers_correct = {cell_id: rng.random() < 0.5 for cell_id in cell_ids}
+        values = list(answers_correct.values())
+        stored_dict = json.dumps(answers_correct)
+        stored_bits = json.dumps(dict(
+            answers_correct_bitset=encode_bitset(values),
+            answers_correct_count=sum(values),
+            answers_total_count=len(values),
+        ))
+        assert decode_bits(stored_bits, cell_ids) == answers_correct
+        dict_time = best_time(functools.partial(decode_dict, stored_dict))
+        bits_time = best_time(functools.partial(decode_bits, stored_bits, cell_ids))
+        print(f'{num_cells:8d} {len(stored_dict):13d} {len(stored_bits):15d} '
+              f'{dict_time * 1e6:10.1f} {bits_time * 1e6:12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""Helpers shared by the benchmarks."""
+from __future__ import absolute_import, division, unicode_literals
+
+import csv
+import gc
+import io
+import json
+import random
+import timeit
+import tracemalloc
+
+import django
+from django.conf import settings
+from xblock.field_data import DictFieldData
+from xblock.fields import ScopeIds
+from xblock.runtime import Runtime
+
+
+class BenchmarkRuntime(Runtime):  # pylint: disable=abstract-method
+    """A minimal runtime for running blocks outside of the workbench."""
+
+    def __init__(self):
+        super().__init__(id_reader=None, id_generator=None)
+        self.events = []
+
+    def handler_url(self, block, handler_name, suffix='', query='', thirdparty=False):
+        return f'/handler/{handler_name}/{suffix}'
+
+    def local_resource_url(self, block, uri):
+        return f'/resource/{uri}'
+
+    def resource_url(self, resource):
+        return f'/static/{resource}'
+
+    def publish(self, block, event_type, event_data):
+        self.events.append((event_type, event_data))
+
+
+def setup_django():
+    """Configure Django for rendering templates, unless it is already configured."""
+    if not settings.configured:
+        settings.configure(
+            TEMPLATES=[{'BACKEND': 'django.template.backends.django.DjangoTemplates'}]
+        )
+        django.setup()
+
+
+def make_block(**fields):
+    """Create an ActiveTableXBlock with the given field values."""
+    from activetable.activetable import ActiveTableXBlock  # pylint: disable=import-outside-toplevel
+    scope_ids = ScopeIds('student', 'activetable', 'definition', 'usage')
+    return ActiveTableXBlock(BenchmarkRuntime(), DictFieldData(fields), scope_ids)
+
+
+def make_table_definition(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        num_rows, num_cols=4, response_ratio=0.5, numeric_ratio=0.5, seed=0,
+        content_format='python'):
+    """Generate a synthetic table definition in the given format.
+
+    Roughly response_ratio of all body cells are response cells, and numeric_ratio of those are
+    Numeric cells; the remaining response cells are Text cells.  The same table is generated for
+    all formats.
+    """
+    rng = random.Random(seed)
+    rows = [[f'Column {j}' for j in range(num_cols)]]
+    for i in range(num_rows):
+        cells = []
+        for j in range(num_cols):
+            if rng.random() >= response_ratio:
+                cells.append(f'static {i} {j}' if j % 2 else rng.randint(0, 1000))
+            elif rng.random() < numeric_ratio:
+                cells.append(dict(type='Numeric', answer=round(rng.uniform(1, 1000), 3),
+                                  tolerance=1))
+            else:
+                cells.append(dict(type='Text', answer=f'answer {i} {j}'))
+        rows.append(cells)
+    if content_format == 'json':
+        return json.dumps(rows, indent=None).replace('], [', '],\n [')
+    if content_format == 'csv':
+        output = io.StringIO()
+        csv.writer(output, lineterminator='\n').writerows(
+            [_python_cell(cell) if isinstance(cell, dict) else cell for cell in row]
+            for row in rows
+        )
+        return output.getvalue()
+    lines = ['[']
+    lines.extend(
+        f"    [{', '.join(_python_cell(cell) for cell in row)}]," for row in rows
+    )
+    lines.append(']')
+    return '\n'.join(lines)
+
+
+def _python_cell(cell):
+    """Return the representation of a generated cell in the Python-like syntax."""
+    if not isinstance(cell, dict):
+        return repr(cell)
+    if cell['type'] == 'Numeric':
+        return f"Numeric(answer={cell['answer']:.3f}, tolerance={cell['tolerance']})"
+    return f"Text(answer={cell['answer']!r})"
+
+
+def make_answers(answer_key, correct_ratio=0.5, seed=0):
+    """Generate student answers for all cells of the given answer key."""
+    rng = random.Random(seed)
+    answers = {}
+    for cell_id, checker in answer_key.items():
+        correct = rng.random() < correct_ratio
+        if hasattr(checker, 'lower'):
+            value = (checker.lower + checker.upper) / 2
+            answers[cell_id] = str(value if correct else value * 2 + 1)
+        else:
+            answers[cell_id] = next(iter(checker.answers)) if correct else 'wrong'
+    return answers
+
+
+def best_time(func, repeat=5, number=None):
+    """Return the best time per call of func in seconds."""
+    timer = timeit.Timer(func)
+    if number is None:
+        number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def peak_memory(func):
+    """Return the peak number of bytes allocated by a single call of func()."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
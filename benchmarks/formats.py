@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""Compare parsing the same table definition in the Python-like, CSV and JSON formats."""
+from __future__ import absolute_import, division, unicode_literals
+
+import functools
+
+from activetable.parsers import TABLE_FORMATS, read_table
+
+from .common import best_time, make_table_definition
+
+NUM_COLS = 5
+
+
+def main():
+    """Print the parse times of all formats."""
+    print(f"{'cells':>8} " + ' '.join(f'{name + " [ms]":>12}' for name in TABLE_FORMATS)
+          + f" {'sizes [kB]':>24}")
+    for num_cells in [1000, 10000, 100000]:
+        times = []
+        sizes = []
+        expected = None
+        for content_format in TABLE_FORMATS:
+            content = make_table_definition(
+                num_cells // NUM_COLS, NUM_COLS, content_format=content_format
+            )
+            result = read_table(content, content_format)
+            assert expected is None or result == expected
+            expected = result
+            times.append(best_time(
+                functools.partial(read_table, content, content_format), repeat=3, number=1
+            ))
+            sizes.append(len(content) / 1024)
+        print(f'{num_cells:8d} ' + ' '.join(f'{t * 1e3:12.1f}' for t in times)
+              + ' ' + ' / '.join(f'{size:6.0f}' for size in sizes).rjust(24))
+
+
+if __name__ == '__main__':
+    main()
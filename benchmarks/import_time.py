@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Measure the time it takes to import the block, and hold it to a budget.
+
+Each measurement imports the module in a fresh interpreter with "python -X importtime" and parses
+the report the interpreter writes to stderr.  The XBlock runtime and the Studio mixin are imported
+before the measurement starts, since every process loading the block needs them anyway, so only
+the import time caused by this package is measured:
+
+    python -m benchmarks.import_time --budget 50
+
+The exit status is 1 if the best time of the repetitions exceeds the budget in milliseconds.  The
+check isn't part of the unit tests, since wall-clock times are unreliable on busy CI runners.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import argparse
+import re
+import subprocess
+import sys
+
+# The modules every process loading the block imports anyway.
+PRELOAD = ('xblock.core', 'xblockutils.studio_editable')
+MARKER = '-- activetable import starts --'
+# The import time budget of activetable.activetable in milliseconds.
+BUDGET = 50.0
+_LINE_PATTERN = re.compile(r'import time:\s*(\d+) \|\s*(\d+) \|( *)(\S+)')
+
+
+def measure(module, preload=PRELOAD):
+    """Import the module in a new interpreter, returning a list of (name, self, cumulative, depth).
+
+    The times are in microseconds.  Only modules imported after the preloaded ones are included.
+    """
+    code = ''.join(f'import {name}; ' for name in preload)
+    code += f'import sys; sys.stderr.write({MARKER!r} + "\\n"); import {module}'
+    result = subprocess.run(
+        [sys.executable, '-W', 'ignore', '-X', 'importtime', '-c', code],
+        capture_output=True, check=True, text=True,
+    )
+    report = result.stderr.split(MARKER, 1)[1]
+    imports = []
+    for line in report.splitlines():
+        match = _LINE_PATTERN.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            imports.append((name, int(own), int(cumulative), (len(indent) - 1) // 2))
+    return imports
+
+
+def total_time(imports):
+    """Return the total import time in microseconds of a list returned by measure()."""
+    return sum(cumulative for _name, _own, cumulative, depth in imports if depth == 0)
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description='Measure the import time of the block.')
+    parser.add_argument('--module', default='activetable.activetable')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10,
+                        help='the number of slowest modules to list')
+    parser.add_argument('--budget', type=float, default=BUDGET,
+                        help='the maximum import time in milliseconds')
+    args = parser.parse_args(argv)
+
+    runs = [measure(args.module) for _ in range(args.repeat)]
+    best = min(runs, key=total_time)
+    print(f"{'module':>40} {'self [ms]':>10} {'cumulative [ms]':>16}")
+    for entry in sorted(best, key=lambda entry: -entry[1])[:args.top]:
+        name, own, cumulative = entry[:3]
+        print(f'{name:>40} {own / 1e3:10.2f} {cumulative / 1e3:16.2f}')
+    print()
+    elapsed = total_time(best) / 1e3
+    print(f'{args.module}: {elapsed:.1f} ms ({len(best)} modules), budget {args.budget:.1f} ms')
+    if elapsed > args.budget:
+        print('The import time exceeds the budget.')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
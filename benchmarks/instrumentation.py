@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""Measure the overhead of the instrumentation decorator while instrumentation is disabled."""
+from __future__ import absolute_import, division, unicode_literals
+
+import functools
+
+from activetable import instrumentation
+from activetable.activetable import ActiveTableXBlock
+
+from .common import best_time, make_block
+
+
+def main():
+    """Print the time of an instrumented method with and without the decorator."""
+    block = make_block()
+    block.parse_fields()
+    undecorated = functools.partial(ActiveTableXBlock.parse_fields.__wrapped__, block)
+    disabled = block.parse_fields
+    times = [best_time(undecorated), best_time(disabled)]
+    instrumentation.configure([instrumentation.Aggregator()])
+    times.append(best_time(block.parse_fields))
+    instrumentation.configure()
+    print(f"{'undecorated [us]':>17} {'disabled [us]':>14} {'aggregator [us]':>16}")
+    print(' '.join(f'{t * 1e6:{width}.3f}' for t, width in zip(times, [17, 14, 16])))
+
+
+if __name__ == '__main__':
+    main()
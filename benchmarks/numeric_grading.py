@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Compare the scalar grading path with a vectorized NumPy grader for numeric cells.
+
+The output shows the time per grade() call for tables with an increasing number of numeric cells.
+On CPython 3.11 with NumPy 2.4, the vectorized grader only breaks even somewhere above 100 cells and
+never gets consistently faster, since both paths spend most of their time converting the responses
+to floats.  activetable.grading therefore only implements the scalar path; the vectorized grader
+below is kept so the measurement can be repeated.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import functools
+import numbers
+
+from activetable import grading
+from activetable.cells import NumericCell, NumericChecker
+from activetable.parsers import parse_table
+
+from .common import best_time, make_answers, make_table_definition
+
+try:
+    import numpy
+except ImportError:
+    numpy = None  # pylint: disable=invalid-name
+
+
+class NumericBatch:
+    """The bounds of all numeric cells of an answer key packed into arrays.
+
+    Cells with restrictions on the number of significant digits are not included, since counting
+    digits can't be vectorized.
+    """
+
+    def __init__(self, answer_key):
+        self.cell_ids = [
+            cell_id for cell_id, checker in answer_key.items()
+            if isinstance(checker, NumericChecker)
+            and isinstance(checker.lower, numbers.Real)
+            and not (checker.min_significant_digits or checker.max_significant_digits)
+        ]
+        self.positions = {cell_id: i for i, cell_id in enumerate(self.cell_ids)}
+        self.lower = numpy.array([answer_key[cell_id].lower for cell_id in self.cell_ids], float)
+        self.upper = numpy.array([answer_key[cell_id].upper for cell_id in self.cell_ids], float)
+
+    def grade(self, answers):
+        """Grade the answers to the cells in this batch, ignoring all other cells."""
+        positions = self.positions
+        cell_ids = [cell_id for cell_id in answers if cell_id in positions]
+        responses = [answers[cell_id] for cell_id in cell_ids]
+        try:
+            values = numpy.array([float(response) for response in responses], float)
+        except ValueError:
+            values = numpy.array([_to_float(response) for response in responses], float)
+        index = numpy.array([positions[cell_id] for cell_id in cell_ids], numpy.intp)
+        # Unparseable responses are NaN, and are marked as incorrect by the mask.
+        valid = ~numpy.isnan(values)
+        correct = valid & (self.lower[index] <= values) & (values <= self.upper[index])
+        return dict(zip(cell_ids, correct.tolist()))
+
+
+def _to_float(student_response):
+    """Convert the response to float, returning NaN if it can't be parsed."""
+    try:
+        return float(student_response)
+    except ValueError:
+        return float('nan')
+
+
+def answer_key_for(num_cells):
+    """Compile an answer key with num_cells numeric cells."""
+    _, tbody = parse_table(make_table_definition(
+        num_cells, num_cols=1, response_ratio=1.0, numeric_ratio=1.0
+    ))
+    for row in tbody:
+        for cell in row.cells:
+            if isinstance(cell, NumericCell) and cell.abs_tolerance is None:
+                cell.set_tolerance(1.0)
+    return grading.compile_answer_key(tbody)
+
+
+def main():
+    """Print the timings of both grading paths."""
+    if numpy is None:
+        print('NumPy is not installed; only the scalar path is available.')
+        return
+    print(f"{'cells':>8} {'scalar [us]':>12} {'vectorized [us]':>16} {'speedup':>8}")
+    for num_cells in [1, 4, 16, 32, 64, 128, 256, 1024, 4096, 16384]:
+        answer_key = answer_key_for(num_cells)
+        answers = make_answers(answer_key)
+        batch = NumericBatch(answer_key)
+        scalar = best_time(functools.partial(grading.grade, answer_key, answers))
+        vectorized = best_time(functools.partial(batch.grade, answers))
+        assert batch.grade(answers) == grading.grade(answer_key, answers)
+        print(f'{num_cells:8d} {scalar * 1e6:12.1f} {vectorized * 1e6:16.1f} '
+              f'{scalar / vectorized:8.2f}')
+
+
+if __name__ == '__main__':
+    main()
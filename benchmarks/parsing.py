@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""Compare the AST-based table parser with the incremental tokenizer-based parser.
+
+For both parsers, the best time and the peak memory allocated while parsing are reported.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import functools
+import warnings
+
+from activetable.parsers import parse_table, parse_table_streaming
+
+from .common import best_time, make_table_definition, peak_memory
+
+NUM_COLS = 5
+
+
+def main():
+    """Print the timings and peak memory of both parsers."""
+    warnings.simplefilter('ignore')
+    print(f"{'cells':>8} {'ast [ms]':>10} {'streaming [ms]':>15} {'ast peak [MB]':>14} "
+          f"{'streaming peak [MB]':>20}")
+    for num_cells in [1000, 10000, 50000]:
+        content = make_table_definition(num_cells // NUM_COLS, NUM_COLS)
+        assert parse_table(content) == parse_table_streaming(content)
+        times = [
+            best_time(functools.partial(parse, content), repeat=3, number=1)
+            for parse in (parse_table, parse_table_streaming)
+        ]
+        peaks = [
+            peak_memory(functools.partial(parse, content)) / 2 ** 20
+            for parse in (parse_table, parse_table_streaming)
+        ]
+        print(f'{num_cells:8d} {times[0] * 1e3:10.1f} {times[1] * 1e3:15.1f} {peaks[0]:14.1f} '
+              f'{peaks[1]:20.1f}')
+
+
+if __name__ == '__main__':
+    main()
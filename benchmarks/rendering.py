@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Compare rendering the student view HTML from scratch with filling in a cached skeleton.
+
+The full render is what student_view did before the skeleton cache: parse the fields (from the
+table cache), postprocess the table and render the HTML.  The render backends are compared as
+well: the best time and the peak memory allocated by a full render with the Django template and
+with the Python string renderer.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import functools
+import warnings
+
+from .common import (
+    best_time, make_answers, make_block, make_table_definition, peak_memory, setup_django
+)
+
+NUM_COLS = 5
+SIZES = [10, 100, 500, 1000, 5000]
+
+
+def compare_skeleton():
+    """Print the timings of a full render and of filling in the skeleton."""
+    print(f"{'cells':>8} {'full render [ms]':>17} {'skeleton fill [ms]':>19} {'speedup':>8}")
+    for num_cells in SIZES:
+        block = make_block(content=make_table_definition(num_cells // NUM_COLS, NUM_COLS))
+        answers = make_answers(block.get_answer_key())
+        block.answers = answers
+        skeleton = block.get_html_skeleton()
+        assert skeleton.fill(answers) == block.render_table(answers)
+        full = best_time(functools.partial(block.render_table, answers), repeat=3)
+        fill = best_time(functools.partial(skeleton.fill, answers), repeat=3)
+        print(f'{num_cells:8d} {full * 1e3:17.3f} {fill * 1e3:19.3f} {full / fill:8.1f}')
+
+
+def compare_backends():
+    """Print the timings and peak memory of a full render with each render backend."""
+    print(f"{'cells':>8} {'backend':>8} {'render [ms]':>12} {'peak [kB]':>10} {'speedup':>8}")
+    for num_cells in SIZES:
+        block = make_block(content=make_table_definition(num_cells // NUM_COLS, NUM_COLS))
+        answers = make_answers(block.get_answer_key())
+        render = functools.partial(block.render_table, answers)
+        outputs, times = [], []
+        for backend in ['django', 'python']:
+            block.render_backend = backend
+            outputs.append(render())
+            times.append(best_time(render, repeat=3))
+            print(f'{num_cells:8d} {backend:>8} {times[-1] * 1e3:12.3f} '
+                  f'{peak_memory(render) / 1024:10.1f} {times[0] / times[-1]:8.1f}')
+        assert outputs[0] == outputs[1]
+
+
+def main():
+    """Print the timings of the rendering paths and backends."""
+    warnings.simplefilter('ignore')
+    setup_django()
+    compare_skeleton()
+    print()
+    compare_backends()
+
+
+if __name__ == '__main__':
+    main()
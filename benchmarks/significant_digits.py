@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Compare counting significant digits with decimal.Decimal and with the string-based counter.
+
+The first table times counting the digits of a single response; the second one grades numeric
+tables with restrictions on the number of significant digits.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import decimal
+import functools
+import random
+
+from activetable import cells
+from activetable.grading import grade_all
+from activetable.tables import get_answer_key
+
+from .common import best_time
+
+RESPONSES = ['42', '0.0050', '-1.5e3', '1789', '6.28318', '100.00', '  3.14 ', '7E-05']
+
+
+def decimal_digits(number):
+    """Count the significant digits the way NumericChecker did before."""
+    return len(decimal.Decimal(number).as_tuple().digits)
+
+
+def make_content(num_cells, seed=0):
+    """Generate a table of num_cells numeric cells restricting the significant digits."""
+    rng = random.Random(seed)
+    rows = [
+        f'[Numeric(answer={rng.uniform(1, 1000):.3f}, min_significant_digits=3, '
+        f'max_significant_digits=6)]'
+        for _ in range(num_cells)
+    ]
+    return f"[['Value'], {', '.join(rows)}]"
+
+
+def main():
+    """Print the timings of both counters."""
+    print(f"{'response':>10} {'decimal [ns]':>13} {'string [ns]':>12} {'speedup':>8}")
+    for response in RESPONSES:
+        old = best_time(functools.partial(decimal_digits, response))
+        new = best_time(functools.partial(cells.count_significant_digits, response))
+        print(f'{response!r:>10} {old * 1e9:13.0f} {new * 1e9:12.0f} {old / new:8.1f}')
+
+    print()
+    print(f"{'cells':>8} {'decimal [ms]':>13} {'string [ms]':>12} {'speedup':>8}")
+    counter = cells.count_significant_digits
+    for num_cells in [1000, 10000]:
+        answer_key = get_answer_key(make_content(num_cells))
+        answers = {
+            cell_id: f'{(checker.lower + checker.upper) / 2:.4f}'
+            for cell_id, checker in answer_key.items()
+        }
+        grade = functools.partial(grade_all, answer_key, answers)
+        cells.count_significant_digits = decimal_digits
+        try:
+            old = best_time(grade, repeat=3)
+        finally:
+            cells.count_significant_digits = counter
+        new = best_time(grade, repeat=3)
+        print(f'{num_cells:8d} {old * 1e3:13.2f} {new * 1e3:12.2f} {old / new:8.1f}')
+
+
+if __name__ == '__main__':
+    main()
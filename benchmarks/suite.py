@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""Benchmark suite timing the main code paths of the block on synthetic tables.
+
+For each table size and mix of Text and Numeric response cells, the suite measures the best time
+per call and the peak memory allocated by a single call of each operation.  Handlers are called
+through a BenchmarkRuntime with real webob requests, like in the workbench.  The results can be
+saved as JSON and compared with the results of an earlier run:
+
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --output after.json --baseline before.json
+
+When comparing, the exit status is 1 if any operation got slower than the threshold allows.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import argparse
+import datetime
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import warnings
+
+from webob import Request
+
+from activetable import rendering, tables
+from activetable.parsers import parse_number_list, parse_table, read_table
+
+from .common import (
+    best_time, make_answers, make_block, make_table_definition, peak_memory, setup_django
+)
+
+NUM_COLS = 5
+# The fraction of Numeric cells among the response cells for each named mix.
+MIXES = dict(text=0.1, mixed=0.5, numeric=0.9)
+
+
+def clear_caches():
+    """Clear all process-wide caches, so the next call has to rebuild everything."""
+    tables.table_cache.clear()
+    tables.answer_key_cache.clear()
+    rendering.skeleton_cache.clear()
+    rendering.table_data_cache.clear()
+
+
+def call_handler(block, handler_name, body):
+    """Call a JSON handler of the block with the given encoded request body."""
+    request = Request.blank('/', method='POST', body=body)
+    return getattr(block, handler_name)(request)
+
+
+def make_operations(num_cells, numeric_ratio):
+    """Return a dictionary mapping operation names to functions running the operation once."""
+    num_rows = num_cells // NUM_COLS
+    content = make_table_definition(num_rows, NUM_COLS, numeric_ratio=numeric_ratio)
+    row_heights = json.dumps([36] * (num_rows + 1))
+    block = make_block(content=content, row_heights=row_heights)
+    # Let the save handler accept all requests.
+    block.max_saves_per_minute = float('inf')
+    answers = make_answers(block.get_answer_key())
+    block.answers = answers
+    check_body = json.dumps(answers).encode('utf-8')
+    # Alternate between two values of one cell, so every save actually writes the answers.
+    cell_id = next(iter(answers))
+    save_bodies = itertools.cycle([
+        json.dumps(dict(changes={cell_id: value})).encode('utf-8') for value in ['1', '2']
+    ])
+
+    def postprocess_table():
+        block.parse_fields()
+        block.postprocess_table()
+
+    def student_view_cold():
+        clear_caches()
+        block.student_view()
+
+    def check_answers():
+        del block.runtime.events[:]
+        call_handler(block, 'check_answers', check_body)
+
+    def save_answers():
+        call_handler(block, 'save_answers', next(save_bodies))
+
+    return dict(
+        parse_table=lambda: parse_table(content),
+        read_table=lambda: read_table(content),
+        parse_number_list=lambda: parse_number_list(row_heights),
+        postprocess_table=postprocess_table,
+        student_view=block.student_view,
+        student_view_cold=student_view_cold,
+        check_answers=check_answers,
+        save_answers=save_answers,
+    )
+
+
+def run(sizes, mixes, repeat):
+    """Run all operations for all table sizes and mixes, returning a list of result dictionaries."""
+    results = []
+    for num_cells, mix in itertools.product(sizes, mixes):
+        operations = make_operations(num_cells, MIXES[mix])
+        for name, func in operations.items():
+            func()  # Warm up the caches used by the operation.
+            results.append(dict(
+                operation=name,
+                cells=num_cells,
+                mix=mix,
+                time=best_time(func, repeat=repeat),
+                peak_memory=peak_memory(func),
+            ))
+            print_result(results[-1])
+    return results
+
+
+def result_key(result):
+    """Return the key identifying the measurement of a result dictionary."""
+    return (result['operation'], result['cells'], result['mix'])
+
+
+def print_result(result, baseline=None):
+    """Print a single result, compared with the baseline result if one is given."""
+    line = (f"{result['operation']:>18} {result['cells']:8d} {result['mix']:>8} "
+            f"{result['time'] * 1e3:12.3f} {result['peak_memory'] / 1024:14.1f}")
+    if baseline is not None:
+        line += (f" {result['time'] / baseline['time']:10.2f}"
+                 f" {result['peak_memory'] / max(baseline['peak_memory'], 1):10.2f}")
+    print(line)
+
+
+def compare(baseline, results, threshold):
+    """Print the results relative to the baseline, returning the keys of all regressions.
+
+    A regression is an operation that takes more than 1 + threshold times the baseline time.
+    """
+    baseline_results = {result_key(result): result for result in baseline['results']}
+    print(f"{'operation':>18} {'cells':>8} {'mix':>8} {'time [ms]':>12} {'peak [kB]':>14} "
+          f"{'time ratio':>10} {'mem ratio':>10}")
+    regressions = []
+    for result in results['results']:
+        base = baseline_results.get(result_key(result))
+        print_result(result, base)
+        if base is not None and result['time'] > base['time'] * (1 + threshold):
+            regressions.append(result_key(result))
+    return regressions
+
+
+def git_revision():
+    """Return the current git commit, or None if it can't be determined."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, check=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description='Run the ActiveTable benchmark suite.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+                        help='the numbers of cells of the generated tables')
+    parser.add_argument('--mixes', nargs='+', choices=sorted(MIXES), default=sorted(MIXES),
+                        help='the mixes of Text and Numeric response cells')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='JSON file the results are written to')
+    parser.add_argument('--baseline', help='JSON file with the results of an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='the relative slowdown reported as a regression')
+    args = parser.parse_args(argv)
+    warnings.simplefilter('ignore')
+    setup_django()
+
+    print(f"{'operation':>18} {'cells':>8} {'mix':>8} {'time [ms]':>12} {'peak [kB]':>14}")
+    results = dict(
+        metadata=dict(
+            python=sys.version.split()[0],
+            platform=platform.platform(),
+            revision=git_revision(),
+            timestamp=datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        ),
+        results=run(args.sizes, args.mixes, args.repeat),
+    )
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(results, output, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        print()
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} regressions: ' + ', '.join(
+                f'{operation} ({cells} cells, {mix})' for operation, cells, mix in regressions
+            ))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""Measure the memory footprint of cached table templates.
+
+The footprint is the memory still allocated after building the template, i.e. what a template
+occupies in the table cache, excluding the table definition string itself.
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import gc
+import tracemalloc
+
+from activetable.tables import build_table_template
+
+from .common import make_table_definition
+
+NUM_COLS = 5
+
+
+def template_footprint(content):
+    """Return the number of bytes allocated by a template built from content."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        template = build_table_template(content, None, None, 1.0)
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] - before, template
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    """Print the footprint of templates of increasing size."""
+    print(f"{'cells':>8} {'footprint [kB]':>15} {'bytes/cell':>11}")
+    for num_cells in [100, 1000, 10000, 50000]:
+        content = make_table_definition(num_cells // NUM_COLS, NUM_COLS)
+        footprint, _ = template_footprint(content)
+        print(f'{num_cells:8d} {footprint / 1024:15.1f} {footprint / num_cells:11.1f}')
+
+
+if __name__ == '__main__':
+    main()
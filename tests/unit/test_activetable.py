@@ -2,14 +2,26 @@
 
 from __future__ import absolute_import, division, unicode_literals
 
+import json
 import unittest
 
+import django
 import mock
+from django.conf import settings
+from django.utils import translation
+from webob import Request
 from xblock.field_data import DictFieldData
 from xblock.runtime import Runtime
 from xblock.validation import Validation
 
+from activetable import activetable, tables
 from activetable.activetable import ActiveTableXBlock
+from activetable.instrumentation import Counters
+from activetable.tables import table_cache
+
+if not settings.configured:
+    settings.configure(TEMPLATES=[{'BACKEND': 'django.template.backends.django.DjangoTemplates'}])
+    django.setup()
 
 class ActiveTableTest(unittest.TestCase):
 
@@ -17,6 +29,11 @@ class ActiveTableTest(unittest.TestCase):
         self.runtime_mock = mock.Mock(spec=Runtime)
         self.block = ActiveTableXBlock(self.runtime_mock, DictFieldData({}), mock.Mock())
 
+    def call_handler(self, handler_name, data):
+        request = Request.blank('/', method='POST', body=json.dumps(data).encode('utf-8'))
+        response = getattr(self.block, handler_name)(request)
+        return json.loads(response.body.decode('utf-8'))
+
     def verify_validation(self, data, expect_success):
         validation = Validation('xblock_id')
         self.block.validate_field_data(validation, data)
@@ -25,8 +42,11 @@ class ActiveTableTest(unittest.TestCase):
     def test_validate_field_data(self):
         data = mock.Mock()
         data.content = 'invalid'
+        data.content_format = 'python'
+        data.default_tolerance = 1.0
         data.column_widths = ''
         data.row_heights = ''
+        data.autosave_interval = None
         self.verify_validation(data, False)
         data.content = '[["header"], [6.283]]'
         self.verify_validation(data, True)
@@ -42,3 +62,330 @@ class ActiveTableTest(unittest.TestCase):
         self.verify_validation(data, False)
         data.row_heights = '[1, 2]'
         self.verify_validation(data, True)
+        for data.autosave_interval in [0, -5]:
+            self.verify_validation(data, False)
+        data.autosave_interval = 1
+        self.verify_validation(data, True)
+        data.content_format = 'csv'
+        self.verify_validation(data, False)
+        data.content = 'header\n6.283'
+        self.verify_validation(data, True)
+        data.content_format = 'json'
+        self.verify_validation(data, False)
+        data.content = '[["header"], [{"type": "Numeric", "answer": 6.283}]]'
+        self.verify_validation(data, True)
+        data.content_format = 'yaml'
+        self.verify_validation(data, False)
+
+    def test_content_format(self):
+        self.block.content = '[["header"], [6.283]]'
+        python_template = self.block.get_table_template()
+        self.block.content_format = 'json'
+        json_template = self.block.get_table_template()
+        self.assertIsNot(json_template, python_template)
+        self.assertEqual(json_template, python_template)
+
+    def test_parse_fields_cache(self):
+        table_cache.clear()
+        content = '[["Header 1", "Header 2"], [Text(answer="a"), Numeric(answer=42)]]'
+        self.block.content = content
+        other = ActiveTableXBlock(self.runtime_mock, DictFieldData({}), mock.Mock())
+        other.content = content
+        self.block.answers = dict(cell_1_0='my answer')
+        for block in self.block, other:
+            block.parse_fields()
+            block.postprocess_table()
+        self.assertEqual(table_cache.stats()['misses'], 1)
+        self.assertEqual(table_cache.stats()['hits'], 1)
+        self.assertIs(self.block.thead, other.thead)
+        self.assertEqual(self.block.response_cells['cell_1_0'].value, 'my answer')
+        self.assertIsNone(other.response_cells['cell_1_0'].value)
+        self.assertAlmostEqual(other.response_cells['cell_1_1'].abs_tolerance, 0.42)
+        other.default_tolerance = 10.0
+        other.parse_fields()
+        other.postprocess_table()
+        self.assertEqual(table_cache.stats()['misses'], 2)
+        self.assertAlmostEqual(other.response_cells['cell_1_1'].abs_tolerance, 4.2)
+
+    def test_table_key_cache(self):
+        self.block.content = '[["Header"], [Numeric(answer=42)]]'
+        with mock.patch('activetable.tables.table_key', wraps=tables.table_key) as table_key_mock:
+            self.call_handler('check_answers', dict(cell_1_0='42'))
+            self.call_handler('check_answers', dict(cell_1_0='41'))
+            self.assertEqual(table_key_mock.call_count, 1)
+            key = self.block.get_table_key()
+            self.block.content = '[["Header"], [Numeric(answer=41)]]'
+            self.assertNotEqual(self.block.get_table_key(), key)
+            self.assertEqual(table_key_mock.call_count, 2)
+        self.assertEqual(self.call_handler('check_answers', dict(cell_1_0='41'))['score'], 1)
+
+    def test_validation_stores_template(self):
+        table_cache.clear()
+        data = mock.Mock()
+        data.content = '[["Header 1", "Header 2"], [Text(answer="a"), Numeric(answer=42)]]'
+        data.content_format = 'python'
+        data.default_tolerance = 1.0
+        data.column_widths = '[100, 200]'
+        data.row_heights = None
+        data.autosave_interval = None
+        self.verify_validation(data, True)
+        self.assertEqual(len(table_cache), 1)
+        for name in ['content', 'content_format', 'default_tolerance', 'column_widths']:
+            setattr(self.block, name, getattr(data, name))
+        with mock.patch('activetable.tables.read_table') as read_table_mock:
+            self.block.parse_fields()
+        read_table_mock.assert_not_called()
+        self.assertEqual(self.block._column_widths, [100, 200])
+        self.assertEqual(table_cache.stats()['hits'], 1)
+        # Invalid fields are not stored.
+        data.content = 'invalid'
+        self.verify_validation(data, False)
+        self.assertEqual(len(table_cache), 1)
+
+    def test_static_resources_cache(self):
+        activetable.resource_cache.clear()
+        with mock.patch.object(activetable, 'loader') as loader_mock:
+            loader_mock.render_django_template.side_effect = lambda path, context: repr(context)
+            css = activetable.render_css('/correct', '/incorrect', '/unanswered')
+            self.assertIn("'correct_icon': '/correct'", css)
+            self.assertIs(activetable.render_css('/correct', '/incorrect', '/unanswered'), css)
+            self.assertNotEqual(activetable.render_css('/c', '/incorrect', '/unanswered'), css)
+            self.assertEqual(loader_mock.render_django_template.call_count, 2)
+            activetable.load_javascript()
+            activetable.load_javascript()
+            loader_mock.load_unicode.assert_called_once_with('static/js/src/activetable.js')
+
+    def test_delta_answers(self):
+        answers = dict(cell_1_1='answer', cell_2_1='41')
+        self.assertEqual(
+            self.block.check_and_save_answers(answers), dict(cell_1_1=True, cell_2_1=False)
+        )
+        self.assertEqual(self.block.answers_version, 1)
+        answers_correct = self.block.check_and_save_answers(
+            dict(version=1, changes=dict(cell_2_1='42'))
+        )
+        self.assertEqual(answers_correct, dict(cell_1_1=True, cell_2_1=True))
+        self.assertEqual(self.block.answers, dict(cell_1_1='answer', cell_2_1='42'))
+        self.assertEqual(self.block.answers_version, 2)
+        self.block.check_and_save_answers(dict(version=2, changes=dict(cell_2_1='42')))
+        self.block.check_and_save_answers(dict(version=2, changes={}))
+        self.assertEqual(self.block.answers_version, 2)
+        self.assertEqual(self.block.get_status()['answers_version'], 2)
+        with self.assertRaises(KeyError):
+            self.block.check_and_save_answers(dict(version=2, changes=dict(cell_1_0='x')))
+        self.assertEqual(self.block.answers, dict(cell_1_1='answer', cell_2_1='42'))
+        # Answers to cells that have been removed from the table are dropped.
+        self.block.answers = dict(cell_1_1='answer', cell_3_1='stale')
+        self.block.check_and_save_answers(dict(version=3, changes={}))
+        self.assertEqual(self.block.answers, dict(cell_1_1='answer'))
+
+    def test_version_conflict(self):
+        self.call_handler('save_answers', dict(version=0, changes=dict(cell_1_1='answer')))
+        # Another client saves a change, so the delta of this client is based on version 0.
+        self.call_handler('save_answers', dict(version=1, changes=dict(cell_2_1='41')))
+        for handler_name in ['check_answers', 'save_answers']:
+            status = self.call_handler(
+                handler_name, dict(version=1, changes=dict(cell_1_1='x'), request_key='a')
+            )
+            self.assertTrue(status['conflict'])
+            self.assertEqual(status['answers'], dict(cell_1_1='answer', cell_2_1='41'))
+            self.assertEqual(status['answers_version'], 2)
+        self.assertEqual(self.block.attempts, 0)
+        self.assertEqual(self.block.answers, dict(cell_1_1='answer', cell_2_1='41'))
+        # Resending with the current version and the same key is processed.
+        status = self.call_handler(
+            'check_answers', dict(version=2, changes=dict(cell_1_1='x'), request_key='a')
+        )
+        self.assertNotIn('conflict', status)
+        self.assertEqual(status['attempts'], 1)
+        # Deltas without a version are always merged.
+        self.call_handler('save_answers', dict(changes=dict(cell_2_1='42')))
+        self.assertEqual(self.block.answers, dict(cell_1_1='x', cell_2_1='42'))
+
+    def test_formula_cells(self):
+        self.block.content = """[
+            ['Voltage', 'Current', 'Resistance'],
+            [Numeric(answer=12), Numeric(answer=2), Formula(expr='cell_1_0 / cell_1_1')],
+            [Numeric(answer=5), 0.5, Formula(expr='cell_2_0 / cell_2_1', tolerance=0)],
+        ]"""
+        # The correct answer of a formula cell is computed from the answers of the student.
+        answers_correct = self.block.check_and_save_answers(dict(
+            cell_1_0='10', cell_1_1='2', cell_1_2='5', cell_2_0='x', cell_2_2='10'
+        ))
+        self.assertEqual(answers_correct, dict(
+            cell_1_0=False, cell_1_1=True, cell_1_2=True, cell_2_0=False, cell_2_2=False
+        ))
+        key = self.block.get_answer_key().formulas.key
+        self.assertEqual(self.block.formula_values, dict(
+            key=key, values=dict(cell_1_2=5.0, cell_2_2=None)
+        ))
+        with mock.patch('activetable.formulas.FormulaGraph._evaluate', autospec=True,
+                        return_value=20.0) as evaluate_mock:
+            answers_correct = self.block.check_and_save_answers(
+                dict(changes=dict(cell_2_0='10', cell_2_2='20'))
+            )
+        # Only the formula depending on the changed answer is evaluated again.
+        self.assertEqual(
+            [call[0][1] for call in evaluate_mock.call_args_list], ['cell_2_2']
+        )
+        self.assertTrue(answers_correct['cell_2_2'])
+        self.assertEqual(self.block.formula_values['values'], dict(cell_1_2=5.0, cell_2_2=20.0))
+        # Values stored for different formulas are not reused.
+        self.block.formula_values = dict(key='stale', values=dict(cell_1_2=1.0, cell_2_2=1.0))
+        self.block.check_and_save_answers(dict(changes={}))
+        self.assertEqual(self.block.formula_values['values'], dict(cell_1_2=5.0, cell_2_2=20.0))
+
+    def test_answer_statistics(self):
+        self.call_handler('check_answers', dict(cell_1_1='answer', cell_2_1='41'))
+        self.call_handler('check_answers', dict(cell_1_1='wrong', cell_2_1='41'))
+        response = self.block.get_statistics(Request.blank('/', method='POST', body=b'{}'))
+        self.assertEqual(response.status_code, 403)
+        self.runtime_mock.user_is_staff = True
+        self.assertEqual(self.call_handler('get_statistics', {}), dict(cells=[
+            dict(id='cell_1_1', attempts=2, correct=1, incorrect=1,
+                 top_wrong_answers=[dict(answer='wrong', count=1)]),
+            dict(id='cell_2_1', attempts=2, correct=0, incorrect=2,
+                 top_wrong_answers=[dict(answer='41', count=2)]),
+        ]))
+        # The statistics are reset when the table definition changes.
+        self.block.content = '[["header"], [Numeric(answer=1)]]'
+        self.assertEqual(self.call_handler('get_statistics', {})['cells'][0]['attempts'], 0)
+        self.call_handler('check_answers', dict(cell_1_0='1'))
+        self.assertEqual(self.block.answer_statistics['correct'], [1])
+
+    def test_virtual_rows(self):
+        self.block.content = '[["Index", "Square"], {}]'.format(', '.join(
+            f'[{i}, Numeric(answer={i * i})]' for i in range(10)
+        ))
+        self.assertFalse(self.block.is_virtual)
+        self.block.virtual_rows_threshold = 10
+        self.assertTrue(self.block.is_virtual)
+        status = self.call_handler('get_rows', dict(start=8, count=5))
+        self.assertEqual(status['num_rows'], 10)
+        self.assertEqual(status['rows'], [
+            dict(index=i, css_class='even' if i % 2 else 'odd', height=36, cells=[
+                dict(id=f'cell_{i}_0', static=True, value=str(i - 1)),
+                dict(id=f'cell_{i}_1', col_label='Square', type='Numeric',
+                     placeholder='numeric response', height=34),
+            ]) for i in [9, 10]
+        ])
+        for body in ['{"start": "x"}', '{"count": null}', '{"start": [1]}', '{"start": 1e400}',
+                     '[8, 5]']:
+            request = Request.blank('/', method='POST', body=body.encode('utf-8'))
+            self.assertEqual(self.block.get_rows(request).status_int, 400)
+        # Only the cells the student filled in are sent, but all cells are graded.
+        answers_correct = self.block.check_and_save_answers(dict(changes=dict(cell_3_1='4')))
+        self.assertEqual(len(answers_correct), 10)
+        self.assertEqual(sum(answers_correct.values()), 1)
+
+    def test_virtual_rows_empty_content(self):
+        self.block.content = ''
+        self.assertEqual(
+            self.call_handler('get_rows', dict(start=0, count=5)), dict(start=0, num_rows=0, rows=[])
+        )
+
+    def test_json_number_answers(self):
+        self.block.content = '[["Answer"], [Numeric(answer=42, min_significant_digits=2)]]'
+        status = self.call_handler('check_answers', dict(cell_1_0=42))
+        self.assertEqual(status['num_correct_answers'], 1)
+
+    def test_student_view_data(self):
+        self.runtime_mock.handler_url.side_effect = (
+            lambda block, handler_name, suffix='': f'/{handler_name}/{suffix}'
+        )
+        self.block.content = '[["Event", "Year"], ["Krakatoa", Numeric(answer=1883)]]'
+        self.block.answers = dict(cell_1_1='1883')
+        data = self.block.student_view_data()
+        etag = data['table_etag']
+        self.assertEqual(data['table_url'], f'/get_table/{etag}')
+        self.assertEqual(data['answers'], dict(cell_1_1='1883'))
+        self.assertEqual(data['attempts'], 0)
+        self.assertEqual(self.call_handler('get_student_state', {})['answers'], data['answers'])
+
+        response = self.block.get_table(Request.blank(data['table_url']), etag)
+        self.assertEqual(response.etag, etag)
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        table = json.loads(response.body.decode('utf-8'))
+        self.assertEqual(table['thead'], ['Event', 'Year'])
+        self.assertEqual(table['rows'][0]['cells'][1]['type'], 'Numeric')
+        # The answer key and the student answers aren't part of the static data.
+        self.assertNotIn(b'1883', response.body)
+        request = Request.blank('/', headers={'If-None-Match': f'"{etag}"'})
+        response = self.block.get_table(request)
+        self.assertEqual(response.status_int, 304)
+        self.assertEqual(response.body, b'')
+        self.assertEqual(response.headers['Cache-Control'], 'public, no-cache')
+        # The ETag changes with the language, the serialization format and the table.
+        with translation.override('de'):
+            self.assertNotEqual(self.block.student_view_data()['table_etag'], etag)
+        with mock.patch('activetable.activetable.TABLE_DATA_FORMAT_VERSION', 0):
+            self.assertNotEqual(self.block.student_view_data()['table_etag'], etag)
+        self.block.help_text = 'New help'
+        self.assertNotEqual(self.block.student_view_data()['table_etag'], etag)
+        self.assertEqual(self.block.get_table(request).status_int, 200)
+
+    @mock.patch('activetable.activetable.counters', new_callable=Counters)
+    def test_request_keys(self, counters):
+        self.block.content = '[["Event", "Year"], ["Krakatoa", Numeric(answer=1883)]]'
+        data = dict(changes=dict(cell_1_1='1883'), request_key='a')
+        status = self.call_handler('check_answers', data)
+        # A repeated request gets the same status without being processed again.
+        self.assertEqual(self.call_handler('check_answers', data), status)
+        self.assertEqual(self.block.attempts, 1)
+        self.assertEqual(self.runtime_mock.publish.call_count, 1)
+        # A new request is processed, but the unchanged grade isn't published again.
+        status = self.call_handler('check_answers', dict(data, request_key='b'))
+        self.assertEqual(status['attempts'], 2)
+        self.assertEqual(self.runtime_mock.publish.call_count, 1)
+        status = self.call_handler('check_answers', dict(changes=dict(cell_1_1='1')))
+        self.assertEqual(status['score'], 0.0)
+        self.assertEqual(self.runtime_mock.publish.call_count, 2)
+        # Keys are only compared with the last request to the same handler.
+        self.call_handler('save_answers', dict(changes=dict(cell_1_1='1883'), request_key='b'))
+        self.assertEqual(self.block.answers, dict(cell_1_1='1883'))
+        self.assertEqual(counters.snapshot(), dict(duplicate_check_answers=1, unchanged_grades=1))
+        request = Request.blank('/', method='POST', body=json.dumps(
+            dict(changes={}, request_key=['a'])
+        ).encode('utf-8'))
+        self.assertEqual(self.block.save_answers(request).status_int, 400)
+
+    @mock.patch('activetable.activetable.time.time')
+    def test_save_rate_limit(self, time_mock):
+        self.block.max_saves_per_minute = 2
+        time_mock.return_value = 1000.0
+        self.assertNotIn('rate_limited', self.call_handler('save_answers', dict(cell_1_1='0')))
+        # Requests that don't change the answers don't count.
+        self.assertNotIn('rate_limited', self.call_handler('save_answers', dict(cell_1_1='0')))
+        self.assertNotIn('rate_limited', self.call_handler('save_answers', dict(cell_1_1='1')))
+        time_mock.return_value = 1059.0
+        status = self.call_handler('save_answers', dict(cell_1_1='2', request_key='x'))
+        self.assertTrue(status['rate_limited'])
+        self.assertEqual(self.block.answers, dict(cell_1_1='1'))
+        time_mock.return_value = 1060.0
+        # Rejected requests are processed when they are repeated with the same key.
+        status = self.call_handler('save_answers', dict(cell_1_1='2', request_key='x'))
+        self.assertNotIn('rate_limited', status)
+        self.assertEqual(self.block.answers, dict(cell_1_1='2'))
+        self.assertEqual(self.block.save_window_count, 1)
+
+    def test_answers_correct_bitset(self):
+        # The old storage format is still understood.
+        self.block.answers_correct = dict(cell_1_1=True, cell_2_1=False)
+        status = self.block.get_status()
+        self.assertEqual(status['answers_correct'], dict(cell_1_1=True, cell_2_1=False))
+        self.assertEqual((status['num_correct_answers'], status['num_total_answers']), (1, 2))
+        status = self.call_handler('check_answers', dict(cell_1_1='wrong', cell_2_1='42'))
+        self.assertEqual(status['answers_correct'], dict(cell_1_1=False, cell_2_1=True))
+        self.assertEqual((status['num_correct_answers'], status['num_total_answers']), (1, 2))
+        self.assertEqual(status['score'], 0.5)
+        self.assertIsNone(self.block.answers_correct)
+        self.assertEqual(self.block.answers_correct_bitset, 'Ag==')
+        # The per-cell results are not available anymore if the table has changed.
+        self.block.content = '[["Header"], [Text(answer="answer")]]'
+        status = self.block.get_status()
+        self.assertIsNone(status['answers_correct'])
+        self.assertEqual(status['num_total_answers'], 2)
+        status = self.call_handler('save_answers', dict(cell_1_0='answer'))
+        self.assertIsNone(status['answers_correct'])
+        self.assertIsNone(status['num_total_answers'])
+        self.assertIsNone(self.block.answers_correct_bitset)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, unicode_literals
+
+import json
+import random
+import unittest
+from collections import Counter
+
+from activetable.answerstats import (
+    MAX_ANSWER_LENGTH, new_statistics, record_check, space_saving_update, summarize
+)
+
+class StatisticsTest(unittest.TestCase):
+
+    def test_space_saving_update(self):
+        counters = []
+        for item in 'aabcd':
+            space_saving_update(counters, item, 3)
+        # The counter of b, the first item with the smallest count, was reassigned to d.
+        self.assertEqual(counters, [['a', 2, 0], ['d', 2, 1], ['c', 1, 0]])
+
+    def test_space_saving_guarantee(self):
+        rng = random.Random(0)
+        items = ['frequent'] * 300 + ['common'] * 150 + [str(rng.random()) for _ in range(550)]
+        rng.shuffle(items)
+        counters = []
+        for item in items:
+            space_saving_update(counters, item, 10)
+        self.assertEqual(len(counters), 10)
+        # Items occurring more than len(items) / capacity times are always tracked, and the
+        # estimated counts never underestimate the true counts by more than the error.
+        counts = Counter(items)
+        estimates = {item: (count, error) for item, count, error in counters}
+        for item in ['frequent', 'common']:
+            count, error = estimates[item]
+            self.assertLessEqual(count - error, counts[item])
+            self.assertGreaterEqual(count, counts[item])
+
+    def test_record_check(self):
+        cell_ids = ['cell_1_1', 'cell_2_1']
+        statistics = new_statistics('key', 2)
+        record_check(statistics, cell_ids, dict(cell_1_1='1789', cell_2_1='x'),
+                     dict(cell_1_1=True, cell_2_1=False), 2)
+        record_check(statistics, cell_ids, dict(cell_1_1='1788', cell_2_1=' x '),
+                     dict(cell_1_1=False, cell_2_1=False), 2)
+        record_check(statistics, cell_ids, dict(cell_1_1='1788'),
+                     dict(cell_1_1=False, cell_2_1=False), 2)
+        self.assertEqual(statistics, dict(
+            key='key', checks=3, correct=[1, 0], wrong=[[['1788', 2, 0]], [['x', 2, 0]]],
+        ))
+        self.assertEqual(summarize(statistics, cell_ids, 1), [
+            dict(id='cell_1_1', attempts=3, correct=1, incorrect=2,
+                 top_wrong_answers=[dict(answer='1788', count=2)]),
+            dict(id='cell_2_1', attempts=3, correct=0, incorrect=3,
+                 top_wrong_answers=[dict(answer='x', count=2)]),
+        ])
+        self.assertEqual(summarize(None, ['cell_3_1'], 1), [
+            dict(id='cell_3_1', attempts=0, correct=0, incorrect=0, top_wrong_answers=[]),
+        ])
+
+    def test_size_bound(self):
+        # Distinct long wrong answers to every cell are the worst case for the size of the blob.
+        num_cells, capacity = 1000, 10
+        cell_ids = [f'cell_{i}_1' for i in range(num_cells)]
+        statistics = new_statistics('0' * 40, num_cells)
+        answers_correct = dict.fromkeys(cell_ids, False)
+        for check in range(50):
+            answers = {cell_id: f'{check} ' + 'x' * 200 for cell_id in cell_ids}
+            record_check(statistics, cell_ids, answers, answers_correct, capacity)
+        self.assertTrue(all(len(counters) == capacity for counters in statistics['wrong']))
+        size = len(json.dumps(statistics, separators=(',', ':')))
+        self.assertLess(size, num_cells * capacity * (MAX_ANSWER_LENGTH + 16))
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, unicode_literals
+
+import unittest
+
+from activetable.cache import LRUCache, content_hash
+
+class LRUCacheTest(unittest.TestCase):
+
+    def test_eviction(self):
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(
+            cache.stats(), dict(size=2, maxsize=2, hits=3, misses=1, evictions=1)
+        )
+
+    def test_get_or_create(self):
+        cache = LRUCache()
+        calls = []
+        def factory():
+            calls.append(None)
+            return 'value'
+        self.assertEqual(cache.get_or_create('key', factory), 'value')
+        self.assertEqual(cache.get_or_create('key', factory), 'value')
+        self.assertEqual(len(calls), 1)
+        with self.assertRaises(ValueError):
+            cache.get_or_create('other', lambda: int('invalid'))
+        self.assertNotIn('other', cache)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()['hits'], 0)
+
+    def test_content_hash(self):
+        self.assertEqual(content_hash('[[1]]', None, 1.0), content_hash('[[1]]', None, 1.0))
+        self.assertNotEqual(content_hash('[[1]]', None, 1.0), content_hash('[[1]]', None, 2.0))
+        self.assertNotEqual(content_hash('a', 'b'), content_hash('ab', ''))
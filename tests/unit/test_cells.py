@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, unicode_literals
 
+import copy
+import decimal
+import pickle
 import unittest
 
-from activetable.cells import NumericCell, TextCell
+from activetable.cells import NumericCell, Row, StaticCell, TextCell, count_significant_digits
 
 class CellTest(unittest.TestCase):
 
@@ -28,6 +31,10 @@ class CellTest(unittest.TestCase):
         self.assertTrue(cell.check_response('6.238'))
         self.assertFalse(cell.check_response('6.2'))
         self.assertFalse(cell.check_response('6.2382'))
+        # JSON numbers are accepted as well.
+        self.assertTrue(cell.check_response(6.24))
+        self.assertFalse(cell.check_response(6.2))
+        self.assertFalse(cell.check_response(None))
 
     def test_string_cell(self):
         cell = TextCell('OpenCraft')
@@ -36,3 +43,51 @@ class CellTest(unittest.TestCase):
         self.assertFalse(cell.check_response('giraffe'))
         cell = TextCell('ÖpenCräft')
         self.assertTrue(cell.check_response('ÖpenCräft'))
+
+    def test_string_cell_options(self):
+        cell = TextCell(answers=['Straße', 'Strasse'], case_sensitive=False)
+        self.assertTrue(cell.check_response(' STRASSE '))
+        self.assertTrue(cell.check_response('straße'))
+        self.assertFalse(cell.check_response('Str'))
+        cell = TextCell('New  York', collapse_whitespace=True)
+        self.assertTrue(cell.check_response('New York'))
+        self.assertTrue(cell.check_response(' New \t York\n'))
+        self.assertFalse(cell.check_response('new york'))
+        cell = TextCell('none', regex=r'\d+(\.\d+)? ?km', case_sensitive=False)
+        self.assertTrue(cell.check_response('None'))
+        self.assertTrue(cell.check_response(' 12.5 KM '))
+        self.assertFalse(cell.check_response('12.5 km away'))
+        for kwargs in [dict(), dict(answers=[]), dict(regex='(unbalanced')]:
+            with self.subTest(**kwargs), self.assertRaises(ValueError):
+                TextCell(**kwargs)
+
+    def test_slots(self):
+        cell = NumericCell(answer=42, tolerance=1.0)
+        cell.index, cell.row_index = 1, 3
+        self.assertFalse(hasattr(cell, '__dict__'))
+        self.assertEqual(cell.id, 'cell_3_1')
+        self.assertEqual(copy.copy(cell), cell)
+        self.assertEqual(pickle.loads(pickle.dumps(cell)), cell)
+        other = copy.copy(cell)
+        other.value = '42'
+        self.assertNotEqual(other, cell)
+        self.assertNotEqual(StaticCell(42), NumericCell(answer=42))
+        row = Row(3, (StaticCell('x'), cell), height=40, css_class='even')
+        self.assertEqual(row.input_height, 38)
+        self.assertEqual(row.with_cells((cell,)), Row(3, (cell,), 40, 'even'))
+
+    def test_count_significant_digits(self):
+        for number, digits in [
+                ('0.0050', 2), ('100', 3), ('1.00e2', 3), ('-1.5E+3', 2), ('.5', 1), ('5.', 1),
+                ('0', 1), ('-0.000', 1), ('+12.30', 4), ('1_000.5', 5), (' 0042 ', 2),
+                ('\u0661\u0662\u0660', 3), ('1E-07', 1)]:
+            with self.subTest(number=number):
+                self.assertEqual(count_significant_digits(number), digits)
+                # The result matches the number of digits of the decimal representation.
+                self.assertEqual(len(decimal.Decimal(number).as_tuple().digits), digits)
+        for number in ['inf', '-Infinity', 'nan']:
+            self.assertEqual(count_significant_digits(number), 0)
+        cell = NumericCell(answer=0.005, tolerance=10.0, min_significant_digits=2)
+        self.assertTrue(cell.check_response('0.0050'))
+        self.assertFalse(cell.check_response('0.005'))
+        self.assertFalse(cell.check_response('inf'))
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, unicode_literals
+
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from activetable.export import decode_answers_correct, export, main
+from activetable.tables import get_answer_key
+from activetable.userstate import LocalUserStateStore, encode_bitset
+
+CONTENT = """
+[
+    ['Event', 'Year'],
+    ['French Revolution', Numeric(answer=1789)],
+    ['Krakatoa volcano explosion', Text(answer='1883')],
+]
+"""
+
+class ExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.answer_key = get_answer_key(CONTENT)
+        self.store = LocalUserStateStore({
+            'alice': dict(
+                answers=dict(cell_1_1='1789', cell_2_1='1883'), score=1.0, attempts=2,
+                answers_correct_bitset=encode_bitset([True, True]), answers_total_count=2,
+            ),
+            'bob': dict(
+                answers=dict(cell_1_1='1790', cell_3_1='x'), score=0.5, attempts=1,
+                answers_correct=dict(cell_1_1=False, cell_2_1=True),
+            ),
+            'carol': dict(answers=dict(cell_2_1='1883')),
+        })
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_decode_answers_correct(self):
+        cell_ids = ['cell_1_1', 'cell_2_1']
+        self.assertEqual(decode_answers_correct(self.store.get('alice'), cell_ids), [True, True])
+        self.assertEqual(decode_answers_correct(self.store.get('bob'), cell_ids), [False, True])
+        self.assertIsNone(decode_answers_correct(self.store.get('carol'), cell_ids))
+        # The bitset is ignored if the table has changed since the last check.
+        self.assertIsNone(decode_answers_correct(self.store.get('alice'), cell_ids[:1]))
+
+    def test_export_csv(self):
+        output = io.StringIO()
+        self.assertEqual(export(self.answer_key, self.store, output, 'csv'), 3)
+        rows = list(csv.reader(io.StringIO(output.getvalue())))
+        self.assertEqual(rows, [
+            ['user', 'score', 'attempts', 'cell_1_1', 'cell_1_1_correct', 'cell_2_1',
+             'cell_2_1_correct'],
+            ['alice', '1.0', '2', '1789', 'True', '1883', 'True'],
+            ['bob', '0.5', '1', '1790', 'False', '', 'True'],
+            ['carol', '', '0', '', '', '1883', ''],
+        ])
+
+    def test_export_jsonl(self):
+        output = io.StringIO()
+        export(self.answer_key, self.store, output, 'jsonl')
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(records[1], dict(
+            user='bob', score=0.5, attempts=1, answers=dict(cell_1_1='1790', cell_2_1=None),
+            answers_correct=dict(cell_1_1=False, cell_2_1=True),
+        ))
+        self.assertIsNone(records[2]['answers_correct'])
+
+    def test_export_is_lazy(self):
+        def records():
+            yield dict(user='alice', answers=dict(cell_1_1='1789'))
+            raise RuntimeError('The source was read too far.')
+        output = io.StringIO()
+        with self.assertRaises(RuntimeError):
+            export(self.answer_key, records(), output, 'jsonl')
+        self.assertEqual(len(output.getvalue().splitlines()), 1)
+
+    def test_main(self):
+        paths = {name: os.path.join(self.tempdir, name) for name in ['in', 'out', 'table']}
+        with open(paths['table'], 'w') as table_file:
+            table_file.write(CONTENT)
+        with open(paths['in'], 'w') as in_file:
+            for record in self.store:
+                in_file.write(json.dumps(record) + '\n')
+        main([paths['in'], paths['out'], '--content', paths['table'], '--format', 'jsonl'])
+        with open(paths['out']) as out_file:
+            records = [json.loads(line) for line in out_file]
+        self.assertEqual([record['user'] for record in records], ['alice', 'bob', 'carol'])
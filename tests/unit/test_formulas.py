@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, unicode_literals
+
+import pickle
+import unittest
+
+import mock
+
+from activetable.formulas import FormulaCell, FormulaGraph, parse_expression
+from activetable.parsers import ParseError, read_table
+
+class FormulaTest(unittest.TestCase):
+    table_definition = """
+    [
+        ['Length', 'Width', 'Area', 'Volume'],
+        [Numeric(answer=2), Numeric(answer=3), Formula(expr='cell_1_0 * cell_1_1'),
+         Formula(expr='cell_1_2 * cell_2_0', tolerance=5)],
+        [4, 'text', Formula(expr='sqrt(cell_1_2) + 0 * pi'), Formula(expr='cell_2_0 ** 2')],
+    ]
+    """
+
+    def build_graph(self):
+        return FormulaGraph.build(read_table(self.table_definition)[1])
+
+    def test_parse_expression(self):
+        _tree, references = parse_expression('cell_1_1 * (cell_2_1 + cell_1_1) / max(2, cell_3_1)')
+        self.assertEqual(references, ('cell_1_1', 'cell_2_1', 'cell_3_1'))
+        for expr in [
+                'cell_1_1 +', '__import__("os")', 'cell_1_1.real', 'open("file")', '"string"',
+                'cell_1_1 if True else 0', 'lambda: 0', 'max(cell_1_1, key=abs)', '[cell_1_1]',
+                'pi(2)', 'giraffe', 'True']:
+            with self.subTest(expr=expr), self.assertRaises(ValueError):
+                parse_expression(expr)
+
+    @mock.patch('activetable.formulas.sys')
+    def test_parse_expression_num_nodes(self, sys_mock):
+        # Python 3.6 and 3.7 parse numbers as ast.Num.
+        sys_mock.version_info = (3, 7)
+        tree, references = parse_expression('cell_1_1 * 2 + 0.5')
+        self.assertEqual(references, ('cell_1_1',))
+        self.assertEqual(eval(compile(tree, '<formula>', 'eval'), dict(cell_1_1=3)), 6.5)
+        with self.assertRaises(ValueError):
+            parse_expression('cell_1_1 * 2j')
+
+    def test_formula_cell(self):
+        cell = FormulaCell(expr='cell_1_1 * 2', tolerance=1.0)
+        self.assertEqual(cell.references, ('cell_1_1',))
+        self.assertTrue(cell.check_response('100.5', 100.0))
+        self.assertFalse(cell.check_response('102', 100.0))
+        self.assertFalse(cell.check_response('100', None))
+
+    def test_build(self):
+        graph = self.build_graph()
+        self.assertEqual(list(graph.expressions), ['cell_1_2', 'cell_1_3', 'cell_2_2', 'cell_2_3'])
+        self.assertEqual(graph.constants, dict(cell_2_0=4.0))
+        self.assertEqual(graph.downstream(['cell_1_0']), {'cell_1_2', 'cell_1_3', 'cell_2_2'})
+        self.assertEqual(graph.downstream(['cell_2_0']), {'cell_1_3', 'cell_2_3'})
+        self.assertIsNone(FormulaGraph.build(read_table('[["a"], [Numeric(answer=1)]]')[1]))
+
+    def test_invalid_references(self):
+        for table_definition, message in [
+                ('[["a", "b"], [1, Formula(expr="cell_1_0 + cell_9_9")]]',
+                 'nonexistent cell cell_9_9'),
+                ('[["a", "b"], ["text", Formula(expr="cell_1_0")]]', 'non-numeric cell cell_1_0'),
+                ('[["a", "b"], [Text(answer="x"), Formula(expr="cell_1_0")]]',
+                 'non-numeric cell cell_1_0'),
+                ('[["a", "b"], [Formula(expr="cell_1_1 + 1"), Formula(expr="cell_1_0 * 2")]]',
+                 'cycle: cell_1_0 -> cell_1_1 -> cell_1_0'),
+                ('[["a"], [Formula(expr="cell_1_0")]]', 'cycle: cell_1_0 -> cell_1_0')]:
+            with self.subTest(table_definition=table_definition):
+                with self.assertRaises(ParseError) as context:
+                    read_table(table_definition)
+                self.assertIn(message, context.exception.message)
+
+    def test_evaluate(self):
+        graph = self.build_graph()
+        values = graph.evaluate(dict(cell_1_0='2', cell_1_1='8'))
+        self.assertEqual(values, dict(cell_1_2=16.0, cell_1_3=64.0, cell_2_2=4.0, cell_2_3=16.0))
+        # Missing or invalid inputs and undefined results give None.
+        values = graph.evaluate(dict(cell_1_0='-2', cell_1_1='x'))
+        self.assertEqual(values, dict(cell_1_2=None, cell_1_3=None, cell_2_2=None, cell_2_3=16.0))
+        values = graph.evaluate(dict(cell_1_0='-2', cell_1_1='2'))
+        self.assertEqual(values['cell_2_2'], None)
+
+    def test_incremental_evaluation(self):
+        graph = self.build_graph()
+        answers = dict(cell_1_0='2', cell_1_1='8')
+        previous = graph.evaluate(answers)
+        answers['cell_1_1'] = '2'
+        with mock.patch.object(graph, '_evaluate', wraps=graph._evaluate) as evaluate_mock:
+            values = graph.evaluate(answers, previous, ['cell_1_1'])
+        self.assertEqual(values, graph.evaluate(answers))
+        # The formula only depending on static cells isn't evaluated again.
+        self.assertEqual(
+            [call[0][0] for call in evaluate_mock.call_args_list],
+            ['cell_1_2', 'cell_1_3', 'cell_2_2'],
+        )
+        self.assertEqual(graph.evaluate(answers, values, []), values)
+        # Incomplete previous values are ignored.
+        self.assertEqual(graph.evaluate(answers, dict(cell_1_2=0.0), []), values)
+
+    def test_pickle(self):
+        graph = pickle.loads(pickle.dumps(self.build_graph()))
+        self.assertEqual(graph.evaluate(dict(cell_1_0='2', cell_1_1='8'))['cell_1_3'], 64.0)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, unicode_literals
+
+import unittest
+
+import mock
+from xblock.field_data import DictFieldData
+from xblock.runtime import Runtime
+
+from activetable.activetable import ActiveTableXBlock
+from activetable.cells import NumericChecker, TextChecker
+from activetable import grading
+from activetable.grading import compile_answer_key, grade
+
+class GradingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.block = ActiveTableXBlock(mock.Mock(spec=Runtime), DictFieldData({}), mock.Mock())
+        self.block.content = """
+        [
+            ['Event', 'Year'],
+            ['French Revolution', Numeric(answer=1789, tolerance=0.1)],
+            ['Volcano exploded in 1883', Text(answer=' Krakatoa ')],
+            [Numeric(answer=100, max_significant_digits=2), 123],
+        ]
+        """
+
+    def test_compile_answer_key(self):
+        answer_key = compile_answer_key(self.block.get_table_template().tbody)
+        self.assertEqual(list(answer_key), ['cell_1_1', 'cell_2_1', 'cell_3_0'])
+        self.assertEqual(answer_key['cell_2_1'], TextChecker(frozenset(['Krakatoa']), None, True, False))
+        self.assertEqual(answer_key['cell_3_0'], NumericChecker(99.0, 101.0, None, 2))
+        self.assertIs(self.block.get_answer_key(), self.block.get_answer_key())
+
+    def test_grade(self):
+        answer_key = self.block.get_answer_key()
+        answers = dict(cell_1_1='1790', cell_2_1='Krakatoa', cell_3_0='100')
+        self.assertEqual(grade(answer_key, answers), dict(
+            cell_1_1=True, cell_2_1=True, cell_3_0=False,
+        ))
+        self.assertEqual(grade(answer_key, dict(cell_3_0='1.0e2')), dict(cell_3_0=True))
+        with self.assertRaises(KeyError):
+            grade(answer_key, dict(cell_1_0='French Revolution'))
+
+    def test_grade_formulas(self):
+        self.block.content = """[
+            ['Value', 'Double'],
+            [Numeric(answer=1), Formula(expr='2 * cell_1_0', tolerance=10)],
+        ]"""
+        answer_key = self.block.get_answer_key()
+        self.assertEqual(list(answer_key.formulas.expressions), ['cell_1_1'])
+        self.assertEqual(grading.grade_all(answer_key, dict(cell_1_0='3', cell_1_1='6.5')), dict(
+            cell_1_0=False, cell_1_1=True,
+        ))
+        self.assertEqual(grading.grade_all(answer_key, dict(cell_1_1='6.5')), dict(
+            cell_1_0=False, cell_1_1=False,
+        ))
+        self.assertEqual(grade(answer_key, dict(cell_1_1='2'), dict(cell_1_1=2.0)), dict(
+            cell_1_1=True,
+        ))
+
+    def test_check_and_save_answers(self):
+        answers = dict(cell_1_1='1789', cell_2_1='Pinatubo', cell_3_0='100')
+        answers_correct = self.block.check_and_save_answers(answers)
+        self.assertEqual(answers_correct, dict(cell_1_1=True, cell_2_1=False, cell_3_0=False))
+        self.assertEqual(self.block.answers, answers)
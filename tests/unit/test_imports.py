@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, unicode_literals
+
+import json
+import subprocess
+import sys
+import unittest
+
+class ImportTest(unittest.TestCase):
+
+    def imported_modules(self, code):
+        """Run the code in a new interpreter and return the names of the imported modules."""
+        code += '; import sys, json; print(json.dumps(sorted(sys.modules)))'
+        result = subprocess.run(
+            [sys.executable, '-W', 'ignore', '-c', code],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, universal_newlines=True,
+        )
+        return json.loads(result.stdout)
+
+    @unittest.skipIf(sys.version_info < (3, 7), 'module __getattr__ requires Python 3.7')
+    def test_lazy_package(self):
+        modules = self.imported_modules('import activetable')
+        self.assertNotIn('activetable.activetable', modules)
+        self.assertFalse([name for name in modules if name.startswith(('xblock', 'django'))])
+        modules = self.imported_modules('from activetable import ActiveTableXBlock')
+        self.assertIn('activetable.activetable', modules)
+
+    def test_deferred_dependencies(self):
+        modules = self.imported_modules('import activetable.activetable')
+        for name in ['numpy', 'uuid']:
+            self.assertNotIn(name, modules)
+
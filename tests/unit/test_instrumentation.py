@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, unicode_literals
+
+import json
+import tracemalloc
+import types
+import unittest
+
+import django
+import mock
+from django.conf import settings
+from webob import Request
+from xblock.field_data import DictFieldData
+from xblock.runtime import Runtime
+
+from activetable import instrumentation
+from activetable.activetable import ActiveTableXBlock
+from activetable.rendering import skeleton_cache
+
+class InstrumentationTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        if not settings.configured:
+            settings.configure(
+                TEMPLATES=[{'BACKEND': 'django.template.backends.django.DjangoTemplates'}]
+            )
+            django.setup()
+
+    def setUp(self):
+        self.runtime_mock = mock.Mock(spec=Runtime)
+        self.runtime_mock.local_resource_url.return_value = '/icon.png'
+        self.block = ActiveTableXBlock(self.runtime_mock, DictFieldData({}), mock.Mock())
+        self.sink = mock.Mock()
+        skeleton_cache.clear()
+        self.addCleanup(instrumentation.configure)
+
+    def test_disabled(self):
+        self.assertFalse(instrumentation.is_enabled())
+        self.block.student_view()
+        self.sink.assert_not_called()
+
+    def test_measurements(self):
+        instrumentation.configure([self.sink])
+        request = Request.blank('/', method='POST', body=json.dumps(dict(cell_1_1='42')).encode())
+        self.block.check_answers(request)
+        self.block.student_view()
+        measurements = [call[0][1] for call in self.sink.call_args_list]
+        self.assertEqual([m.name for m in measurements], [
+            'check_and_save_answers', 'parse_fields', 'postprocess_table', 'render_table',
+            'student_view',
+        ])
+        for measurement in measurements:
+            self.assertGreaterEqual(measurement.duration, 0)
+            self.assertEqual((measurement.num_cells, measurement.num_response_cells), (4, 2))
+            self.assertIsNone(measurement.allocated)
+        self.sink.assert_called_with(self.block, measurements[-1])
+
+    def test_trace_allocations(self):
+        instrumentation.configure([self.sink], trace_allocations=True)
+        self.addCleanup(tracemalloc.stop)
+        # tracemalloc.reset_peak() only exists since Python 3.9.
+        without_reset_peak = types.SimpleNamespace(**{
+            name: getattr(tracemalloc, name)
+            for name in ['clear_traces', 'get_traced_memory', 'is_tracing', 'start']
+        })
+        for module in [tracemalloc, without_reset_peak]:
+            with self.subTest(reset_peak=hasattr(module, 'reset_peak')):
+                self.sink.reset_mock()
+                with mock.patch.object(instrumentation, 'tracemalloc', module):
+                    self.block.render_table()
+                render, parse = [call[0][1] for call in self.sink.call_args_list][::-1][:2]
+                self.assertEqual(render.name, 'render_table')
+                self.assertGreater(render.peak_allocated, 0)
+                self.assertIsNotNone(parse.allocated)
+                # Nested measurements don't have a peak.
+                self.assertIsNone(parse.peak_allocated)
+
+    def test_sink_failure(self):
+        self.sink.side_effect = ValueError
+        instrumentation.configure([self.sink])
+        with self.assertLogs('activetable.instrumentation', 'ERROR'):
+            self.block.parse_fields()
+        self.assertEqual(self.block.thead[0], 'Column header 1')
+
+    def test_publish_sink(self):
+        instrumentation.configure([instrumentation.PublishSink()])
+        self.block.parse_fields()
+        self.runtime_mock.publish.assert_called_once_with(
+            self.block, 'activetable.instrumentation', mock.ANY
+        )
+        self.assertEqual(self.runtime_mock.publish.call_args[0][2]['name'], 'parse_fields')
+
+    def test_aggregator(self):
+        aggregator = instrumentation.Aggregator(max_samples=100)
+        for i in range(1, 201):
+            aggregator(None, instrumentation.Measurement('check', i / 1000, 4, 2, None, None))
+        summary = aggregator.summary()['check']
+        self.assertEqual(summary['count'], 200)
+        self.assertAlmostEqual(summary['p50'], 0.150)
+        self.assertAlmostEqual(summary['p90'], 0.190)
+        self.assertAlmostEqual(summary['p99'], 0.199)
+        self.assertAlmostEqual(summary['max'], 0.200)
+        aggregator.reset()
+        self.assertEqual(aggregator.summary(), {})
+
+    def test_counters(self):
+        counters = instrumentation.Counters()
+        counters.increment('duplicate_check_answers')
+        counters.increment('duplicate_check_answers', 2)
+        counters.increment('unchanged_grades')
+        self.assertEqual(counters.snapshot(), dict(duplicate_check_answers=3, unchanged_grades=1))
+        counters.reset()
+        self.assertEqual(counters.snapshot(), {})
+
+    def test_configure_from_environment(self):
+        with self.assertLogs('activetable.instrumentation', 'WARNING'):
+            instrumentation.configure_from_environment(
+                dict(ACTIVETABLE_INSTRUMENTATION='log, aggregate,unknown')
+            )
+        self.assertEqual(
+            [type(sink) for sink in instrumentation._sinks],
+            [instrumentation.LoggingSink, instrumentation.Aggregator],
+        )
+        instrumentation.configure_from_environment({})
+        self.assertFalse(instrumentation.is_enabled())
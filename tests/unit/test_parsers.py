@@ -2,15 +2,20 @@
 from __future__ import absolute_import, division, unicode_literals
 
 import ddt
+import mock
 import unittest
 
-from activetable.cells import Cell, NumericCell, StaticCell, TextCell
-from activetable.parsers import ParseError, parse_table, parse_number_list
+from activetable.cells import Cell, NumericCell, Row, StaticCell, TextCell
+from activetable.parsers import (
+    ParseError, iter_table, parse_table, parse_table_csv, parse_table_json, parse_table_streaming,
+    parse_number_list, read_table
+)
 
 @ddt.ddt
 class ParserTest(unittest.TestCase):
 
-    def test_parse_table(self):
+    @ddt.data(parse_table, parse_table_streaming)
+    def test_parse_table(self, parse):
         table_definition = """
         [
             ['Event', 'Year'],
@@ -19,7 +24,7 @@ class ParserTest(unittest.TestCase):
             [6.283, 123],
         ]
         """
-        thead, tbody = parse_table(table_definition)
+        thead, tbody = parse(table_definition)
         expected = eval(table_definition.strip(), dict(Numeric=NumericCell, Text=TextCell))
         expected_body = []
         for i, row in enumerate(expected[1:], 1):
@@ -28,8 +33,9 @@ class ParserTest(unittest.TestCase):
                 if not isinstance(cell, Cell):
                     cell = StaticCell(cell)
                 cell.index = j
+                cell.row_index = i
                 cells.append(cell)
-            expected_body.append(dict(index=i, cells=cells))
+            expected_body.append(Row(i, cells))
         self.assertEqual(thead, expected[0])
         self.assertEqual(tbody, expected_body)
 
@@ -45,10 +51,162 @@ class ParserTest(unittest.TestCase):
         '[["header", "header"], ["wrong argument class", Numeric(3)]]',
         '[["header", "header"], ["wrong argument name", Numeric(giraffe=3)]]',
         '[["header", "header"], ["wrong argument value", Numeric(giraffe="3")]]',
+        '[["header", "header"], ["missing answer", Text(case_sensitive=False)]]',
+        '[["header", "header"], ["invalid regex", Text(regex="[a-")]]',
+        '[["header", "header"], ["wrong option type", Text(answer="a", case_sensitive=1)]]',
+        '[["header", "header"], ["wrong list item", Text(answers=["a", 1])]]',
+        '[["header", "header"], ["Boolean answer", Numeric(answer=True)]]',
     )
     def test_parse_table_errors(self, table_definition):
+        for parse in [parse_table, parse_table_streaming, read_table]:
+            with self.subTest(parse=parse.__name__), self.assertRaises(ParseError):
+                parse(table_definition)
+
+    def test_iter_table(self):
+        thead, rows = iter_table("""[
+            ['Event', 'Year'],  # comment
+            ['French ' "Revolution", Numeric(answer=1789, tolerance=0x10,)],
+            ['Volcano exploded in 1883', Text(answer='''Krakatoa''')],
+            [1e3, giraffe],
+        ]""")
+        self.assertEqual(thead, ['Event', 'Year'])
+        row = next(rows)
+        self.assertEqual(row.cells[0].value, 'French Revolution')
+        self.assertEqual(row.cells[1].abs_tolerance, 1789 * 0.16)
+        self.assertEqual(next(rows).cells[1].answer, 'Krakatoa')
+        # The error in the third row is only detected when the row is requested.
+        with self.assertRaises(ParseError) as context:
+            next(rows)
+        self.assertEqual((context.exception.line, context.exception.column), (5, 19))
+        self.assertEqual(context.exception.message, 'invalid cell value: giraffe (line 5, column 19)')
+
+    def test_read_table(self):
+        # Redundant parentheses are only accepted by parse_table().
+        table_definition = '[["Event", "Year"], ["French Revolution", (1789)]]'
+        with self.assertRaises(ParseError):
+            parse_table_streaming(table_definition)
+        self.assertEqual(read_table(table_definition), parse_table(table_definition))
+        with self.assertRaises(ParseError) as context:
+            read_table('[["Event", "Year"],\n ["French Revolution", 1789 + 0]]')
+        self.assertEqual(context.exception.line, 2)
+        for table_definition in [
+                '[["Event", "Year"], \\\n ["French Revolution", 1789]]',
+                '[["Event", "Year"], ["French Revolution", Numeric(answer=(1789))]]',
+                '[["Event", "Year"], ["French Revolution", Numeric(answer=1, answer=1789)]]']:
+            with self.subTest(table_definition=table_definition):
+                self.assertEqual(read_table(table_definition), parse_table(table_definition))
+
+    def test_read_table_fails_fast(self):
+        # Other errors are reported without parsing the definition again with parse_table().
+        with mock.patch('activetable.parsers.parse_table') as parse_table_mock:
+            for table_definition in [
+                    '[["Event", "Year"], ["French Revolution", 1789 + 0]]',
+                    '[["Event", "Year"], ["French Revolution", giraffe]]',
+                    '[["Event", "Year"], ["French Revolution" 1789]]']:
+                with self.subTest(table_definition=table_definition):
+                    with self.assertRaises(ParseError):
+                        read_table(table_definition)
+        parse_table_mock.assert_not_called()
+
+    def test_long_whitespace_runs(self):
+        # Long runs of whitespace and comments before an invalid character used to make the
+        # tokenizer backtrack exponentially.
+        for table_definition in [
+                '[["Answer"], [Numeric(answer=\n' + ' ' * 1000 + '$)]]',
+                '[["Answer"], [Numeric(answer=\n' + ' ' * 1000 + '-40)]]',
+                '[["Answer"], [Numeric(answer=' + '# \n' * 1000 + '$)]]',
+                '[["Answer"], [Numeric(answer=' + '# ' * 1000 + '\n$)]]']:
+            with self.subTest(table_definition=table_definition[-20:]):
+                with self.assertRaises(ParseError):
+                    parse_table_streaming(table_definition)
+                with self.assertRaises(ParseError):
+                    read_table(table_definition)
+
+    def test_parse_table_formats(self):
+        expected = parse_table("""
+        [
+            ['Event', 'Year', 'Digits'],
+            ['French Revolution', Numeric(answer=1789), 'four'],
+            ['Volcano exploded in 1883', Text(answer='Krakatoa'), 8],
+            [6.283, 123, Numeric(answer=1.5, tolerance=0, min_significant_digits=2)],
+        ]
+        """)
+        csv_definition = """
+        Event,Year,Digits
+        French Revolution,Numeric(answer=1789),four
+
+        Volcano exploded in 1883,Text(answer='Krakatoa'), 8
+        6.283,123,"Numeric(answer=1.5, tolerance=0, min_significant_digits=2)"
+        """
+        self.assertEqual(parse_table_csv(csv_definition.replace('        ', '')), expected)
+        json_definition = """[
+            ["Event", "Year", "Digits"],
+            ["French Revolution", {"type": "Numeric", "answer": 1789}, "four"],
+            ["Volcano exploded in 1883", {"type": "Text", "answer": "Krakatoa"}, 8],
+            [6.283, 123, {"type": "Numeric", "answer": 1.5, "tolerance": 0,
+                          "min_significant_digits": 2}]
+        ]"""
+        self.assertEqual(parse_table_json(json_definition), expected)
+        self.assertEqual(read_table(json_definition, 'json'), expected)
+
+    def test_csv_static_labels(self):
+        thead, tbody = read_table('Quantity,Value\nMass (kg),"Numeric(answer=2)"\nf(x),3', 'csv')
+        self.assertEqual(thead, ['Quantity', 'Value'])
+        self.assertEqual([cell.value for cell in tbody[0].cells], ['Mass (kg)', None])
+        self.assertIsInstance(tbody[0].cells[1], NumericCell)
+        self.assertEqual([cell.value for cell in tbody[1].cells], ['f(x)', 3])
+
+    def test_text_cell_options(self):
+        expected = TextCell(answers=['colour', 'color'], case_sensitive=False)
+        expected.index, expected.row_index = 1, 1
+        regex_cell = TextCell(regex=r'\d+ ?km', collapse_whitespace=True)
+        regex_cell.index, regex_cell.row_index = 1, 2
+        python_definition = r"""[
+            ['Word', 'Answer'],
+            ['Hue', Text(answers=['colour', 'color'], case_sensitive=False)],
+            ['Distance', Text(regex=r'\d+ ?km', collapse_whitespace=True)],
+        ]"""
+        csv_definition = (
+            'Word,Answer\n'
+            '"Hue","Text(answers=[\'colour\', \'color\'], case_sensitive=False)"\n'
+            '"Distance","Text(regex=r\'\\d+ ?km\', collapse_whitespace=True)"\n'
+        )
+        json_definition = r"""[
+            ["Word", "Answer"],
+            ["Hue", {"type": "Text", "answers": ["colour", "color"], "case_sensitive": false}],
+            ["Distance", {"type": "Text", "regex": "\\d+ ?km", "collapse_whitespace": true}]
+        ]"""
+        for parse, table_definition in [
+                (parse_table, python_definition),
+                (parse_table_streaming, python_definition),
+                (parse_table_csv, csv_definition),
+                (parse_table_json, json_definition)]:
+            with self.subTest(parse=parse.__name__):
+                _thead, tbody = parse(table_definition)
+                self.assertEqual([row.cells[1] for row in tbody], [expected, regex_cell])
+
+    @ddt.data(
+        ('csv', ''),
+        ('csv', 'header,header\n"unterminated'),
+        ('csv', 'header,header\ninconsistent,row,length'),
+        ('csv', 'header,header\nwrong argument name,Numeric(answr=3)'),
+        ('csv', 'header,header\nwrong argument class,Numeric(3)'),
+        ('csv', 'header,header\nwrong argument value,Numeric(answer="3")'),
+        ('csv', 'header,header\nunquoted comma,Numeric(answer=3, tolerance=1)'),
+        ('json', 'syntax error'),
+        ('json', '{"wrong": "type"}'),
+        ('json', '[[1, "wrong type in header"]]'),
+        ('json', '[["header", "header"], "wrong type in body"]'),
+        ('json', '[["header", "header"], ["illegal value", true]]'),
+        ('json', '[["header", "header"], ["inconsistent", "row", "length"]]'),
+        ('json', '[["header", "header"], ["missing type", {"answer": 3}]]'),
+        ('json', '[["header", "header"], ["wrong argument value", {"type": "Text", "answer": 3}]]'),
+        ('yaml', '[["header"]]'),
+    )
+    @ddt.unpack
+    def test_parse_table_format_errors(self, content_format, table_definition):
         with self.assertRaises(ParseError):
-            parse_table(table_definition)
+            read_table(table_definition, content_format)
 
     def test_parse_number_list(self):
         self.assertEquals(parse_number_list('[1, 2.3]'), [1, 2.3])
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, unicode_literals
+
+import unittest
+
+import django
+import mock
+from django.conf import settings
+from django.utils import translation
+from xblock.field_data import DictFieldData
+from xblock.runtime import Runtime
+
+from activetable.activetable import ActiveTableXBlock
+from activetable.rendering import TableSkeleton, render_table_html, skeleton_cache
+
+if not settings.configured:
+    settings.configure(TEMPLATES=[{'BACKEND': 'django.template.backends.django.DjangoTemplates'}])
+    django.setup()
+
+class RenderingTest(unittest.TestCase):
+
+    def setUp(self):
+        skeleton_cache.clear()
+        self.block = ActiveTableXBlock(mock.Mock(spec=Runtime), DictFieldData({}), mock.Mock())
+        self.block.content = """
+        [
+            ['Event', 'Year <b>'],
+            ['French <Revolution>', Numeric(answer=1789)],
+            ['Volcano exploded in 1883', Text(answer='Krakatoa')],
+            [6.283, Text(answer='&')],
+        ]
+        """
+
+    def test_fill(self):
+        skeleton = TableSkeleton(['<a>', '<b>', '<c>'], ['cell_1_1', 'cell_2_1'])
+        self.assertEqual(skeleton.fill({}), '<a><b><c>')
+        self.assertEqual(skeleton.fill(dict(cell_2_1='"x" & \'y\'')),
+                         '<a><b>&quot;x&quot; &amp; &#x27;y&#x27;<c>')
+        with self.assertRaises(ValueError):
+            TableSkeleton(['<a>'], ['cell_1_1'])
+
+    def test_skeleton_matches_template(self):
+        for answers in [{}, dict(cell_1_1='1789', cell_2_1='<script>"\'&', cell_3_1=None)]:
+            self.block.answers = answers
+            self.assertEqual(
+                self.block.get_html_skeleton().fill(answers), self.block.render_table(answers)
+            )
+        self.block.content = ''
+        self.assertEqual(self.block.get_html_skeleton().fill({}), self.block.render_table({}))
+
+    def test_skeleton_language(self):
+        english = self.block.get_html_skeleton().fill({})
+        self.assertIn('6.283', english)
+        with translation.override('de'):
+            german = self.block.get_html_skeleton().fill({})
+            self.assertEqual(german, self.block.render_table({}))
+        self.assertIn('6,283', german)
+        self.assertEqual(self.block.get_html_skeleton().fill({}), english)
+
+    def test_skeleton_cache(self):
+        skeleton = self.block.get_html_skeleton()
+        self.assertIs(self.block.get_html_skeleton(), skeleton)
+        self.assertEqual(skeleton.cell_ids, ('cell_1_1', 'cell_2_1', 'cell_3_1'))
+        self.block.max_attempts = 3
+        self.assertIsNot(self.block.get_html_skeleton(), skeleton)
+        self.assertIn('class="save"', self.block.get_html_skeleton().fill({}))
+
+    def render_with_backends(self, answers):
+        """Render the table with both backends, returning the Django and the Python output."""
+        outputs = []
+        for backend in ['django', 'python']:
+            self.block.render_backend = backend
+            outputs.append(self.block.render_table(answers))
+        return outputs
+
+    def test_backends_identical(self):
+        answers = dict(cell_1_1='1789', cell_2_1='<script>"\'&', cell_3_1=None)
+        for fields in [
+                dict(),
+                dict(help_text='Fill in <the> "table" & check'),
+                dict(help_text='Help', column_widths='[100, 200]', row_heights='[30, 40, 50, 60]'),
+                dict(max_attempts=3),
+                dict(content='[["a", "b"], [1.5, 0], [2, Numeric(answer=1)]]'),
+                dict(content=''),
+                dict(content='', help_text='Help', max_attempts=1)]:
+            with self.subTest(fields=fields):
+                for name, value in fields.items():
+                    setattr(self.block, name, value)
+                django_html, python_html = self.render_with_backends(answers)
+                self.assertEqual(python_html, django_html)
+
+    def test_backends_identical_virtual(self):
+        self.block.virtual_rows_threshold = 1
+        django_html, python_html = self.render_with_backends({})
+        self.assertIn('class="virtual"', python_html)
+        self.assertEqual(python_html, django_html)
+
+    def test_render_table_html(self):
+        html = render_table_html(dict(
+            help_text=None, total_width=None, column_widths=[], head_height=None, thead=None,
+            tbody=(), max_attempts=None, virtual=False,
+        ))
+        self.assertIn("This component isn't configured properly", html)
+        self.assertNotIn('activetable-help', html)
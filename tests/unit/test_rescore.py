@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, unicode_literals
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from activetable.rescore import RescoreStats, main, rescore
+from activetable.tables import get_answer_key
+from activetable.userstate import JsonlUserStateSource, LocalUserStateStore
+
+CONTENT = """
+[
+    ['Event', 'Year'],
+    ['French Revolution', Numeric(answer=1789)],
+    ['Krakatoa volcano explosion', Numeric(answer=1883)],
+]
+"""
+
+class RescoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.answer_key = get_answer_key(CONTENT)
+        self.store = LocalUserStateStore({
+            'alice': dict(answers=dict(cell_1_1='1789', cell_2_1='1883'), score=0.5),
+            'bob': dict(answers=dict(cell_1_1='1789', cell_2_1='1950', cell_3_1='x'), score=1.0),
+            'carol': dict(answers=dict(cell_1_1='1789'), score=None),
+            'dave': dict(answers=dict(cell_2_1='1883'), score=0.0),
+        })
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def verify_results(self, results):
+        self.assertEqual([result['user'] for result in results], ['alice', 'bob', 'dave'])
+        self.assertEqual([result['score'] for result in results], [2.0, 1.0, 1.0])
+        self.assertEqual(results[2]['answers_correct'], dict(cell_1_1=False, cell_2_1=True))
+
+    def test_rescore(self):
+        events = []
+        stats = RescoreStats()
+        results = list(rescore(
+            self.answer_key, self.store, maximum_score=2.0, processes=1, chunk_size=2,
+            publish=lambda *args: events.append(args), stats=stats,
+        ))
+        self.verify_results(results)
+        self.assertEqual(events[0], ('alice', 'grade', dict(value=2.0, max_value=2.0)))
+        self.assertEqual((stats.processed, stats.rescored, stats.skipped), (4, 3, 1))
+        for result in results:
+            self.store.update(result['user'], dict(score=result['score']))
+        self.assertEqual(self.store.get('bob')['score'], 1.0)
+
+    def test_rescore_process_pool(self):
+        progress = []
+        results = list(rescore(
+            self.answer_key, self.store, maximum_score=2.0, processes=2, chunk_size=1,
+            max_pending=1, progress=lambda stats: progress.append(stats.rescored),
+        ))
+        self.verify_results(results)
+        self.assertEqual(progress, [1, 2, 3])
+
+    def test_main(self):
+        paths = {name: os.path.join(self.tempdir, name) for name in ['in', 'out', 'ev', 'table']}
+        with open(paths['table'], 'w') as table_file:
+            table_file.write(CONTENT)
+        with open(paths['in'], 'w') as in_file:
+            for record in self.store:
+                in_file.write(json.dumps(record) + '\n\n')
+        main([
+            paths['in'], paths['out'], '--content', paths['table'], '--events', paths['ev'],
+            '--processes', '1', '--maximum-score', '2',
+        ])
+        self.verify_results(list(JsonlUserStateSource(paths['out'])))
+        events = list(JsonlUserStateSource(paths['ev']))
+        self.assertEqual(events[1], dict(
+            user='bob', event_type='grade', event=dict(value=1.0, max_value=2.0),
+        ))
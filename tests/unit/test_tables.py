@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, unicode_literals
+
+import io
+import pickle
+import unittest
+
+import mock
+from django.core.cache.backends.locmem import LocMemCache
+
+from activetable import tables
+
+CONTENT = '[["Header 1", "Header 2"], [Text(answer="a"), Numeric(answer=42)]]'
+
+class TablesTest(unittest.TestCase):
+
+    def setUp(self):
+        tables.table_cache.clear()
+        self.shared_cache = LocMemCache('activetable-test', {})
+        self.shared_cache.clear()
+
+    def test_dump_and_load(self):
+        template = tables.get_table_template(CONTENT)
+        output = io.BytesIO()
+        tables.dump_table_templates(output)
+        tables.table_cache.clear()
+        self.assertEqual(tables.load_table_templates(io.BytesIO(output.getvalue())), 1)
+        with mock.patch('activetable.tables.read_table') as read_table_mock:
+            loaded = tables.get_table_template(CONTENT)
+        read_table_mock.assert_not_called()
+        self.assertIsNot(loaded, template)
+        self.assertEqual(loaded, template)
+
+    def test_load_other_version(self):
+        tables.get_table_template(CONTENT)
+        output = io.BytesIO()
+        with mock.patch('activetable.tables.TEMPLATE_FORMAT_VERSION', 1):
+            tables.dump_table_templates(output)
+        tables.table_cache.clear()
+        with self.assertLogs('activetable.tables', 'WARNING'):
+            self.assertEqual(tables.load_table_templates(io.BytesIO(output.getvalue())), 0)
+        self.assertEqual(len(tables.table_cache), 0)
+        # Files written before the version was added are ignored as well.
+        old_output = io.BytesIO()
+        pickle.dump({'key': None}, old_output)
+        with self.assertLogs('activetable.tables', 'WARNING'):
+            self.assertEqual(tables.load_table_templates(io.BytesIO(old_output.getvalue())), 0)
+
+    def test_shared_cache(self):
+        with mock.patch('activetable.tables.get_shared_cache', return_value=self.shared_cache):
+            template = tables.get_table_template(CONTENT)
+            # Simulate another process with an empty process-wide cache.
+            tables.table_cache.clear()
+            with mock.patch('activetable.tables.read_table') as read_table_mock:
+                shared = tables.get_table_template(CONTENT)
+            read_table_mock.assert_not_called()
+        self.assertEqual(shared, template)
+        # Templates pickled by code with a different format version aren't used.
+        tables.table_cache.clear()
+        with mock.patch('activetable.tables.get_shared_cache', return_value=self.shared_cache), \
+                mock.patch('activetable.tables.TEMPLATE_FORMAT_VERSION', 1), \
+                mock.patch('activetable.tables.build_table_template') as build_mock:
+            tables.get_table_template(CONTENT)
+        build_mock.assert_called_once()
+
+    def test_shared_cache_failure(self):
+        self.shared_cache.set = mock.Mock(side_effect=ValueError('value too large'))
+        with mock.patch('activetable.tables.get_shared_cache', return_value=self.shared_cache):
+            with self.assertLogs('activetable.tables', 'WARNING'):
+                template = tables.get_table_template(CONTENT)
+        self.assertIs(tables.get_table_template(CONTENT), template)
+
+    def test_no_shared_cache(self):
+        self.assertIsNone(tables.get_shared_cache())
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, unicode_literals
+
+import unittest
+
+from activetable.userstate import decode_bitset, encode_bitset
+
+class BitsetTest(unittest.TestCase):
+
+    def test_roundtrip(self):
+        for values in [[], [True], [False] * 8, [True, False, True] * 7, [True] * 1000]:
+            encoded = encode_bitset(values)
+            self.assertEqual(decode_bitset(encoded, len(values)), values)
+        self.assertEqual(encode_bitset([True, False, False, True]), 'CQ==')
+
+    def test_invalid_length(self):
+        with self.assertRaises(ValueError):
+            decode_bitset(encode_bitset([True] * 9), 8)